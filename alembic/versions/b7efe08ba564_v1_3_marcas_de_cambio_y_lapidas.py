@@ -0,0 +1,49 @@
+"""V1.3: Marcas de cambio (updated_at) y lápidas para delta-sync
+
+Revision ID: b7efe08ba564
+Revises: c1acb1d54b99
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7efe08ba564'
+down_revision: Union[str, Sequence[str], None] = 'c1acb1d54b99'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABLAS = ['empresas', 'areas', 'usuarios', 'actividades']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for tabla in TABLAS:
+        op.add_column(tabla, sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False))
+    op.create_index('ix_actividades_updated_at', 'actividades', ['updated_at'], unique=False)
+
+    op.create_table('eliminaciones',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('entidad', sa.String(length=50), nullable=False),
+    sa.Column('entidad_id', sa.Integer(), nullable=False),
+    sa.Column('fecha', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_eliminaciones_id', 'eliminaciones', ['id'], unique=False)
+    op.create_index('ix_eliminaciones_entidad_fecha', 'eliminaciones', ['entidad', 'fecha'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_eliminaciones_entidad_fecha', table_name='eliminaciones')
+    op.drop_index('ix_eliminaciones_id', table_name='eliminaciones')
+    op.drop_table('eliminaciones')
+
+    op.drop_index('ix_actividades_updated_at', table_name='actividades')
+    for tabla in reversed(TABLAS):
+        op.drop_column(tabla, 'updated_at', mssql_drop_default=True)
@@ -0,0 +1,40 @@
+"""V1.2: Índices compuestos para filtros de actividades
+
+Revision ID: c1acb1d54b99
+Revises: 6462d4993d4c
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c1acb1d54b99'
+down_revision: Union[str, Sequence[str], None] = '6462d4993d4c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDICES = [
+    ('ix_actividades_empresa_fecha', ['empresa_id', 'fecha_compromiso', 'id']),
+    ('ix_actividades_area_fecha', ['area_id', 'fecha_compromiso', 'id']),
+    ('ix_actividades_responsable_condicion', ['responsable_id', 'condicion_actual', 'fecha_compromiso']),
+    ('ix_actividades_status_fecha', ['status_id', 'fecha_compromiso']),
+    ('ix_actividades_condicion_fecha', ['condicion_actual', 'fecha_compromiso']),
+    ('ix_actividades_fecha_id', ['fecha_compromiso', 'id']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for nombre, columnas in INDICES:
+        op.create_index(nombre, 'actividades', columnas, unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for nombre, _ in reversed(INDICES):
+        op.drop_index(nombre, table_name='actividades')
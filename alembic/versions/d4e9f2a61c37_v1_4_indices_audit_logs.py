@@ -0,0 +1,39 @@
+"""V1.4: Índices de filtros y paginación para audit_logs
+
+Revision ID: d4e9f2a61c37
+Revises: b7efe08ba564
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4e9f2a61c37'
+down_revision: Union[str, Sequence[str], None] = 'b7efe08ba564'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDICES = [
+    ('ix_audit_logs_fecha_id', ['fecha', 'id']),
+    ('ix_audit_logs_usuario_fecha', ['usuario', 'fecha']),
+    ('ix_audit_logs_rol_fecha', ['rol', 'fecha']),
+    ('ix_audit_logs_accion_fecha', ['accion', 'fecha']),
+    ('ix_audit_logs_entidad_fecha', ['entidad', 'fecha']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for nombre, columnas in INDICES:
+        op.create_index(nombre, 'audit_logs', columnas, unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for nombre, _ in reversed(INDICES):
+        op.drop_index(nombre, table_name='audit_logs')
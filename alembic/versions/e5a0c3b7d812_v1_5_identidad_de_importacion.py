@@ -0,0 +1,32 @@
+"""V1.5: Clave de origen y huella para re-importar el SCP sin duplicar
+
+Revision ID: e5a0c3b7d812
+Revises: d4e9f2a61c37
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a0c3b7d812'
+down_revision: Union[str, Sequence[str], None] = 'd4e9f2a61c37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('actividades', sa.Column('clave_origen', sa.String(length=40), nullable=True))
+    op.add_column('actividades', sa.Column('huella', sa.String(length=40), nullable=True))
+    op.create_index('ix_actividades_empresa_clave', 'actividades', ['empresa_id', 'clave_origen'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_actividades_empresa_clave', table_name='actividades')
+    op.drop_column('actividades', 'huella')
+    op.drop_column('actividades', 'clave_origen')
@@ -0,0 +1,65 @@
+"""V1.6: Versión de cambio en orden de commit para delta-sync
+
+Revision ID: f2c8a1d94e60
+Revises: e5a0c3b7d812
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mssql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c8a1d94e60'
+down_revision: Union[str, Sequence[str], None] = 'e5a0c3b7d812'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABLAS = ['actividades', 'eliminaciones']
+
+# Mismos triggers que app.db.models.TRIGGERS_VERSION_SQLITE
+TRIGGERS_SQLITE = [
+    f"""CREATE TRIGGER tr_{tabla}_version_{evento.lower()} AFTER {evento} ON {tabla}
+    {"WHEN NEW.version IS OLD.version" if evento == "UPDATE" else ""}
+    BEGIN
+        UPDATE secuencia_cambios SET valor = valor + 1;
+        UPDATE {tabla} SET version = (SELECT valor FROM secuencia_cambios) WHERE id = NEW.id;
+    END"""
+    for tabla, evento in (("actividades", "INSERT"), ("actividades", "UPDATE"), ("eliminaciones", "INSERT"))
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name == 'mssql':
+        # ROWVERSION: SQL Server lo completa para las filas existentes y lo mantiene
+        for tabla in TABLAS:
+            op.add_column(tabla, sa.Column('version', mssql.ROWVERSION(), nullable=True))
+    else:
+        for tabla in TABLAS:
+            op.add_column(tabla, sa.Column('version', sa.BigInteger(), nullable=True))
+        op.execute("UPDATE actividades SET version = id")
+        op.execute("UPDATE eliminaciones SET version = id + (SELECT COALESCE(MAX(id), 0) FROM actividades)")
+        op.execute("CREATE TABLE secuencia_cambios (valor INTEGER NOT NULL)")
+        op.execute("INSERT INTO secuencia_cambios (valor) SELECT COALESCE(MAX(version), 0) FROM "
+                   "(SELECT version FROM actividades UNION ALL SELECT version FROM eliminaciones)")
+        for trigger in TRIGGERS_SQLITE:
+            op.execute(trigger)
+    op.create_index('ix_actividades_version', 'actividades', ['version'], unique=False)
+    op.create_index('ix_eliminaciones_entidad_version', 'eliminaciones', ['entidad', 'version'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_eliminaciones_entidad_version', table_name='eliminaciones')
+    op.drop_index('ix_actividades_version', table_name='actividades')
+    if op.get_bind().dialect.name != 'mssql':
+        for tabla, evento in (("actividades", "insert"), ("actividades", "update"), ("eliminaciones", "insert")):
+            op.execute(f"DROP TRIGGER IF EXISTS tr_{tabla}_version_{evento}")
+        op.execute("DROP TABLE secuencia_cambios")
+    for tabla in reversed(TABLAS):
+        op.drop_column(tabla, 'version')
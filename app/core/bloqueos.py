@@ -0,0 +1,97 @@
+import os
+import tempfile
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+from app.db.database import engine
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# ---------------------------------------------------------------------
+# BLOQUEOS ENTRE PROCESOS
+# ---------------------------------------------------------------------
+# Para que entre los workers uno solo haga un trabajo (construir el índice de
+# búsqueda, reclamar un spool huérfano, correr las tareas programadas...). Si el
+# proceso muere, el sistema operativo (o SQL Server) libera el bloqueo: no quedan
+# bloqueos colgados tras un kill -9.
+
+def tomar_bloqueo(ruta: str):
+    """Bloqueo exclusivo sobre 'ruta', sin esperar. Devuelve el archivo abierto (cerrarlo
+    lo libera) o None si otro lo tiene; también si es del mismo proceso con otro archivo."""
+    archivo = open(ruta, "a+b")
+    try:
+        if fcntl:
+            fcntl.flock(archivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            archivo.seek(0)
+            msvcrt.locking(archivo.fileno(), msvcrt.LK_NBLCK, 1)
+        return archivo
+    except OSError:
+        archivo.close()
+        return None
+
+# SQL Server: bloqueo de aplicación con dueño 'Session' (no depende de una transacción abierta)
+_TOMAR_MSSQL = text(
+    "SET NOCOUNT ON; DECLARE @r INT; "
+    "EXEC @r = sp_getapplock @Resource = :nombre, @LockMode = 'Exclusive', "
+    "@LockOwner = 'Session', @LockTimeout = 0; SELECT @r"
+)
+_MODO_MSSQL = text("SELECT APPLOCK_MODE('public', :nombre, 'Session')")
+_motor_bloqueos = None
+
+class BloqueoGlobal:
+    """Bloqueo exclusivo con nombre para todos los procesos que usan la BD, en cualquier
+    host. En SQL Server es sp_getapplock sobre una conexión propia (fuera del pool) que
+    queda abierta mientras se tiene; en los demás motores (SQLite: un solo host) es un
+    bloqueo de archivo."""
+    def __init__(self, nombre: str):
+        self.nombre = nombre
+        self._conexion = None
+        self._archivo = None
+
+    def tomar(self) -> bool:
+        """Intenta tomarlo sin esperar. True si queda tomado (o ya lo estaba y sigue vigente)."""
+        global _motor_bloqueos
+        if self.vigente():
+            return True
+        self.soltar()
+        if engine.dialect.name != "mssql":
+            self._archivo = tomar_bloqueo(os.path.join(tempfile.gettempdir(), f"{self.nombre}.lock"))
+            return self._archivo is not None
+        if _motor_bloqueos is None:
+            _motor_bloqueos = create_engine(engine.url, poolclass=NullPool)
+        conexion = _motor_bloqueos.connect().execution_options(isolation_level="AUTOCOMMIT")
+        try:
+            if conexion.execute(_TOMAR_MSSQL, {"nombre": self.nombre}).scalar() >= 0:
+                self._conexion = conexion
+                return True
+        except Exception as e:
+            print(f"❌ Error tomando el bloqueo {self.nombre}: {e}")
+        conexion.close()
+        return False
+
+    def vigente(self) -> bool:
+        """Si se sigue teniendo: en SQL Server se pierde si se cae la conexión"""
+        if self._archivo is not None:
+            return True
+        if self._conexion is None:
+            return False
+        try:
+            return self._conexion.execute(_MODO_MSSQL, {"nombre": self.nombre}).scalar() == "Exclusive"
+        except Exception:
+            return False
+
+    def soltar(self):
+        # Cerrar la sesión (o el archivo) libera el bloqueo
+        if self._conexion is not None:
+            try:
+                self._conexion.close()
+            except Exception:
+                pass
+            self._conexion = None
+        if self._archivo is not None:
+            self._archivo.close()
+            self._archivo = None
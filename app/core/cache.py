@@ -0,0 +1,100 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+# ---------------------------------------------------------------------
+# CACHÉ EN PROCESO CON VERSIÓN Y ETAG
+# ---------------------------------------------------------------------
+# Guarda el JSON ya serializado de datos que casi no cambian (catálogos, etc.).
+# Las escrituras llaman a invalidar() para subir la versión; el TTL acota lo
+# desactualizado que puede quedar otro worker que no vio esa escritura.
+
+class CacheVersionado:
+    def __init__(self, nombre: str, ttl_segundos: float = 300):
+        self.nombre = nombre
+        self.ttl = ttl_segundos
+        self.version = 0
+        self._cuerpo = None
+        self._etag = None
+        self._cargado_en = 0.0
+        self._lock = threading.Lock()
+
+    def _vigente(self):
+        """(cuerpo, etag, version); cuerpo es None si hay que recargar"""
+        with self._lock:
+            vigente = self._cuerpo is not None and (time.monotonic() - self._cargado_en) < self.ttl
+            return (self._cuerpo, self._etag, self.version) if vigente else (None, None, self.version)
+
+    def _guardar(self, version, cuerpo: bytes):
+        etag = '"' + hashlib.sha256(cuerpo).hexdigest()[:32] + '"'
+        with self._lock:
+            # Si hubo una invalidación mientras cargábamos, no guardamos datos viejos
+            if version == self.version:
+                self._cuerpo, self._etag, self._cargado_en = cuerpo, etag, time.monotonic()
+        return cuerpo, etag
+
+    def obtener(self, cargar):
+        """Devuelve (cuerpo_bytes, etag). 'cargar' solo se llama si no hay copia vigente."""
+        cuerpo, etag, version = self._vigente()
+        if cuerpo is not None:
+            return cuerpo, etag
+        return self._guardar(version, cargar())
+
+    async def obtener_async(self, cargar):
+        """Igual que obtener() con 'cargar' async (endpoints con AsyncSession)"""
+        cuerpo, etag, version = self._vigente()
+        if cuerpo is not None:
+            return cuerpo, etag
+        return self._guardar(version, await cargar())
+
+    def invalidar(self):
+        with self._lock:
+            self.version += 1
+            self._cuerpo = None
+            self._etag = None
+
+class CacheTTL:
+    """Diccionario LRU acotado por tamaño y por antigüedad de cada entrada"""
+    def __init__(self, max_entradas: int = 10_000, ttl_segundos: float = 60):
+        self.max_entradas = max_entradas
+        self.ttl = ttl_segundos
+        self._datos = OrderedDict()   # clave -> (valor, guardado_en)
+        self._lock = threading.Lock()
+
+    def obtener(self, clave):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None: return None
+            valor, guardado_en = entrada
+            if time.monotonic() - guardado_en >= self.ttl:
+                del self._datos[clave]
+                return None
+            self._datos.move_to_end(clave)
+            return valor
+
+    def guardar(self, clave, valor):
+        with self._lock:
+            self._datos[clave] = (valor, time.monotonic())
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+
+    def invalidar_si(self, condicion):
+        """Borra las entradas cuyo valor cumple 'condicion' (ej: del usuario editado)"""
+        with self._lock:
+            for clave in [c for c, (v, _) in self._datos.items() if condicion(v)]:
+                del self._datos[clave]
+
+def coincide_etag(if_none_match, etag) -> bool:
+    """True si el cliente ya tiene esta versión (cabecera If-None-Match)"""
+    if not if_none_match or not etag:
+        return False
+    candidatos = [e.strip() for e in if_none_match.split(",")]
+    return "*" in candidatos or etag in candidatos
+
+# Cachés de la API
+listas = CacheVersionado("config_listas")
+empresas = CacheVersionado("empresas")
+usuarios = CacheVersionado("usuarios_asignables")
+principales = CacheTTL(max_entradas=10_000, ttl_segundos=60)  # Usuario autenticado por (sub, id) del token
@@ -1,3 +1,8 @@
+import os
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
@@ -8,7 +13,16 @@ SECRET_KEY = "SIVIACK_CLAVE_SECRETA_SUPER_DIFICIL_DE_ADIVINAR"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 30 # La sesión dura 180 minutos por seguridad bancaria
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Costo de bcrypt (2^rondas iteraciones). Al cambiarlo, los hashes guardados con
+# otro costo se rehashean solos en el siguiente login exitoso.
+BCRYPT_ROUNDS = int(os.getenv("SIVIACK_BCRYPT_ROUNDS", "12"))
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
 
 def verify_password(plain_password, hashed_password):
     """Verifica si la contraseña escrita coincide con el hash en la BD"""
@@ -18,6 +32,95 @@ def get_password_hash(password):
     """Convierte '123456' en '$2b$12$...' para no guardar texto plano"""
     return pwd_context.hash(password)
 
+def verificar_y_actualizar(plain_password, hashed_password):
+    """(valida, hash_nuevo). hash_nuevo != None si el guardado usa otro costo.
+    Un hash ilegible (ej: texto plano de una carga vieja) cuenta como inválido."""
+    try:
+        return pwd_context.verify_and_update(plain_password, hashed_password)
+    except (ValueError, TypeError):
+        return False, None
+
+# ---------------------------------------------------------------------
+# POOL ACOTADO PARA HASHING
+# ---------------------------------------------------------------------
+# bcrypt es CPU puro: corre en su propio pool para no ocupar los hilos que
+# atienden el resto de la API. Si hay más trabajos en espera de los que el
+# pool puede drenar a tiempo, se rechaza al instante (503) en vez de encolar.
+HASH_WORKERS = int(os.getenv("SIVIACK_HASH_WORKERS", str(os.cpu_count() or 2)))
+HASH_MAX_EN_COLA = int(os.getenv("SIVIACK_HASH_MAX_EN_COLA", str(HASH_WORKERS * 8)))
+
+class HashingSaturado(Exception):
+    """El pool de hashing está lleno; el cliente debe reintentar"""
+
+_pool_hash = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="hash")
+_cupos_hash = threading.BoundedSemaphore(HASH_WORKERS + HASH_MAX_EN_COLA)
+_lock_carga = threading.Lock()
+_carga_hash = {"en_curso": 0, "rechazados": 0}   # en_curso = ejecutándose + en espera
+
+def _liberar_cupo_hash(_=None):
+    with _lock_carga:
+        _carga_hash["en_curso"] -= 1
+    _cupos_hash.release()
+
+async def _en_pool_hash(funcion, *args):
+    if not _cupos_hash.acquire(blocking=False):
+        with _lock_carga:
+            _carga_hash["rechazados"] += 1
+        raise HashingSaturado()
+    with _lock_carga:
+        _carga_hash["en_curso"] += 1
+    try:
+        futuro = _pool_hash.submit(funcion, *args)
+    except Exception:
+        _liberar_cupo_hash()
+        raise
+    futuro.add_done_callback(_liberar_cupo_hash)
+    return await asyncio.wrap_future(futuro)
+
+async def verificar_password_async(plain_password, hashed_password):
+    return await _en_pool_hash(verificar_y_actualizar, plain_password, hashed_password)
+
+async def hash_password_async(password):
+    return await _en_pool_hash(get_password_hash, password)
+
+def estadisticas_hashing() -> dict:
+    """Carga del pool de hashing para monitoreo (rechazados = 503 acumulados)"""
+    with _lock_carga:
+        carga = dict(_carga_hash)
+    return {"hilos": HASH_WORKERS, "max_en_cola": HASH_MAX_EN_COLA, **carga}
+
+class Principal:
+    """Copia liviana del usuario autenticado: se puede cachear entre requests
+    (un objeto ORM queda atado a su sesión)"""
+    def __init__(self, id, email, nombre_completo, rol, empresa_id):
+        self.id = id
+        self.email = email
+        self.nombre_completo = nombre_completo
+        self.rol = rol
+        self.empresa_id = empresa_id
+
+    @classmethod
+    def desde_usuario(cls, usuario):
+        return cls(usuario.id, usuario.email, usuario.nombre_completo, usuario.rol, usuario.empresa_id)
+
+# REVOCACIÓN EN MEMORIA: tokens emitidos antes de este instante (por usuario) dejan de valer
+_revocados = {}   # usuario_id -> timestamp (segundos, con fracción)
+_lock_revocados = threading.Lock()
+
+def revocar_tokens(usuario_id: int):
+    """Invalida todos los tokens ya emitidos para el usuario (cambio de rol, borrado...)"""
+    ahora = time.time()
+    with _lock_revocados:
+        _revocados[usuario_id] = ahora
+        # Pasada la duración máxima del token, la marca ya no hace falta
+        vencidas = ahora - ACCESS_TOKEN_EXPIRE_MINUTES * 60
+        for uid in [u for u, t in _revocados.items() if t < vencidas]:
+            del _revocados[uid]
+
+def token_revocado(payload: dict) -> bool:
+    revocado_desde = _revocados.get(payload.get("id"))
+    return revocado_desde is not None and payload.get("iat", 0) < revocado_desde
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Genera el Token JWT que el frontend guardará"""
     to_encode = data.copy()
@@ -26,6 +129,6 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
     
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": time.time()})  # iat con fracción: revocación exacta
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
\ No newline at end of file
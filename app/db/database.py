@@ -1,23 +1,148 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, exc, make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import QueuePool, StaticPool, AsyncAdaptedQueuePool
+import os
+import threading
+import time
 import urllib.parse
 
-SERVER_NAME = "JHANPOOL"  
-DATABASE_NAME = "SiviackDB"
+# ---------------------------------------------------------------------
+# CONFIGURACIÓN (VARIABLES DE ENTORNO)
+# ---------------------------------------------------------------------
+# SIVIACK_DATABASE_URL manda si está definida (ej: sqlite:///siviack_local.db para
+# probar la API completa sin SQL Server). Si no, se arma la cadena ODBC de SQL Server.
+SERVER_NAME = os.getenv("SIVIACK_DB_SERVER", "JHANPOOL")
+DATABASE_NAME = os.getenv("SIVIACK_DB_NAME", "SiviackDB")
+DRIVER_ODBC = os.getenv("SIVIACK_DB_DRIVER", "ODBC Driver 17 for SQL Server")
+USUARIO_BD = os.getenv("SIVIACK_DB_USER")          # Sin usuario = Trusted_Connection
+PASSWORD_BD = os.getenv("SIVIACK_DB_PASSWORD", "")
 
-# Cadena de conexión
-connection_string = (
-    f"DRIVER={{ODBC Driver 17 for SQL Server}};"
-    f"SERVER={SERVER_NAME};"
-    f"DATABASE={DATABASE_NAME};"
-    f"Trusted_Connection=yes;"
-)
+POOL_SIZE = int(os.getenv("SIVIACK_DB_POOL_SIZE", "10"))         # Conexiones abiertas permanentes
+MAX_OVERFLOW = int(os.getenv("SIVIACK_DB_MAX_OVERFLOW", "20"))   # Extra en picos (se cierran al devolverse)
+POOL_TIMEOUT = float(os.getenv("SIVIACK_DB_POOL_TIMEOUT", "30"))   # Segundos esperando una conexión libre
+POOL_RECYCLE = int(os.getenv("SIVIACK_DB_POOL_RECYCLE", "1800"))   # Renueva conexiones más viejas (firewalls/NAT)
+POOL_PRE_PING = os.getenv("SIVIACK_DB_PRE_PING", "1").lower() in ("1", "true", "si", "sí")
+CONNECT_TIMEOUT = int(os.getenv("SIVIACK_DB_CONNECT_TIMEOUT", "15"))  # Login en SQL Server / bloqueo en SQLite
 
-# Codificar la cadena
-params = urllib.parse.quote_plus(connection_string)
-SQLALCHEMY_DATABASE_URL = f"mssql+pyodbc:///?odbc_connect={params}"
+def _url_sql_server():
+    # Cadena de conexión
+    connection_string = (
+        f"DRIVER={{{DRIVER_ODBC}}};"
+        f"SERVER={SERVER_NAME};"
+        f"DATABASE={DATABASE_NAME};"
+    )
+    if USUARIO_BD:
+        connection_string += f"UID={USUARIO_BD};PWD={PASSWORD_BD};"
+    else:
+        connection_string += "Trusted_Connection=yes;"
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+    # Codificar la cadena
+    params = urllib.parse.quote_plus(connection_string)
+    return f"mssql+pyodbc:///?odbc_connect={params}"
+
+SQLALCHEMY_DATABASE_URL = os.getenv("SIVIACK_DATABASE_URL") or _url_sql_server()
+
+def _url_async(url: str) -> str:
+    """Mismo destino con driver async: aioodbc para SQL Server, aiosqlite en local"""
+    for sync, asincrono in (("mssql+pyodbc", "mssql+aioodbc"), ("sqlite", "sqlite+aiosqlite")):
+        if url.startswith(sync + ":"):
+            return asincrono + url[len(sync):]
+    return url
+
+ASYNC_DATABASE_URL = os.getenv("SIVIACK_ASYNC_DATABASE_URL") or _url_async(SQLALCHEMY_DATABASE_URL)
+
+# ---------------------------------------------------------------------
+# POOL CON MEDICIÓN DE ESPERAS
+# ---------------------------------------------------------------------
+_lock_esperas = threading.Lock()
+_esperas = {"pedidos": 0, "espera_total_s": 0.0, "espera_max_s": 0.0, "timeouts": 0}
+
+class PoolMedido(QueuePool):
+    """QueuePool que anota cuánto tarda cada request en obtener una conexión"""
+    def _do_get(self):
+        inicio = time.perf_counter()
+        agoto = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            agoto = True
+            raise
+        finally:
+            espera = time.perf_counter() - inicio
+            with _lock_esperas:
+                _esperas["pedidos"] += 1
+                _esperas["espera_total_s"] += espera
+                _esperas["espera_max_s"] = max(_esperas["espera_max_s"], espera)
+                _esperas["timeouts"] += agoto
+
+class PoolMedidoAsync(PoolMedido, AsyncAdaptedQueuePool):
+    """Mismas mediciones para el engine async"""
+
+def _connect_args(url) -> dict:
+    """Argumentos del driver según el motor: cada DBAPI nombra distinto sus opciones"""
+    motor = url.get_backend_name()
+    if motor == "sqlite":
+        # timeout: segundos esperando un bloqueo de escritura
+        return {"check_same_thread": False, "timeout": CONNECT_TIMEOUT}
+    if motor == "mssql":
+        # timeout: segundos para el login (pyodbc y aioodbc)
+        return {"timeout": CONNECT_TIMEOUT}
+    return {}
+
+def _crear_engine(url: str, crear=create_engine, pool=PoolMedido):
+    url = make_url(url)
+    argumentos = {"connect_args": _connect_args(url)}
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        # En memoria: una sola conexión compartida, si no cada conexión vería otra BD vacía
+        return crear(url, poolclass=StaticPool, **argumentos)
+    if url.get_backend_name() == "mssql" and url.get_driver_name() == "pyodbc":
+        # fast_executemany: pyodbc manda los executemany (cargas masivas) en un solo viaje
+        argumentos["fast_executemany"] = True
+    return crear(
+        url,
+        poolclass=pool,
+        pool_size=POOL_SIZE,
+        max_overflow=MAX_OVERFLOW,
+        pool_timeout=POOL_TIMEOUT,
+        pool_recycle=POOL_RECYCLE,
+        pool_pre_ping=POOL_PRE_PING,
+        **argumentos,
+    )
+
+engine = _crear_engine(SQLALCHEMY_DATABASE_URL)
+
+def _pragmas_sqlite(conexion, _):
+    # WAL: lecturas concurrentes mientras otro hilo escribe (pruebas de carga locales)
+    cursor = conexion.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.close()
+
+if engine.dialect.name == "sqlite":
+    event.listen(engine, "connect", _pragmas_sqlite)
+
+def estadisticas_pool() -> dict:
+    """Estado del pool para monitoreo: conexiones en uso, overflow y esperas acumuladas"""
+    pool = engine.pool
+    with _lock_esperas:
+        esperas = dict(_esperas)
+    datos = {"motor": engine.dialect.name, "pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        datos.update({
+            "tamano": pool.size(),
+            "en_uso": pool.checkedout(),
+            "libres": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": MAX_OVERFLOW,
+        })
+    if _motor_async is not None and isinstance(_motor_async.pool, QueuePool):
+        datos["async_en_uso"] = _motor_async.pool.checkedout()
+    datos.update({
+        "pedidos": esperas["pedidos"],
+        "timeouts": esperas["timeouts"],
+        "espera_promedio_ms": round(esperas["espera_total_s"] * 1000 / max(esperas["pedidos"], 1), 3),
+        "espera_max_ms": round(esperas["espera_max_s"] * 1000, 3),
+    })
+    return datos
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
@@ -27,4 +152,28 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# ---------------------------------------------------------------------
+# SESIONES ASYNC (ENDPOINTS DE LECTURA)
+# ---------------------------------------------------------------------
+# El engine async se crea al primer uso: los scripts, el ETL y Alembic no
+# necesitan el driver async instalado.
+_motor_async = None
+_sesiones_async = None
+
+def motor_async():
+    global _motor_async, _sesiones_async
+    if _motor_async is None:
+        from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+        _motor_async = _crear_engine(ASYNC_DATABASE_URL, create_async_engine, PoolMedidoAsync)
+        if _motor_async.dialect.name == "sqlite":
+            event.listen(_motor_async.sync_engine, "connect", _pragmas_sqlite)
+        # expire_on_commit=False: los objetos se serializan después de cerrar la sesión
+        _sesiones_async = async_sessionmaker(_motor_async, autoflush=False, expire_on_commit=False)
+    return _motor_async
+
+async def get_async_db():
+    motor_async()
+    async with _sesiones_async() as db:
+        yield db
\ No newline at end of file
@@ -1,8 +1,41 @@
-from sqlalchemy import Column, Integer, String, Boolean, Date, ForeignKey, DECIMAL, DateTime, Text
+from sqlalchemy import Column, Integer, BigInteger, String, Boolean, Date, ForeignKey, DECIMAL, DateTime, Text, Index
+from sqlalchemy import event, insert, DDL, FetchedValue
+from sqlalchemy.dialects import mssql
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
+from sqlalchemy.types import TypeDecorator
 from app.db.database import Base
 
+# ==========================================
+# 0. VERSIÓN DE CAMBIO (DELTA-SYNC)
+# ==========================================
+class VersionCambio(TypeDecorator):
+    """Contador que crece en cada INSERT/UPDATE y que ninguna transacción puede
+    confirmar por debajo del token entregado (ver consultas.token_cambios).
+    En SQL Server es ROWVERSION (lo asigna la BD, también en UPDATE set-based y
+    bulk insert); en SQLite lo asignan los triggers de TRIGGERS_VERSION_SQLITE."""
+    impl = BigInteger
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "mssql":
+            return dialect.type_descriptor(mssql.ROWVERSION())
+        return dialect.type_descriptor(BigInteger())
+
+    def process_bind_param(self, value, dialect):
+        if value is not None and dialect.name == "mssql":
+            return int(value).to_bytes(8, "big")   # Se compara contra binary(8) sin convertir la columna
+        return value
+
+    def process_result_value(self, value, dialect):
+        if value is not None and dialect.name == "mssql":
+            return int.from_bytes(value, "big")
+        return value
+
+def columna_version():
+    # La BD la escribe siempre: el ORM no la incluye en INSERT ni UPDATE
+    return Column(VersionCambio(), server_default=FetchedValue(), server_onupdate=FetchedValue(), nullable=True)
+
 # ==========================================
 # 1. TABLAS MAESTRAS (JERARQUÍA)
 # ==========================================
@@ -14,6 +47,7 @@ class Empresa(Base):
     shk = Column(String(20)) # <--- AQUÍ ESTÁ EL CAMPO QUE TE FALTABA
     ruc = Column(String(20))
     activo = Column(Boolean, default=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
     
     usuarios = relationship("Usuario", back_populates="empresa", cascade="all, delete")
     areas = relationship("Area", back_populates="empresa", cascade="all, delete")
@@ -24,6 +58,7 @@ class Area(Base):
     id = Column(Integer, primary_key=True, index=True)
     codigo = Column(String(20)) 
     nombre = Column(String(100))
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
     
     empresa_id = Column(Integer, ForeignKey("empresas.id"), nullable=False)
     empresa = relationship("Empresa", back_populates="areas")
@@ -37,6 +72,7 @@ class Usuario(Base):
     email = Column(String(100), unique=True, index=True)
     password_hash = Column(String(255))
     rol = Column(String(20)) 
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
     
     empresa_id = Column(Integer, ForeignKey("empresas.id"), nullable=True)
     empresa = relationship("Empresa", back_populates="usuarios")
@@ -86,6 +122,18 @@ class StatusActividad(Base):
 
 class Actividad(Base):
     __tablename__ = "actividades"
+    # Índices compuestos según los filtros reales de /actividades/ y /mis-pendientes/
+    # (fecha_compromiso, id) al final para servir también el orden del cursor keyset
+    __table_args__ = (
+        Index("ix_actividades_empresa_fecha", "empresa_id", "fecha_compromiso", "id"),
+        Index("ix_actividades_area_fecha", "area_id", "fecha_compromiso", "id"),
+        Index("ix_actividades_responsable_condicion", "responsable_id", "condicion_actual", "fecha_compromiso"),
+        Index("ix_actividades_status_fecha", "status_id", "fecha_compromiso"),
+        Index("ix_actividades_condicion_fecha", "condicion_actual", "fecha_compromiso"),
+        Index("ix_actividades_fecha_id", "fecha_compromiso", "id"),
+        Index("ix_actividades_empresa_clave", "empresa_id", "clave_origen"),
+        Index("ix_actividades_version", "version"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     
@@ -132,6 +180,15 @@ class Actividad(Base):
     link_evidencia = Column(Text, nullable=True)
     observaciones = Column(Text, nullable=True)
 
+    # --- Origen (importación SCP) ---
+    clave_origen = Column(String(40), nullable=True)  # Identidad de la fila en el Excel entre corridas
+    huella = Column(String(40), nullable=True)        # Hash del contenido importado
+
+    # --- Sincronización ---
+    # Fecha del último cambio (informativa) y versión de cambio para el delta-sync
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False, index=True)
+    version = columna_version()
+
     # --- Relaciones ---
     empresa_rel = relationship("Empresa", back_populates="actividades")
     area_rel = relationship("Area", back_populates="actividades")
@@ -157,4 +214,56 @@ class AuditLog(Base):
     rol = Column(String(20))           # Rol del usuario (ADMIN, CONSULTOR...)
     accion = Column(String(50))        # CREAR, EDITAR, ELIMINAR, LOGIN
     entidad = Column(String(50))       # Actividad, Usuario, Empresa, Área
-    detalle = Column(Text, nullable=True) # Descripción (ej: "Creó actividad #45")
\ No newline at end of file
+    detalle = Column(Text, nullable=True) # Descripción (ej: "Creó actividad #45")
+
+    # Filtros del visor de auditoría; todos terminan en fecha para paginar por keyset
+    __table_args__ = (
+        Index("ix_audit_logs_fecha_id", "fecha", "id"),
+        Index("ix_audit_logs_usuario_fecha", "usuario", "fecha"),
+        Index("ix_audit_logs_rol_fecha", "rol", "fecha"),
+        Index("ix_audit_logs_accion_fecha", "accion", "fecha"),
+        Index("ix_audit_logs_entidad_fecha", "entidad", "fecha"),
+    )
+
+# ==========================================
+# 5. LÁPIDAS (ELIMINACIONES PARA DELTA-SYNC)
+# ==========================================
+class Eliminacion(Base):
+    __tablename__ = "eliminaciones"
+
+    id = Column(Integer, primary_key=True, index=True)
+    entidad = Column(String(50), nullable=False)   # Actividad, Empresa, Area, Usuario
+    entidad_id = Column(Integer, nullable=False)
+    fecha = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    version = columna_version()    # Mismo contador que Actividad.version
+    __table_args__ = (
+        Index("ix_eliminaciones_entidad_fecha", "entidad", "fecha"),
+        Index("ix_eliminaciones_entidad_version", "entidad", "version"),
+    )
+
+def _registrar_eliminacion(mapper, connection, target):
+    """Deja la lápida en la misma transacción del DELETE (también en borrados en cascada)"""
+    connection.execute(insert(Eliminacion).values(entidad=type(target).__name__, entidad_id=target.id))
+
+for _modelo in (Empresa, Area, Usuario, Actividad):
+    event.listen(_modelo, "after_delete", _registrar_eliminacion)
+
+# SQLite no tiene ROWVERSION: un contador en una tabla de una fila. Como SQLite admite
+# un solo escritor a la vez, una transacción abierta siempre tiene versiones mayores
+# que todo lo ya confirmado. WHEN NEW.version IS OLD.version: el UPDATE del propio
+# trigger no vuelve a numerar la fila.
+TRIGGERS_VERSION_SQLITE = [
+    "CREATE TABLE IF NOT EXISTS secuencia_cambios (valor INTEGER NOT NULL)",
+    "INSERT INTO secuencia_cambios (valor) SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM secuencia_cambios)",
+] + [
+    f"""CREATE TRIGGER IF NOT EXISTS tr_{tabla}_version_{evento.lower()} AFTER {evento} ON {tabla}
+    {"WHEN NEW.version IS OLD.version" if evento == "UPDATE" else ""}
+    BEGIN
+        UPDATE secuencia_cambios SET valor = valor + 1;
+        UPDATE {tabla} SET version = (SELECT valor FROM secuencia_cambios) WHERE id = NEW.id;
+    END"""
+    for tabla, evento in (("actividades", "INSERT"), ("actividades", "UPDATE"), ("eliminaciones", "INSERT"))
+]
+
+for _sentencia in TRIGGERS_VERSION_SQLITE:
+    event.listen(Base.metadata, "after_create", DDL(_sentencia).execute_if(dialect="sqlite"))
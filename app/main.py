@@ -1,16 +1,25 @@
-from fastapi import FastAPI, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import FastAPI, Depends, HTTPException, status, Request, Response, Query, UploadFile, File, Form
+from fastapi.responses import StreamingResponse, JSONResponse
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import TimeoutError as PoolAgotado
 from typing import List, Optional
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from datetime import timedelta, date
+from datetime import timedelta, date, datetime
 from jose import JWTError, jwt 
+import json
+import os
+import tempfile
 
 # Importaciones internas
 from app.schemas import schemas
-from app.db.database import engine, get_db
+from app.db.database import engine, get_db, get_async_db, estadisticas_pool
 from app.db import models
-from app.core import security
+from app.core import security, cache
+from app.services import consultas, reportes, recalculo, busqueda, auditoria, retencion, importaciones, catalogos, programador
 
 # 1. Crear tablas automáticamente al iniciar (Incluyendo AuditLogs)
 models.Base.metadata.create_all(bind=engine)
@@ -34,54 +43,97 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# Jobs: el programador corre el recálculo (days_late / condicion_actual / prioridad_accion)
+# y la retención en un solo worker a la vez
+@app.on_event("startup")
+def iniciar_jobs():
+    auditoria.escritor.iniciar()
+    programador.iniciar()
+    busqueda.precargar()
+
+@app.on_event("shutdown")
+def detener_jobs():
+    auditoria.escritor.detener()  # Último flush de la auditoría encolada
+
 # ==========================================
 # FUNCIONES DE SEGURIDAD (MIDDLEWARE)
 # ==========================================
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
+def credenciales_invalidas():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Credenciales inválidas",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def _leer_token(token: str):
+    """(clave de caché, payload) de un token válido y no revocado"""
     try:
         payload = jwt.decode(token, security.SECRET_KEY, algorithms=[security.ALGORITHM])
         email: str = payload.get("sub")
-        if email is None: raise credentials_exception
+        if email is None: raise credenciales_invalidas()
     except JWTError:
-        raise credentials_exception
-        
-    user = db.query(models.Usuario).filter(models.Usuario.email == email).first()
-    if user is None: raise credentials_exception
-    return user
+        raise credenciales_invalidas()
+    if security.token_revocado(payload): raise credenciales_invalidas()
+    return (email, payload.get("id")), payload
+
+def _principal_de(user, payload):
+    if user is None: raise credenciales_invalidas()
+    if payload.get("id") is not None and user.id != payload.get("id"): raise credenciales_invalidas()
+    return security.Principal.desde_usuario(user)
 
-def solo_admin(current_user: models.Usuario = Depends(get_current_user)):
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    clave, payload = _leer_token(token)
+    # Caché de principales: los GET frecuentes no consultan la BD para autorizar
+    principal = cache.principales.obtener(clave)
+    if principal is None:
+        user = db.query(models.Usuario).filter(models.Usuario.email == clave[0]).first()
+        principal = _principal_de(user, payload)
+        cache.principales.guardar(clave, principal)
+    return principal
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    """Igual que get_current_user, sin pasar por el threadpool (endpoints async)"""
+    clave, payload = _leer_token(token)
+    principal = cache.principales.obtener(clave)
+    if principal is None:
+        user = (await db.execute(select(models.Usuario).filter(models.Usuario.email == clave[0]))).scalars().first()
+        principal = _principal_de(user, payload)
+        cache.principales.guardar(clave, principal)
+    return principal
+
+def olvidar_usuario(usuario_id: int, revocar: bool = False):
+    """Saca al usuario de la caché de principales y opcionalmente revoca sus tokens"""
+    cache.principales.invalidar_si(lambda p: p.id == usuario_id)
+    if revocar: security.revocar_tokens(usuario_id)
+
+def solo_admin(current_user: security.Principal = Depends(get_current_user)):
     if current_user.rol != "ADMIN":
         raise HTTPException(status_code=403, detail="Acceso Denegado: Solo Admin")
     return current_user
 
+def empresa_del_cliente(current_user: security.Principal):
+    """Empresa a la que queda restringido un CLIENTE (403 si no tiene asignada); None para
+    los demás roles. Se aplica sobre el filtro del usuario: filtrar_actividades ignora los
+    filtros vacíos, así que no sirve para restringir por sí solo."""
+    if current_user.rol != "CLIENTE":
+        return None
+    if current_user.empresa_id is None:
+        raise HTTPException(403, "Usuario cliente sin empresa asignada")
+    return current_user.empresa_id
+
 # ==========================================
 # FUNCIÓN DE AUDITORÍA (LOGS)
 # ==========================================
-def registrar_log(db: Session, usuario_obj, accion: str, entidad: str, detalle: str):
+def registrar_log(usuario_obj, accion: str, entidad: str, detalle: str):
+    # Se encola y se inserta por lotes en segundo plano: el request no paga otro commit
     try:
-        # Si usuario_obj es None (ej: Login fallido o sistema), manejamos string o null
-        nombre = usuario_obj.nombre_completo if usuario_obj else "Sistema/Anon"
-        rol = usuario_obj.rol if usuario_obj else "N/A"
-        
-        nuevo_log = models.AuditLog(
-            usuario=nombre,
-            rol=rol,
-            accion=accion,
-            entidad=entidad,
-            detalle=detalle
-        )
-        db.add(nuevo_log)
-        db.commit()
+        auditoria.registrar(usuario_obj, accion, entidad, detalle)
     except Exception as e:
         print(f"Error guardando log: {e}")
 
@@ -92,30 +144,139 @@ def registrar_log(db: Session, usuario_obj, accion: str, entidad: str, detalle:
 def read_root():
     return {"mensaje": "API SIVIACK Operativa v2.3", "docs": "/docs"}
 
+@app.get("/estado/bd", tags=["General"])
+def estado_bd(admin: security.Principal = Depends(solo_admin)):
+    # Conexiones en uso / overflow / espera por conexión y carga del hashing: para dimensionar los pools
+    return {**estadisticas_pool(), "hashing": security.estadisticas_hashing()}
+
+@app.exception_handler(PoolAgotado)
+def pool_agotado(request: Request, e: PoolAgotado):
+    # Sin conexión libre tras SIVIACK_DB_POOL_TIMEOUT: el cliente reintenta, no es un error 500
+    return JSONResponse(status_code=503, content={"detail": "Servidor ocupado, reintente en unos segundos"},
+                        headers={"Retry-After": "2"})
+
+@app.exception_handler(busqueda.IndiceNoDisponible)
+def indice_no_disponible(request: Request, e: busqueda.IndiceNoDisponible):
+    # Primer arranque: el proceso constructor todavía no publicó el índice
+    return JSONResponse(status_code=503, content={"detail": "Índice de búsqueda en construcción, reintente en unos segundos"},
+                        headers={"Retry-After": "10"})
+
 # ==========================================
 # AUDITORÍA ENDPOINTS
 # ==========================================
 @app.get("/audit-logs/", response_model=List[schemas.AuditLogOut], tags=["Configuración"])
-def ver_logs(db: Session = Depends(get_db), admin: models.Usuario = Depends(solo_admin)):
-    # Trae los últimos 100 eventos
-    return db.query(models.AuditLog).order_by(models.AuditLog.fecha.desc()).limit(100).all()
+def ver_logs(
+    response: Response,
+    usuario: Optional[str] = None,
+    rol: Optional[str] = None,
+    accion: Optional[str] = None,
+    entidad: Optional[str] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    after: Optional[str] = None,
+    db: Session = Depends(get_db),
+    admin: security.Principal = Depends(solo_admin)
+):
+    # Más recientes primero; la página siguiente se pide pasando X-Next-Cursor en 'after'
+    if after:
+        try: auditoria.leer_cursor(after)
+        except ValueError: raise HTTPException(400, "Cursor inválido")
+    query = auditoria.filtrar_logs(db.query(models.AuditLog), usuario=usuario, rol=rol, accion=accion,
+                                   entidad=entidad, desde=desde, hasta=hasta)
+    logs = auditoria.paginar_logs(query, limit, after).all()
+    if len(logs) == limit:
+        response.headers["X-Next-Cursor"] = auditoria.crear_cursor(logs[-1])
+    return logs
+
+@app.get("/audit-logs/histograma", response_model=List[schemas.ConteoAuditoria], tags=["Configuración"])
+def histograma_logs(
+    usuario: Optional[str] = None,
+    rol: Optional[str] = None,
+    accion: Optional[str] = None,
+    entidad: Optional[str] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+    admin: security.Principal = Depends(solo_admin)
+):
+    # Eventos por día y entidad (para el gráfico del visor)
+    return auditoria.histograma(db, usuario=usuario, rol=rol, accion=accion,
+                                entidad=entidad, desde=desde, hasta=hasta)
+
+@app.get("/audit-logs/archivo", response_model=List[schemas.AuditLogOut], tags=["Configuración"])
+def ver_logs_archivados(
+    response: Response,
+    usuario: Optional[str] = None,
+    rol: Optional[str] = None,
+    accion: Optional[str] = None,
+    entidad: Optional[str] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    after: Optional[str] = None,
+    admin: security.Principal = Depends(solo_admin)
+):
+    # Eventos que ya pasaron la retención: se leen de los segmentos del rango pedido
+    if after:
+        try: auditoria.leer_cursor(after)
+        except ValueError: raise HTTPException(400, "Cursor inválido")
+    logs = retencion.consultar_archivo(usuario=usuario, rol=rol, accion=accion, entidad=entidad,
+                                       desde=desde, hasta=hasta, limit=limit, after=after)
+    if len(logs) == limit:
+        response.headers["X-Next-Cursor"] = auditoria.crear_cursor(schemas.AuditLogOut(**logs[-1]))
+    return logs
 
 # ==========================================
 # AUTENTICACIÓN
 # ==========================================
 
+def _servidor_ocupado():
+    return HTTPException(status_code=503, detail="Servidor ocupado, reintente en unos segundos",
+                         headers={"Retry-After": "2"})
+
+async def verificar_password(password: str, password_hash: str):
+    try:
+        return await security.verificar_password_async(password, password_hash)
+    except security.HashingSaturado:
+        raise _servidor_ocupado()
+
+async def hashear_password(password: str):
+    try:
+        return await security.hash_password_async(password)
+    except security.HashingSaturado:
+        raise _servidor_ocupado()
+
+def _usuario_para_login(db: Session, email: str):
+    """(usuario, principal, hash guardado) o None. Devuelve la conexión al pool antes de
+    esperar a bcrypt: si no, cada login en cola retiene una y el pool se agota."""
+    usuario = db.query(models.Usuario).filter(models.Usuario.email == email).first()
+    if not usuario: return None
+    datos = usuario, security.Principal.desde_usuario(usuario), usuario.password_hash
+    db.rollback()
+    return datos
+
 @app.post("/token", response_model=schemas.Token, tags=["Seguridad"])
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    usuario = db.query(models.Usuario).filter(models.Usuario.email == form_data.username).first()
-    if not usuario or not security.verify_password(form_data.password, usuario.password_hash):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    # async: el hilo no queda tomado mientras bcrypt corre en su pool
+    encontrado = await run_in_threadpool(_usuario_para_login, db, form_data.username)
+    if not encontrado:
+        raise HTTPException(status_code=401, detail="Usuario o contraseña incorrectos")
+    usuario, principal, password_hash = encontrado
+    valida, hash_nuevo = await verificar_password(form_data.password, password_hash)
+    if not valida:
         # Log de intento fallido (opcional, cuidado con llenar la BD)
         raise HTTPException(status_code=401, detail="Usuario o contraseña incorrectos")
+    if hash_nuevo:
+        # Cambió el costo de bcrypt: se guarda el hash con el costo actual
+        usuario.password_hash = hash_nuevo
+        await run_in_threadpool(db.commit)
     
-    # Log de login exitoso
-    registrar_log(db, usuario, "LOGIN", "Sesión", "Inicio de sesión exitoso")
+    # Log de login exitoso (fuera del event loop: al llenarse el lote se inserta en la BD)
+    await run_in_threadpool(registrar_log, principal, "LOGIN", "Sesión", "Inicio de sesión exitoso")
     
     access_token = security.create_access_token(
-        data={"sub": usuario.email, "rol": usuario.rol, "id": usuario.id},
+        data={"sub": principal.email, "rol": principal.rol, "id": principal.id},
         expires_delta=timedelta(minutes=security.ACCESS_TOKEN_EXPIRE_MINUTES)
     )
     return {"access_token": access_token, "token_type": "bearer"}
@@ -125,56 +286,72 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
 # ==========================================
 
 @app.post("/usuarios/", tags=["Gestión Usuarios"])
-def crear_usuario(usuario: schemas.UsuarioCreate, db: Session = Depends(get_db), admin: models.Usuario = Depends(solo_admin)):
+async def crear_usuario(usuario: schemas.UsuarioCreate, db: Session = Depends(get_db), admin: security.Principal = Depends(solo_admin)):
+    password_hash = await hashear_password(usuario.password)
+    return await run_in_threadpool(_crear_usuario, usuario, password_hash, db, admin)
+
+def _crear_usuario(usuario: schemas.UsuarioCreate, password_hash: str, db: Session, admin: security.Principal):
     if db.query(models.Usuario).filter_by(email=usuario.email).first():
         raise HTTPException(status_code=400, detail="Email ya registrado")
     
     nuevo = models.Usuario(
         nombre_completo=usuario.nombre_completo,
         email=usuario.email,
-        password_hash=security.get_password_hash(usuario.password),
+        password_hash=password_hash,
         rol=usuario.rol,
         empresa_id=usuario.empresa_id
     )
     db.add(nuevo)
     db.commit()
     
-    registrar_log(db, admin, "CREAR", "Usuario", f"Creó al usuario {nuevo.email} ({nuevo.rol})")
+    cache.usuarios.invalidar()
+    registrar_log(admin, "CREAR", "Usuario", f"Creó al usuario {nuevo.email} ({nuevo.rol})")
     return {"mensaje": "Usuario creado"}
 
 @app.get("/usuarios/", response_model=List[schemas.UsuarioOut], tags=["Gestión Usuarios"])
-def listar_usuarios(rol: str = None, db: Session = Depends(get_db)):
-    query = db.query(models.Usuario)
+async def listar_usuarios(rol: str = None, db: AsyncSession = Depends(get_async_db)):
+    query = select(models.Usuario)
     if rol:
         if "," in rol: query = query.filter(models.Usuario.rol.in_(rol.split(",")))
         else: query = query.filter(models.Usuario.rol == rol)
-    return query.all()
+    return (await db.execute(query)).scalars().all()
 
 @app.delete("/usuarios/{id}", tags=["Gestión Usuarios"])
-def eliminar_usuario(id: int, db: Session = Depends(get_db), admin: models.Usuario = Depends(solo_admin)):
+def eliminar_usuario(id: int, db: Session = Depends(get_db), admin: security.Principal = Depends(solo_admin)):
     user = db.query(models.Usuario).filter(models.Usuario.id == id).first()
     if not user: raise HTTPException(404, "Usuario no encontrado")
     nombre_borrado = user.nombre_completo
     db.delete(user)
     db.commit()
+    olvidar_usuario(id, revocar=True)
     
-    registrar_log(db, admin, "ELIMINAR", "Usuario", f"Eliminó al usuario {nombre_borrado}")
+    cache.usuarios.invalidar()
+    registrar_log(admin, "ELIMINAR", "Usuario", f"Eliminó al usuario {nombre_borrado}")
     return {"mensaje": "Usuario eliminado"}
 
 @app.put("/usuarios/{id}", tags=["Gestión Usuarios"])
-def actualizar_usuario(id: int, datos: schemas.UsuarioCreate, db: Session = Depends(get_db), admin: models.Usuario = Depends(solo_admin)):
+async def actualizar_usuario(id: int, datos: schemas.UsuarioCreate, db: Session = Depends(get_db), admin: security.Principal = Depends(solo_admin)):
+    password_hash = await hashear_password(datos.password) if datos.password else None
+    return await run_in_threadpool(_actualizar_usuario, id, datos, password_hash, db, admin)
+
+def _actualizar_usuario(id: int, datos: schemas.UsuarioCreate, password_hash: Optional[str], db: Session, admin: security.Principal):
     user = db.query(models.Usuario).filter(models.Usuario.id == id).first()
     if not user: raise HTTPException(404, "Usuario no encontrado")
+    # Cambios que alteran permisos o credenciales invalidan los tokens ya emitidos
+    cambio_sensible = (user.rol != datos.rol or user.email != datos.email
+                       or user.empresa_id != datos.empresa_id or bool(datos.password))
     
     user.nombre_completo = datos.nombre_completo
     user.email = datos.email
     user.rol = datos.rol
     user.empresa_id = datos.empresa_id
-    if datos.password and len(datos.password) > 0:
-         user.password_hash = security.get_password_hash(datos.password)
+    if password_hash:
+         user.password_hash = password_hash
 
     db.commit()
-    registrar_log(db, admin, "EDITAR", "Usuario", f"Actualizó datos de {user.email}")
+    olvidar_usuario(id, revocar=cambio_sensible)
+    cache.usuarios.invalidar()
+    registrar_log(admin, "EDITAR", "Usuario", f"Actualizó datos de {user.email}")
     return {"mensaje": "Usuario actualizado"}
 
 # ==========================================
@@ -182,7 +359,7 @@ def actualizar_usuario(id: int, datos: schemas.UsuarioCreate, db: Session = Depe
 # ==========================================
 
 @app.post("/empresas/", response_model=schemas.EmpresaOut, tags=["Empresas"])
-def crear_empresa(empresa: schemas.EmpresaBase, db: Session = Depends(get_db), current_user: models.Usuario = Depends(get_current_user)):
+def crear_empresa(empresa: schemas.EmpresaBase, db: Session = Depends(get_db), current_user: security.Principal = Depends(get_current_user)):
     # Nota: Permitimos a cualquier autenticado o restringimos a admin? Asumimos Admin o Consultor
     if current_user.rol == 'CLIENTE': raise HTTPException(403, "No autorizado")
 
@@ -191,26 +368,31 @@ def crear_empresa(empresa: schemas.EmpresaBase, db: Session = Depends(get_db), c
     db.commit()
     db.refresh(db_emp)
     
-    registrar_log(db, current_user, "CREAR", "Empresa", f"Creó empresa {db_emp.razon_social}")
+    cache.empresas.invalidar()
+    registrar_log(current_user, "CREAR", "Empresa", f"Creó empresa {db_emp.razon_social}")
     return db_emp
 
 @app.get("/empresas/", response_model=List[schemas.EmpresaOut], tags=["Empresas"])
-def listar_empresas(db: Session = Depends(get_db)):
-    return db.query(models.Empresa).all()
+async def listar_empresas(db: AsyncSession = Depends(get_async_db)):
+    return (await db.execute(select(models.Empresa))).scalars().all()
 
 @app.delete("/empresas/{id}", tags=["Empresas"])
-def eliminar_empresa(id: int, db: Session = Depends(get_db), current_user: models.Usuario = Depends(solo_admin)):
+def eliminar_empresa(id: int, db: Session = Depends(get_db), current_user: security.Principal = Depends(solo_admin)):
     emp = db.query(models.Empresa).filter(models.Empresa.id == id).first()
     if not emp: raise HTTPException(404, "Empresa no encontrada")
     nombre = emp.razon_social
+    ids_usuarios = [u.id for u in emp.usuarios]
     db.delete(emp)
     db.commit()
+    for uid in ids_usuarios: olvidar_usuario(uid, revocar=True)
     
-    registrar_log(db, current_user, "ELIMINAR", "Empresa", f"Eliminó empresa {nombre}")
+    cache.empresas.invalidar()
+    cache.usuarios.invalidar()  # cascade borra sus usuarios
+    registrar_log(current_user, "ELIMINAR", "Empresa", f"Eliminó empresa {nombre}")
     return {"mensaje": "Empresa eliminada"}
 
 @app.put("/empresas/{id}", response_model=schemas.EmpresaOut, tags=["Empresas"])
-def actualizar_empresa(id: int, empresa_update: schemas.EmpresaBase, db: Session = Depends(get_db), current_user: models.Usuario = Depends(solo_admin)):
+def actualizar_empresa(id: int, empresa_update: schemas.EmpresaBase, db: Session = Depends(get_db), current_user: security.Principal = Depends(solo_admin)):
     db_emp = db.query(models.Empresa).filter(models.Empresa.id == id).first()
     if not db_emp: raise HTTPException(404, detail="Empresa no encontrada")
 
@@ -219,7 +401,8 @@ def actualizar_empresa(id: int, empresa_update: schemas.EmpresaBase, db: Session
     db.commit()
     db.refresh(db_emp)
     
-    registrar_log(db, current_user, "EDITAR", "Empresa", f"Actualizó empresa {db_emp.razon_social}")
+    cache.empresas.invalidar()
+    registrar_log(current_user, "EDITAR", "Empresa", f"Actualizó empresa {db_emp.razon_social}")
     return db_emp
 
 # ==========================================
@@ -227,7 +410,7 @@ def actualizar_empresa(id: int, empresa_update: schemas.EmpresaBase, db: Session
 # ==========================================
 
 @app.post("/areas/", response_model=schemas.AreaOut, tags=["Áreas"])
-def crear_area(area: schemas.AreaCreate, db: Session = Depends(get_db), current_user: models.Usuario = Depends(get_current_user)):
+def crear_area(area: schemas.AreaCreate, db: Session = Depends(get_db), current_user: security.Principal = Depends(get_current_user)):
     if current_user.rol == 'CLIENTE': raise HTTPException(403, "No autorizado")
     
     emp = db.query(models.Empresa).filter(models.Empresa.id == area.empresa_id).first()
@@ -239,31 +422,32 @@ def crear_area(area: schemas.AreaCreate, db: Session = Depends(get_db), current_
     db.refresh(db_area)
     db_area.nombre_empresa = emp.razon_social
     
-    registrar_log(db, current_user, "CREAR", "Área", f"Creó área {db_area.codigo} en {emp.razon_social}")
+    registrar_log(current_user, "CREAR", "Área", f"Creó área {db_area.codigo} en {emp.razon_social}")
     return db_area
 
 @app.get("/areas/", response_model=List[schemas.AreaOut], tags=["Áreas"])
-def listar_areas(empresa_id: int = None, db: Session = Depends(get_db)):
-    query = db.query(models.Area)
+async def listar_areas(empresa_id: int = None, db: AsyncSession = Depends(get_async_db)):
+    # La empresa viene en el mismo SELECT: con AsyncSession no hay carga perezosa
+    query = select(models.Area).options(joinedload(models.Area.empresa))
     if empresa_id: query = query.filter(models.Area.empresa_id == empresa_id)
-    areas = query.all()
+    areas = (await db.execute(query)).scalars().all()
     for a in areas:
         a.nombre_empresa = a.empresa.razon_social if a.empresa else "N/A"
     return areas
 
 @app.delete("/areas/{id}", tags=["Áreas"])
-def eliminar_area(id: int, db: Session = Depends(get_db), current_user: models.Usuario = Depends(solo_admin)):
+def eliminar_area(id: int, db: Session = Depends(get_db), current_user: security.Principal = Depends(solo_admin)):
     area = db.query(models.Area).filter(models.Area.id == id).first()
     if not area: raise HTTPException(404, "Área no encontrada")
     cod = area.codigo
     db.delete(area)
     db.commit()
     
-    registrar_log(db, current_user, "ELIMINAR", "Área", f"Eliminó área {cod}")
+    registrar_log(current_user, "ELIMINAR", "Área", f"Eliminó área {cod}")
     return {"mensaje": "Área eliminada"}
 
 @app.put("/areas/{id}", response_model=schemas.AreaOut, tags=["Áreas"])
-def actualizar_area(id: int, datos: schemas.AreaBase, db: Session = Depends(get_db), current_user: models.Usuario = Depends(solo_admin)):
+def actualizar_area(id: int, datos: schemas.AreaBase, db: Session = Depends(get_db), current_user: security.Principal = Depends(solo_admin)):
     area = db.query(models.Area).filter(models.Area.id == id).first()
     if not area: raise HTTPException(404, "Área no encontrada")
     
@@ -273,7 +457,7 @@ def actualizar_area(id: int, datos: schemas.AreaBase, db: Session = Depends(get_
     db.refresh(area)
     area.nombre_empresa = area.empresa.razon_social if area.empresa else "N/A"
     
-    registrar_log(db, current_user, "EDITAR", "Área", f"Actualizó área {area.codigo}")
+    registrar_log(current_user, "EDITAR", "Área", f"Actualizó área {area.codigo}")
     return area
 
 # ==========================================
@@ -281,7 +465,7 @@ def actualizar_area(id: int, datos: schemas.AreaBase, db: Session = Depends(get_
 # ==========================================
 
 @app.post("/actividades/", response_model=schemas.ActividadOut, tags=["Actividades"])
-def crear_actividad(actividad: schemas.ActividadCreate, db: Session = Depends(get_db), current_user: models.Usuario = Depends(get_current_user)):
+def crear_actividad(actividad: schemas.ActividadCreate, db: Session = Depends(get_db), current_user: security.Principal = Depends(get_current_user)):
     if current_user.rol == 'CLIENTE': raise HTTPException(403, "Clientes no crean actividades")
 
     data = actividad.dict()
@@ -291,59 +475,169 @@ def crear_actividad(actividad: schemas.ActividadCreate, db: Session = Depends(ge
     nueva = models.Actividad(**data)
     db.add(nueva)
     db.commit()
-    db.refresh(nueva)
+    recalculo.recalcular_estados(db, ids=[nueva.id])
     
-    # Mapeo y Logs
-    nueva.nombre_empresa = nueva.empresa_rel.razon_social if nueva.empresa_rel else "N/A"
-    nueva.nombre_area = nueva.area_rel.codigo if nueva.area_rel else "N/A"
-    nueva.nombre_responsable = nueva.responsable_rel.nombre_completo if nueva.responsable_rel else "S/A"
-    nueva.nombre_status = nueva.status_rel.nombre if nueva.status_rel else "Sin Estado"
-    nueva.nombre_origen = nueva.origen_rel.nombre if nueva.origen_rel else ""
+    # Mapeo (una sola consulta con nombres) y Logs
+    nueva = consultas.obtener_con_nombres(db, nueva.id)
+    busqueda.indice.indexar_actividad(nueva)
     
-    registrar_log(db, current_user, "CREAR", "Actividad", f"Creó actividad ID {nueva.id} para {nueva.nombre_empresa}")
+    registrar_log(current_user, "CREAR", "Actividad", f"Creó actividad ID {nueva.id} para {nueva.nombre_empresa}")
     return nueva
 
 @app.get("/actividades/", response_model=List[schemas.ActividadOut], tags=["Actividades"])
-def listar_actividades(
+async def listar_actividades(
+    request: Request,
+    response: Response,
     empresa_id: Optional[int] = None,
     area_id: Optional[int] = None,
     responsable_id: Optional[int] = None,
     status_id: Optional[int] = None,
     fecha_inicio: Optional[date] = None,
     fecha_fin: Optional[date] = None,
+    limit: Optional[int] = Query(None, ge=1, le=5000),
+    after: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    filtros = dict(empresa_id=empresa_id, area_id=area_id, responsable_id=responsable_id,
+                   status_id=status_id, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin)
+    if after:
+        try: consultas.leer_cursor(after)
+        except ValueError: raise HTTPException(400, "Cursor inválido")
+
+    # Modo streaming: una actividad por línea, sin armar la lista en memoria
+    if "application/x-ndjson" in request.headers.get("accept", ""):
+        return StreamingResponse(consultas.stream_ndjson(filtros, limit, after), media_type="application/x-ndjson")
+
+    query = consultas.filtrar_actividades(consultas.select_actividades(), **filtros)
+    if limit is None and after is None:
+        return [consultas.mapear_nombres(act) for act in (await db.execute(query)).scalars().all()]
+
+    # Modo paginado: orden (fecha_compromiso, id) y cursor de la siguiente página en cabecera
+    actividades = (await db.execute(consultas.paginar_keyset(query, limit, after))).scalars().all()
+    if limit and len(actividades) == limit:
+        response.headers["X-Next-Cursor"] = consultas.crear_cursor(actividades[-1])
+    return [consultas.mapear_nombres(act) for act in actividades]
+
+@app.get("/actividades/resumen", response_model=schemas.ResumenActividades, tags=["Actividades"])
+def resumen_actividades(
+    empresa_id: Optional[int] = None,
+    area_id: Optional[int] = None,
+    responsable_id: Optional[int] = None,
+    status_id: Optional[int] = None,
+    fecha_inicio: Optional[date] = None,
+    fecha_fin: Optional[date] = None,
+    desglose: bool = True,
     db: Session = Depends(get_db)
 ):
-    query = db.query(models.Actividad)
-    if empresa_id: query = query.filter(models.Actividad.empresa_id == empresa_id)
-    if area_id: query = query.filter(models.Actividad.area_id == area_id)
-    if responsable_id: query = query.filter(models.Actividad.responsable_id == responsable_id)
-    if status_id: query = query.filter(models.Actividad.status_id == status_id)
-    if fecha_inicio: query = query.filter(models.Actividad.fecha_compromiso >= fecha_inicio)
-    if fecha_fin: query = query.filter(models.Actividad.fecha_compromiso <= fecha_fin)
-    
-    actividades = query.all()
-    for act in actividades:
-        act.nombre_empresa = act.empresa_rel.razon_social if act.empresa_rel else "N/A"
-        act.nombre_area = act.area_rel.codigo if act.area_rel else "N/A"
-        act.nombre_responsable = act.responsable_rel.nombre_completo if act.responsable_rel else "S/A"
-        act.nombre_status = act.status_rel.nombre if act.status_rel else "Sin Estado"
-        act.nombre_origen = act.origen_rel.nombre if act.origen_rel else ""
-        act.nombre_tipo_req = act.tipo_req_rel.nombre if act.tipo_req_rel else ""
-    return actividades
+    filtros = dict(empresa_id=empresa_id, area_id=area_id, responsable_id=responsable_id,
+                   status_id=status_id, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin)
+    return consultas.resumen_kpis(db, filtros, desglose)
+
+@app.get("/actividades/export.xlsx", tags=["Actividades"])
+def exportar_excel(
+    empresa_id: Optional[int] = None,
+    area_id: Optional[int] = None,
+    responsable_id: Optional[int] = None,
+    status_id: Optional[int] = None,
+    fecha_inicio: Optional[date] = None,
+    fecha_fin: Optional[date] = None,
+    current_user: security.Principal = Depends(get_current_user)
+):
+    empresa_id = empresa_del_cliente(current_user) or empresa_id
+    filtros = dict(empresa_id=empresa_id, area_id=area_id, responsable_id=responsable_id,
+                   status_id=status_id, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin)
+    nombre = f"Reporte_SIVIACK_{date.today().isoformat()}.xlsx"
+    return StreamingResponse(
+        reportes.stream_xlsx(filtros),
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        headers={"Content-Disposition": f'attachment; filename="{nombre}"'},
+    )
+
+@app.get("/actividades/export.pdf", tags=["Actividades"])
+def exportar_pdf(
+    empresa_id: Optional[int] = None,
+    area_id: Optional[int] = None,
+    responsable_id: Optional[int] = None,
+    status_id: Optional[int] = None,
+    fecha_inicio: Optional[date] = None,
+    fecha_fin: Optional[date] = None,
+    current_user: security.Principal = Depends(get_current_user)
+):
+    empresa_id = empresa_del_cliente(current_user) or empresa_id
+    filtros = dict(empresa_id=empresa_id, area_id=area_id, responsable_id=responsable_id,
+                   status_id=status_id, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin)
+    nombre = f"Reporte_SIVIACK_{date.today().isoformat()}.pdf"
+    return StreamingResponse(
+        reportes.stream_pdf(filtros, current_user.email),
+        media_type="application/pdf",
+        headers={"Content-Disposition": f'attachment; filename="{nombre}"'},
+    )
+
+@app.get("/actividades/cambios", response_model=schemas.CambiosActividades, tags=["Actividades"])
+def cambios_actividades(
+    desde: Optional[str] = None,
+    empresa_id: Optional[int] = None,
+    area_id: Optional[int] = None,
+    responsable_id: Optional[int] = None,
+    status_id: Optional[int] = None,
+    fecha_inicio: Optional[date] = None,
+    fecha_fin: Optional[date] = None,
+    hasta: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: security.Principal = Depends(get_current_user)
+):
+    """Sin 'desde' solo devuelve el token actual: pedirlo ANTES de descargar la lista completa.
+    Con los filtros del listado y 'hasta' (cursor de la última fila cargada) cada cambio se
+    clasifica por pertenencia a la ventana: 'actualizadas' van a la lista (nuevas incluidas)
+    y 'fuera_de_vista' se quitan. Con más de consultas.LIMITE_CAMBIOS cambios responde
+    'resync': el cliente recarga la lista con el token devuelto. Un CLIENTE solo recibe
+    las actividades de su empresa."""
+    empresa_cliente = empresa_del_cliente(current_user)
+    empresa_id = empresa_cliente or empresa_id
+    token = consultas.token_cambios(db)
+    if not desde:
+        return {"token": token, "actualizadas": [], "eliminadas": []}
+    try: marca = consultas.leer_token(desde)
+    except ValueError: raise HTTPException(400, "Token inválido")
+    if hasta:
+        try: consultas.leer_cursor(hasta)
+        except ValueError: raise HTTPException(400, "Cursor inválido")
+
+    filtros = dict(empresa_id=empresa_id, area_id=area_id, responsable_id=responsable_id,
+                   status_id=status_id, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin)
+    cambios = consultas.cambios_actividades(db, marca, consultas.leer_token(token), empresa_id=empresa_cliente)
+    if cambios is None:
+        return {"token": token, "resync": True, "actualizadas": [], "eliminadas": []}
+    actualizadas, eliminadas = cambios
+    en_vista = consultas.ids_en_vista(db, [act.id for act in actualizadas], filtros, hasta)
+    return {
+        "token": token,
+        "actualizadas": [act for act in actualizadas if act.id in en_vista],
+        "fuera_de_vista": [act.id for act in actualizadas if act.id not in en_vista],
+        "eliminadas": eliminadas,
+    }
+
+@app.get("/actividades/buscar", response_model=List[schemas.ActividadBusqueda], tags=["Actividades"])
+def buscar_actividades(
+    q: str,
+    empresa_id: Optional[int] = None,
+    area_id: Optional[int] = None,
+    responsable_id: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+    current_user: security.Principal = Depends(get_current_user)
+):
+    empresa_id = empresa_del_cliente(current_user) or empresa_id
+    return busqueda.buscar_actividades(db, q, empresa_id, area_id, responsable_id, limit)
 
 @app.get("/actividades/{id}", response_model=schemas.ActividadOut, tags=["Actividades"])
 def obtener_actividad(id: int, db: Session = Depends(get_db)):
-    act = db.query(models.Actividad).filter(models.Actividad.id == id).first()
+    act = consultas.obtener_con_nombres(db, id)
     if not act: raise HTTPException(404, "Actividad no encontrada")
-    
-    act.nombre_empresa = act.empresa_rel.razon_social if act.empresa_rel else "N/A"
-    act.nombre_area = act.area_rel.codigo if act.area_rel else "N/A"
-    act.nombre_responsable = act.responsable_rel.nombre_completo if act.responsable_rel else "S/A"
-    act.nombre_status = act.status_rel.nombre if act.status_rel else "Sin Estado"
     return act
 
 @app.put("/actividades/{id}", response_model=schemas.ActividadOut, tags=["Actividades"])
-def actualizar_actividad(id: int, cambios: schemas.ActividadUpdate, db: Session = Depends(get_db), current_user: models.Usuario = Depends(get_current_user)):
+def actualizar_actividad(id: int, cambios: schemas.ActividadUpdate, db: Session = Depends(get_db), current_user: security.Principal = Depends(get_current_user)):
     if current_user.rol == 'CLIENTE': raise HTTPException(403, "No autorizado")
     
     act = db.query(models.Actividad).filter(models.Actividad.id == id).first()
@@ -354,57 +648,49 @@ def actualizar_actividad(id: int, cambios: schemas.ActividadUpdate, db: Session
         setattr(act, key, value)
     
     db.commit()
-    db.refresh(act)
-    
-    act.nombre_empresa = act.empresa_rel.razon_social if act.empresa_rel else "N/A"
-    act.nombre_area = act.area_rel.codigo if act.area_rel else "N/A"
-    act.nombre_responsable = act.responsable_rel.nombre_completo if act.responsable_rel else "S/A"
-    act.nombre_status = act.status_rel.nombre if act.status_rel else "Sin Estado"
+    recalculo.recalcular_estados(db, ids=[id])
+    act = consultas.obtener_con_nombres(db, id)
+    busqueda.indice.indexar_actividad(act)
     
-    registrar_log(db, current_user, "EDITAR", "Actividad", f"Actualizó actividad ID {id}")
+    registrar_log(current_user, "EDITAR", "Actividad", f"Actualizó actividad ID {id}")
     return act
 
+@app.post("/actividades/recalcular", tags=["Actividades"])
+def recalcular_actividades(db: Session = Depends(get_db), admin: security.Principal = Depends(solo_admin)):
+    cambios = recalculo.recalcular_estados(db)
+    registrar_log(admin, "EDITAR", "Actividad", f"Recalculó estados: {cambios}")
+    return {"mensaje": "Estados recalculados", "cambios": cambios}
+
 @app.get("/mis-pendientes/", response_model=List[schemas.ActividadOut], tags=["Actividades"])
-def listar_mis_pendientes(db: Session = Depends(get_db), current_user: models.Usuario = Depends(get_current_user)):
-    query = db.query(models.Actividad).filter(models.Actividad.condicion_actual == 'Abierta')
-    if current_user.rol == 'CONSULTOR':
-        query = query.filter(models.Actividad.responsable_id == current_user.id)
-    
-    actividades = query.all()
-    for act in actividades:
-        act.nombre_empresa = act.empresa_rel.razon_social if act.empresa_rel else "N/A"
-        act.nombre_area = act.area_rel.codigo if act.area_rel else "N/A"
-        act.nombre_responsable = act.responsable_rel.nombre_completo if act.responsable_rel else "S/A"
-        act.nombre_status = act.status_rel.nombre if act.status_rel else "Sin Estado"
-    return actividades
+async def listar_mis_pendientes(db: AsyncSession = Depends(get_async_db), current_user: security.Principal = Depends(get_current_user_async)):
+    responsable_id = current_user.id if current_user.rol == 'CONSULTOR' else None
+    query = consultas.filtrar_pendientes(consultas.select_actividades(), responsable_id)
+    return [consultas.mapear_nombres(act) for act in (await db.execute(query)).scalars().all()]
 
 # ==========================================
 # MAESTROS Y CATÁLOGOS
 # ==========================================
-CATALOGOS_MAP = {
-    "origenes": models.OrigenRequerimiento,
-    "tipos_req": models.TipoRequerimiento,
-    "servicios": models.TipoServicio,
-    "intervenciones": models.TipoIntervencion,
-    "medios": models.MedioControl,
-    "resultados": models.ControlResultados,
-    "status": models.StatusActividad
-}
+CATALOGOS_MAP = catalogos.CATALOGOS_MAP  # Misma lista que sincroniza catalogos.json
+
+def serializar_listas(db: Session) -> bytes:
+    listas = {nombre: db.query(modelo).all() for nombre, modelo in CATALOGOS_MAP.items()}
+    return schemas.ListasDesplegables.model_validate(listas).model_dump_json().encode("utf-8")
+
+async def serializar_listas_async(db: AsyncSession) -> bytes:
+    listas = {nombre: (await db.execute(select(modelo))).scalars().all() for nombre, modelo in CATALOGOS_MAP.items()}
+    return schemas.ListasDesplegables.model_validate(listas).model_dump_json().encode("utf-8")
 
 @app.get("/config/listas", response_model=schemas.ListasDesplegables, tags=["Configuración"])
-def obtener_listas_desplegables(db: Session = Depends(get_db)):
-    return {
-        "origenes": db.query(models.OrigenRequerimiento).all(),
-        "tipos_req": db.query(models.TipoRequerimiento).all(),
-        "servicios": db.query(models.TipoServicio).all(),
-        "intervenciones": db.query(models.TipoIntervencion).all(), 
-        "medios": db.query(models.MedioControl).all(),
-        "resultados": db.query(models.ControlResultados).all(),
-        "status": db.query(models.StatusActividad).all()
-    }
+async def obtener_listas_desplegables(request: Request, db: AsyncSession = Depends(get_async_db)):
+    # Copia serializada en memoria: las cargas repetidas no tocan la BD
+    cuerpo, etag = await cache.listas.obtener_async(lambda: serializar_listas_async(db))
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if cache.coincide_etag(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cuerpo, media_type="application/json", headers=headers)
 
 @app.post("/config/catalogo/{nombre_cat}", tags=["Configuración"])
-def crear_item_catalogo(nombre_cat: str, item: schemas.CatalogoBase, db: Session = Depends(get_db), current_user: models.Usuario = Depends(solo_admin)):
+def crear_item_catalogo(nombre_cat: str, item: schemas.CatalogoBase, db: Session = Depends(get_db), current_user: security.Principal = Depends(solo_admin)):
     modelo = CATALOGOS_MAP.get(nombre_cat)
     if not modelo: raise HTTPException(404, "Catálogo no encontrado")
     if db.query(modelo).filter(modelo.nombre == item.nombre).first():
@@ -413,12 +699,13 @@ def crear_item_catalogo(nombre_cat: str, item: schemas.CatalogoBase, db: Session
     nuevo = modelo(nombre=item.nombre)
     db.add(nuevo)
     db.commit()
+    cache.listas.invalidar()
     
-    registrar_log(db, current_user, "CREAR", "Catálogo", f"Agregó '{item.nombre}' a {nombre_cat}")
+    registrar_log(current_user, "CREAR", "Catálogo", f"Agregó '{item.nombre}' a {nombre_cat}")
     return {"mensaje": "Item creado"}
 
 @app.delete("/config/catalogo/{nombre_cat}/{id}", tags=["Configuración"])
-def eliminar_item_catalogo(nombre_cat: str, id: int, db: Session = Depends(get_db), current_user: models.Usuario = Depends(solo_admin)):
+def eliminar_item_catalogo(nombre_cat: str, id: int, db: Session = Depends(get_db), current_user: security.Principal = Depends(solo_admin)):
     modelo = CATALOGOS_MAP.get(nombre_cat)
     if not modelo: raise HTTPException(404, "Catálogo no encontrado")
     item = db.query(modelo).filter(modelo.id == id).first()
@@ -428,8 +715,105 @@ def eliminar_item_catalogo(nombre_cat: str, id: int, db: Session = Depends(get_d
         nom = item.nombre
         db.delete(item)
         db.commit()
-        registrar_log(db, current_user, "ELIMINAR", "Catálogo", f"Eliminó '{nom}' de {nombre_cat}")
+        cache.listas.invalidar()
+        registrar_log(current_user, "ELIMINAR", "Catálogo", f"Eliminó '{nom}' de {nombre_cat}")
     except:
         raise HTTPException(400, "No se puede eliminar: En uso")
         
-    return {"mensaje": "Item eliminado"}
\ No newline at end of file
+    return {"mensaje": "Item eliminado"}
+# ==========================================
+# IMPORTACIÓN SCP (EN SEGUNDO PLANO)
+# ==========================================
+BYTES_POR_LECTURA = 1024 * 1024
+
+@app.post("/import/scp", response_model=schemas.TrabajoImportacion, status_code=202, tags=["Importación"])
+async def importar_scp(
+    archivo: UploadFile = File(...),
+    empresa_id: Optional[int] = Form(None),
+    db: AsyncSession = Depends(get_async_db),
+    admin: security.Principal = Depends(solo_admin)
+):
+    if not (archivo.filename or "").lower().endswith(".xlsx"):
+        raise HTTPException(400, "Solo se aceptan libros .xlsx")
+    # Se valida antes de copiar el libro (el trabajo fallaría recién en segundo plano)
+    if empresa_id is not None and not await db.get(models.Empresa, empresa_id):
+        raise HTTPException(404, "Empresa no encontrada")
+
+    # Se copia a disco por partes: el libro nunca queda entero en memoria
+    fd, ruta = tempfile.mkstemp(prefix="scp_", suffix=".xlsx")
+    try:
+        with os.fdopen(fd, "wb") as destino:
+            while bloque := await archivo.read(BYTES_POR_LECTURA):
+                await run_in_threadpool(destino.write, bloque)
+    except Exception:
+        os.remove(ruta)
+        raise
+
+    trabajo = importaciones.encolar(ruta, archivo.filename, empresa_id, admin.nombre_completo)
+    registrar_log(admin, "IMPORTAR", "Actividad", f"Subió {archivo.filename} (trabajo {trabajo.id})")
+    return trabajo
+
+@app.get("/import/jobs/{id}", response_model=schemas.TrabajoImportacion, tags=["Importación"])
+def estado_importacion(id: str, admin: security.Principal = Depends(solo_admin)):
+    trabajo = importaciones.obtener(id)
+    if not trabajo: raise HTTPException(404, "Trabajo no encontrado")
+    return trabajo
+
+# ==========================================
+# BOOTSTRAP (CARGA INICIAL DEL DASHBOARD)
+# ==========================================
+ROLES_ASIGNABLES = ["CONSULTOR", "ADMIN"]
+TAMANO_PAGINA_BOOTSTRAP = 100
+
+def serializar_empresas(db: Session) -> bytes:
+    empresas = [schemas.EmpresaOut.model_validate(e) for e in db.query(models.Empresa).all()]
+    return ("[" + ",".join(e.model_dump_json() for e in empresas) + "]").encode("utf-8")
+
+def serializar_usuarios_asignables(db: Session) -> bytes:
+    usuarios = db.query(models.Usuario).filter(models.Usuario.rol.in_(ROLES_ASIGNABLES)).all()
+    return ("[" + ",".join(schemas.UsuarioOut.model_validate(u).model_dump_json() for u in usuarios) + "]").encode("utf-8")
+
+def leer_versiones(versiones: Optional[str]) -> dict:
+    """'listas=abc,empresas=def' -> {'listas': 'abc', 'empresas': 'def'}"""
+    conocidas = {}
+    for par in (versiones or "").split(","):
+        if "=" in par:
+            parte, version = par.split("=", 1)
+            conocidas[parte.strip()] = version.strip()
+    return conocidas
+
+@app.get("/bootstrap", response_model=schemas.BootstrapOut, tags=["General"])
+def bootstrap(versiones: Optional[str] = None, db: Session = Depends(get_db), current_user: security.Principal = Depends(get_current_user)):
+    """Todo lo que el Dashboard necesita al abrir, en una sola respuesta.
+    Las partes cuya versión ya tiene el cliente se devuelven como null."""
+    conocidas = leer_versiones(versiones)
+    token_cambios = consultas.token_cambios(db)  # Antes de leer la página: no se pierde nada
+    partes_cacheadas = {
+        "listas": cache.listas.obtener(lambda: serializar_listas(db)),
+        "empresas": cache.empresas.obtener(lambda: serializar_empresas(db)),
+        "usuarios": cache.usuarios.obtener(lambda: serializar_usuarios_asignables(db)),
+    }
+
+    # Un cliente solo ve las actividades de su empresa; sin empresa asignada no ve ninguna
+    filtros, query = {}, consultas.query_actividades(db)
+    empresa_cliente = empresa_del_cliente(current_user)
+    if empresa_cliente is not None:
+        filtros = {"empresa_id": empresa_cliente}
+        query = query.filter(models.Actividad.empresa_id == empresa_cliente)
+    pagina = consultas.paginar_keyset(query, limit=TAMANO_PAGINA_BOOTSTRAP).all()
+    dinamico = schemas.BootstrapOut(
+        usuario=schemas.UsuarioSesion.model_validate(current_user),
+        actividades=[consultas.mapear_nombres(act) for act in pagina],
+        siguiente_cursor=consultas.crear_cursor(pagina[-1]) if len(pagina) == TAMANO_PAGINA_BOOTSTRAP else None,
+        token_cambios=token_cambios,
+        resumen=consultas.resumen_kpis(db, filtros, desglose=False),
+    ).model_dump_json(include={"usuario", "actividades", "siguiente_cursor", "token_cambios", "resumen"})
+
+    # Se arma el JSON pegando los cuerpos ya serializados de la caché
+    versiones_actuales = {parte: etag.strip('"') for parte, (_, etag) in partes_cacheadas.items()}
+    fragmentos = [b'"versiones":' + json.dumps(versiones_actuales).encode("utf-8")]
+    for parte, (cuerpo, _) in partes_cacheadas.items():
+        sin_cambios = conocidas.get(parte) == versiones_actuales[parte]
+        fragmentos.append(f'"{parte}":'.encode("utf-8") + (b"null" if sin_cambios else cuerpo))
+    cuerpo = b"{" + b",".join(fragmentos) + b"," + dinamico[1:].encode("utf-8")
+    return Response(content=cuerpo, media_type="application/json")
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import date, datetime
 
 # --- 1. SEGURIDAD Y USUARIOS ---
@@ -115,6 +115,7 @@ class ActividadUpdate(ActividadBase):
 
 class ActividadOut(ActividadBase):
     id: int
+    updated_at: Optional[datetime] = None
     origin_date: Optional[date] = None
     created_at: Optional[datetime] = None
     
@@ -123,10 +124,71 @@ class ActividadOut(ActividadBase):
     nombre_area: str
     nombre_responsable: Optional[str] = None
     nombre_status: Optional[str] = None
+    nombre_origen: Optional[str] = None
+    nombre_tipo_req: Optional[str] = None
 
     class Config:
         from_attributes = True
 
+class ActividadBusqueda(ActividadOut):
+    puntaje: float = 0.0
+
+# --- RESUMEN KPIs ---
+class ConteoGrupo(BaseModel):
+    id: Optional[int] = None
+    nombre: str
+    total: int
+
+class DesgloseKPI(BaseModel):
+    id: Optional[int] = None
+    nombre: str
+    total: int
+    cerradas: int
+    atrasadas: int
+
+class ResumenActividades(BaseModel):
+    total: int
+    cerradas: int
+    atrasadas: int
+    cumplimiento: int
+    por_status: List[ConteoGrupo]
+    por_condicion: List[ConteoGrupo]
+    por_prioridad: List[ConteoGrupo]
+    por_empresa: List[DesgloseKPI]
+    por_area: List[DesgloseKPI]
+    por_responsable: List[DesgloseKPI]
+
+# --- DELTA-SYNC ---
+class CambiosActividades(BaseModel):
+    token: str
+    actualizadas: List[ActividadOut]   # Insertadas o editadas que caen en la vista del cliente
+    fuera_de_vista: List[int] = []     # Editadas que ya no cumplen los filtros o la ventana cargada
+    eliminadas: List[int]
+    resync: bool = False               # Demasiados cambios: recargar la lista con este token
+
+# --- BOOTSTRAP DEL DASHBOARD ---
+class UsuarioSesion(BaseModel):
+    id: int
+    nombre_completo: Optional[str] = None
+    email: str
+    rol: str
+    empresa_id: Optional[int] = None
+    class Config:
+        from_attributes = True
+
+class BootstrapOut(BaseModel):
+    # Partes versionadas: null si el cliente ya tiene esa versión
+    versiones: Dict[str, str] = {}
+    listas: Optional[ListasDesplegables] = None
+    empresas: Optional[List[EmpresaOut]] = None
+    usuarios: Optional[List[UsuarioOut]] = None
+    # Partes que siempre viajan
+    usuario: UsuarioSesion
+    actividades: List[ActividadOut]
+    siguiente_cursor: Optional[str] = None
+    token_cambios: str = ""
+    resumen: ResumenActividades
+
 # --- AUDITORÍA ---
 class AuditLogOut(BaseModel):
     id: int
@@ -137,5 +199,30 @@ class AuditLogOut(BaseModel):
     entidad: str
     detalle: Optional[str] = None
 
+    class Config:
+        from_attributes = True
+
+class ConteoAuditoria(BaseModel):
+    dia: date
+    entidad: Optional[str] = None
+    total: int
+
+# --- IMPORTACIONES ---
+class TrabajoImportacion(BaseModel):
+    id: str
+    nombre_archivo: str
+    empresa_id: Optional[int] = None
+    estado: str                  # EN_COLA, EN_PROCESO, COMPLETADO, ERROR
+    filas_leidas: int
+    filas_por_segundo: float
+    rechazadas: int
+    insertadas: int
+    actualizadas: int
+    sin_cambios: int
+    error: Optional[str] = None
+    creado_en: datetime
+    iniciado_en: Optional[datetime] = None
+    terminado_en: Optional[datetime] = None
+
     class Config:
         from_attributes = True
\ No newline at end of file
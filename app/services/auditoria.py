@@ -0,0 +1,297 @@
+import glob
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import insert, func, or_, and_, Date
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+from sqlalchemy.orm import Session
+from app.core.bloqueos import tomar_bloqueo
+from app.db.database import SessionLocal
+from app.db import models
+
+# ---------------------------------------------------------------------
+# CONFIGURACIÓN
+# ---------------------------------------------------------------------
+# Los eventos de auditoría no se escriben en el request: se encolan en memoria
+# y un hilo los inserta por lotes (INSERT de varias filas) cada INTERVALO_SEGUNDOS
+# o al juntar TAMANO_LOTE. Con SIVIACK_AUDIT_SPOOL definido, cada evento se anota
+# antes en un archivo JSONL para que un corte no los pierda: cada proceso escribe el
+# suyo (SIVIACK_AUDIT_SPOOL.<pid>) y al arrancar reenvía los de procesos que ya no están.
+TAMANO_LOTE = 500
+INTERVALO_SEGUNDOS = 1.0
+FILAS_POR_INSERT = 300          # 6 parámetros por fila: bajo el límite de 2100 de SQL Server
+MAX_EN_MEMORIA = 100_000        # Si la BD no responde por mucho tiempo, se descartan los más viejos
+ARCHIVO_SPOOL = os.getenv("SIVIACK_AUDIT_SPOOL")  # None = sin spool
+
+def evento(usuario_obj, accion: str, entidad: str, detalle: str) -> dict:
+    # Si usuario_obj es None (ej: Login fallido o sistema), manejamos string o null
+    return {
+        "fecha": datetime.now().astimezone(),  # Hora del evento, no la del flush
+        "usuario": usuario_obj.nombre_completo if usuario_obj else "Sistema/Anon",
+        "rol": usuario_obj.rol if usuario_obj else "N/A",
+        "accion": accion,
+        "entidad": entidad,
+        "detalle": detalle,
+    }
+
+def _a_json(ev: dict) -> str:
+    return json.dumps({**ev, "fecha": ev["fecha"].isoformat()}, ensure_ascii=False)
+
+def _de_json(linea: str) -> dict:
+    ev = json.loads(linea)
+    ev["fecha"] = datetime.fromisoformat(ev["fecha"])
+    return ev
+
+def insertar_lote(db, eventos):
+    """Inserta 'eventos' con INSERTs multi-fila y hace un solo commit"""
+    for i in range(0, len(eventos), FILAS_POR_INSERT):
+        db.execute(insert(models.AuditLog).values(eventos[i:i + FILAS_POR_INSERT]))
+    db.commit()
+
+class EscritorAuditoria:
+    def __init__(self, archivo_spool: str = None):
+        self.archivo_spool = archivo_spool   # Base: el del proceso es <archivo_spool>.<pid>
+        self._archivo = None
+        self._bloqueo = None
+        self._pendientes = []       # Eventos aún no insertados
+        self._segmentos = []        # Archivos de spool cuyos eventos están en _pendientes
+        self._cond = threading.Condition()
+        self._spool = None
+        self._hilo = None
+        self._activo = False
+        self.insertados = 0
+        self.descartados = 0
+        self.ilegibles = 0          # Líneas del spool que no se pudieron leer (corte a mitad de línea)
+
+    # --- Productores (requests) ---
+    def registrar(self, ev: dict):
+        with self._cond:
+            if self._spool is not None:
+                self._spool.write(_a_json(ev) + "\n")
+                self._spool.flush()
+            self._pendientes.append(ev)
+            if len(self._pendientes) > MAX_EN_MEMORIA:
+                sobran = len(self._pendientes) - MAX_EN_MEMORIA
+                del self._pendientes[:sobran]
+                self.descartados += sobran
+            if len(self._pendientes) >= TAMANO_LOTE:
+                self._cond.notify()
+            if self._hilo is None:
+                # Sin hilo (scripts, tests): se escribe en el acto
+                self._vaciar_locked()
+
+    # --- Consumidor ---
+    def _tomar_lote(self):
+        """Saca lo pendiente y rota el spool: el segmento rotado contiene exactamente esos eventos"""
+        lote, self._pendientes = self._pendientes, []
+        if self._spool is not None and lote:
+            self._spool.close()
+            segmento = f"{self._archivo}.{time.time_ns()}.enviando"
+            os.replace(self._archivo, segmento)
+            self._segmentos.append(segmento)
+            self._spool = open(self._archivo, "a", encoding="utf-8")
+        return lote
+
+    def _insertar(self, lote) -> bool:
+        db = SessionLocal()
+        try:
+            insertar_lote(db, lote)
+            self.insertados += len(lote)
+            return True
+        except Exception as e:
+            db.rollback()
+            print(f"Error guardando logs ({len(lote)} eventos, se reintenta): {e}")
+            return False
+        finally:
+            db.close()
+
+    def _vaciar_locked(self):
+        lote = self._tomar_lote()
+        if not lote: return
+        segmentos, self._segmentos = self._segmentos, []
+        if self._insertar(lote):
+            for segmento in segmentos:
+                os.remove(segmento)
+        else:
+            # Vuelven al frente de la cola junto con sus segmentos de spool
+            self._pendientes[:0] = lote
+            self._segmentos[:0] = segmentos
+
+    def vaciar(self):
+        with self._cond:
+            self._vaciar_locked()
+
+    def _ciclo(self):
+        while True:
+            with self._cond:
+                if self._activo and len(self._pendientes) < TAMANO_LOTE:
+                    self._cond.wait(INTERVALO_SEGUNDOS)
+                lote = self._tomar_lote()
+                segmentos, self._segmentos = self._segmentos, []
+                activo = self._activo
+            # La inserción va fuera del lock: los requests siguen encolando mientras tanto
+            if lote and self._insertar(lote):
+                for segmento in segmentos:
+                    os.remove(segmento)
+            elif lote:
+                with self._cond:
+                    self._pendientes[:0] = lote
+                    self._segmentos[:0] = segmentos
+                time.sleep(INTERVALO_SEGUNDOS)
+            if not activo:
+                return
+
+    # --- Ciclo de vida ---
+    def _reclamar(self, dueno: str, archivos=None):
+        """Pasa el spool y los segmentos de 'dueno' a segmentos propios. Es un rename
+        atómico: si otro proceso ya los reclamó, el archivo no está y se salta."""
+        reclamados = []
+        if archivos is None:
+            archivos = sorted(glob.glob(f"{glob.escape(dueno)}.*.enviando")) + [dueno]
+        for archivo in archivos:
+            segmento = f"{self._archivo}.{time.time_ns()}.enviando"
+            try:
+                os.replace(archivo, segmento)
+            except FileNotFoundError:
+                continue
+            reclamados.append(segmento)
+        return reclamados
+
+    def _leer_segmento(self, archivo: str):
+        """Eventos del segmento; una línea ilegible (p. ej. cortada por un kill -9) se
+        informa, se cuenta y se salta, sin impedir el arranque"""
+        eventos = []
+        with open(archivo, encoding="utf-8", errors="replace") as f:
+            for numero, linea in enumerate(f, 1):
+                if not linea.strip(): continue
+                try:
+                    eventos.append(_de_json(linea))
+                except (ValueError, KeyError, TypeError) as e:
+                    self.ilegibles += 1
+                    print(f"⚠️ Auditoría: línea {numero} de {archivo} ilegible, se descarta: {e}")
+        return eventos
+
+    def _recuperar_spool(self):
+        """Reenvía lo que quedó en disco de procesos anteriores (corte, kill -9). Cada proceso
+        mantiene bloqueado su spool mientras vive: solo se reclaman los de bloqueo libre."""
+        archivos = self._reclamar(self._archivo)   # Mismo pid en una ejecución anterior
+        # Spool compartido de versiones anteriores (<archivo_spool> y <archivo_spool>.<ns>.enviando)
+        anteriores = re.compile(re.escape(self.archivo_spool) + r"\.\d+\.enviando")
+        archivos += self._reclamar(self.archivo_spool, sorted(
+            a for a in glob.glob(f"{glob.escape(self.archivo_spool)}.*.enviando") if anteriores.fullmatch(a)
+        ) + [self.archivo_spool])
+        for ruta in sorted(glob.glob(f"{glob.escape(self.archivo_spool)}.*.lock")):
+            dueno = ruta[:-len(".lock")]
+            if dueno == self._archivo: continue
+            bloqueo = tomar_bloqueo(ruta)
+            if bloqueo is None: continue   # Proceso vivo
+            try:
+                # Si el archivo de bloqueo se borró y recreó mientras tanto, es de otro proceso
+                if os.path.exists(ruta) and os.path.samestat(os.fstat(bloqueo.fileno()), os.stat(ruta)):
+                    archivos += self._reclamar(dueno)
+                    try:
+                        os.remove(ruta)
+                    except OSError:
+                        pass   # Windows no borra un archivo abierto: queda para el próximo arranque
+            finally:
+                bloqueo.close()
+        for archivo in archivos:
+            self._pendientes.extend(self._leer_segmento(archivo))
+            self._segmentos.append(archivo)
+        if archivos:
+            print(f"📝 Auditoría: {len(self._pendientes)} eventos recuperados del spool")
+
+    def iniciar(self):
+        with self._cond:
+            if self._hilo is not None: return
+            if self.archivo_spool:
+                # El pid se toma al arrancar, no al importar (los workers pueden venir de un fork)
+                self._archivo = f"{self.archivo_spool}.{os.getpid()}"
+                self._bloqueo = tomar_bloqueo(self._archivo + ".lock")
+                self._recuperar_spool()
+                self._spool = open(self._archivo, "a", encoding="utf-8")
+            self._activo = True
+            self._hilo = threading.Thread(target=self._ciclo, name="escritor-auditoria", daemon=True)
+            self._hilo.start()
+
+    def detener(self, timeout: float = 10):
+        """Corta el hilo tras un último flush (apagado ordenado)"""
+        with self._cond:
+            if self._hilo is None: return
+            self._activo = False
+            self._cond.notify()
+        self._hilo.join(timeout)
+        with self._cond:
+            self._hilo = None
+            self._vaciar_locked()  # Por si el último intento falló
+            if self._spool is not None:
+                self._spool.close()
+                self._spool = None
+                if not self._pendientes:   # Todo enviado: el spool quedó vacío
+                    os.remove(self._archivo)
+            if self._bloqueo is not None:
+                self._bloqueo.close()
+                self._bloqueo = None
+                if not self._pendientes:
+                    os.remove(self._archivo + ".lock")
+
+escritor = EscritorAuditoria(ARCHIVO_SPOOL)
+
+def registrar(usuario_obj, accion: str, entidad: str, detalle: str):
+    escritor.registrar(evento(usuario_obj, accion, entidad, detalle))
+
+# ---------------------------------------------------------------------
+# CONSULTA (FILTROS, PÁGINAS KEYSET E HISTOGRAMA)
+# ---------------------------------------------------------------------
+def filtrar_logs(query, usuario=None, rol=None, accion=None, entidad=None, desde=None, hasta=None):
+    L = models.AuditLog
+    if usuario: query = query.filter(L.usuario == usuario)
+    if rol: query = query.filter(L.rol == rol)
+    if accion: query = query.filter(L.accion == accion)
+    if entidad: query = query.filter(L.entidad == entidad)
+    if desde: query = query.filter(L.fecha >= desde)
+    if hasta: query = query.filter(L.fecha < hasta)
+    return query
+
+def crear_cursor(log):
+    """Cursor opaco 'fecha-iso_id' del último evento entregado"""
+    return f"{log.fecha.isoformat()}_{log.id}"
+
+def leer_cursor(cursor: str):
+    """Devuelve (fecha, id) o lanza ValueError si el cursor no es válido"""
+    fecha_txt, id_txt = cursor.rsplit("_", 1)
+    return datetime.fromisoformat(fecha_txt), int(id_txt)
+
+def paginar_logs(query, limit: int, after: str = None):
+    """Más recientes primero: orden (fecha, id) descendente y continúa después del cursor"""
+    L = models.AuditLog
+    query = query.order_by(L.fecha.desc(), L.id.desc())
+    if after:
+        fecha, ultimo_id = leer_cursor(after)
+        query = query.filter(or_(L.fecha < fecha, and_(L.fecha == fecha, L.id < ultimo_id)))
+    return query.limit(limit)
+
+class dia_de(FunctionElement):
+    """Fecha (sin hora) de un DATETIME"""
+    type = Date()
+    inherit_cache = True
+
+@compiles(dia_de)
+def _dia_de_default(element, compiler, **kw):
+    return f"CAST({compiler.process(list(element.clauses)[0], **kw)} AS DATE)"
+
+@compiles(dia_de, "sqlite")
+def _dia_de_sqlite(element, compiler, **kw):
+    return f"date({compiler.process(list(element.clauses)[0], **kw)})"
+
+def histograma(db: Session, **filtros):
+    """Eventos por día y entidad, agrupados en SQL"""
+    L = models.AuditLog
+    dia = dia_de(L.fecha)
+    query = filtrar_logs(db.query(dia.label("dia"), L.entidad, func.count(L.id).label("total")), **filtros)
+    filas = query.group_by(dia, L.entidad).order_by(dia, L.entidad).all()
+    return [{"dia": f.dia, "entidad": f.entidad, "total": f.total} for f in filas]
@@ -0,0 +1,482 @@
+import heapq
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import unicodedata
+from array import array
+import numpy as np
+from sqlalchemy.orm import Session
+from app.core.bloqueos import tomar_bloqueo
+from app.db.database import SessionLocal
+from app.db import models
+from app.services import consultas
+
+# ---------------------------------------------------------------------
+# BÚSQUEDA DE TEXTO (ÍNDICE INVERTIDO)
+# ---------------------------------------------------------------------
+# Índice de términos sobre descripcion, development_doing, observaciones y
+# producto_entregable, en dos capas:
+#   - Segmento: lo arma UN proceso aparte (python -m app.services.busqueda, o el
+#     que lanza el primer worker que lo necesita) y lo publica en DIRECTORIO_INDICE
+#     como arreglos .npy. Los workers los abren con mmap, así las páginas las
+#     comparte el sistema operativo en vez de tener una copia por worker.
+#   - Delta: lo que cambió después del segmento (delta-sync), en memoria de cada
+#     worker; es chico y se descarta al publicarse un segmento nuevo.
+# Cada término guarda su lista dos veces: por impacto BM25 descendente (para cortar
+# apenas se tienen los 'limite' mejores) y por documento (para verificar el resto
+# de los términos con búsqueda binaria).
+CAMPOS_TEXTO = {
+    "descripcion": 2.0,          # Peso del campo en el ranking
+    "producto_entregable": 1.5,
+    "development_doing": 1.0,
+    "observaciones": 1.0,
+}
+DIRECTORIO_INDICE = os.getenv("SIVIACK_INDICE_DIR", "indice_busqueda")
+SEGUNDOS_ENTRE_REFRESCOS = 2
+MAX_DELTA = 20_000               # Documentos en el delta antes de pedir un segmento nuevo
+SEGUNDOS_ENTRE_CONSTRUCCIONES = 60
+GENERACIONES_GUARDADAS = 2       # Las anteriores pueden seguir abiertas en algún worker
+BLOQUE_INICIAL, BLOQUE_MAXIMO = 1024, 65536
+LARGO_MAX_TERMINO = 32
+BM25_K1, BM25_B = 1.2, 0.75
+
+STOPWORDS = {
+    "a", "al", "con", "de", "del", "el", "en", "es", "la", "las", "lo", "los", "o", "para",
+    "por", "que", "se", "su", "sus", "un", "una", "y", "the", "of", "and", "to", "in",
+}
+_PALABRA = re.compile(r"\w+")
+
+class IndiceNoDisponible(Exception):
+    """Todavía no hay un segmento publicado (se está construyendo)"""
+
+def normalizar(texto: str):
+    """Minúsculas, sin tildes, sin stopwords y con plural simple en español"""
+    sin_tildes = "".join(
+        c for c in unicodedata.normalize("NFKD", texto.lower()) if not unicodedata.combining(c)
+    )
+    terminos = []
+    for palabra in _PALABRA.findall(sin_tildes):
+        if palabra in STOPWORDS or len(palabra) < 2:
+            continue
+        if len(palabra) > 4 and palabra.endswith("es"): palabra = palabra[:-2]
+        elif len(palabra) > 3 and palabra.endswith("s"): palabra = palabra[:-1]
+        terminos.append(palabra[:LARGO_MAX_TERMINO])  # Ancho fijo en el arreglo de términos
+    return terminos
+
+def _frecuencias(textos: dict):
+    """termino -> frecuencia ponderada por el peso de cada campo"""
+    frecuencias = {}
+    for campo, peso in CAMPOS_TEXTO.items():
+        for termino in normalizar(textos.get(campo) or ""):
+            frecuencias[termino] = frecuencias.get(termino, 0.0) + peso
+    return frecuencias
+
+def _idf(n_docs, df):
+    return np.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+
+def _bm25(idf, tf, largo, largo_medio):
+    return idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * largo / largo_medio))
+
+# ---------------------------------------------------------------------
+# SEGMENTO EN DISCO
+# ---------------------------------------------------------------------
+def _leer_manifiesto(directorio):
+    try:
+        with open(os.path.join(directorio, "manifiesto.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def escribir_segmento(directorio, token, filas):
+    """Arma y publica un segmento. filas: (id, empresa_id, area_id, responsable_id, textos)
+    en orden de id. La publicación es el reemplazo atómico del manifiesto."""
+    vocabulario = {}
+    terminos, docs, tfs, largos = array("i"), array("i"), array("f"), array("f")
+    ids, empresas, areas, responsables = array("q"), array("i"), array("i"), array("i")
+    for id_, empresa_id, area_id, responsable_id, textos in filas:
+        frecuencias = _frecuencias(textos)
+        pos = len(ids)
+        ids.append(id_)
+        empresas.append(empresa_id or 0)
+        areas.append(area_id or 0)
+        responsables.append(responsable_id or 0)
+        largos.append(sum(frecuencias.values()))
+        for termino, tf in frecuencias.items():
+            terminos.append(vocabulario.setdefault(termino, len(vocabulario)))
+            docs.append(pos)
+            tfs.append(tf)
+
+    n_docs = len(ids)
+    largos = np.frombuffer(largos, np.float32)
+    largo_medio = float(largos.mean()) if n_docs and largos.mean() > 0 else 1.0
+    # Id de término = posición en orden alfabético: se busca con np.searchsorted
+    lista = sorted(vocabulario)
+    nuevo_id = np.empty(len(lista), np.int32)
+    for pos, termino in enumerate(lista):
+        nuevo_id[vocabulario[termino]] = pos
+    t = nuevo_id[np.frombuffer(terminos, np.int32)]
+    d = np.frombuffer(docs, np.int32)
+    tf = np.frombuffer(tfs, np.float32)
+    df = np.bincount(t, minlength=len(lista)).astype(np.int32)
+    impactos = _bm25(_idf(n_docs, df)[t], tf, largos[d], largo_medio).astype(np.float32)
+    por_doc = np.argsort(t, kind="stable")       # Dentro de cada término, docs ya crecientes
+    por_impacto = np.lexsort((-impactos, t))
+
+    anterior = _leer_manifiesto(directorio)
+    generacion = (anterior["generacion"] + 1) if anterior else 1
+    nombre = f"gen_{generacion:06d}"
+    carpeta = os.path.join(directorio, nombre)
+    shutil.rmtree(carpeta, ignore_errors=True)
+    os.makedirs(carpeta)
+    arreglos = {
+        "terminos": np.array(lista, dtype=f"<U{LARGO_MAX_TERMINO}"),
+        "inicios": np.concatenate(([0], np.cumsum(df))).astype(np.int64),
+        "df": df,
+        "ids": np.frombuffer(ids, np.int64),
+        "empresas": np.frombuffer(empresas, np.int32),
+        "areas": np.frombuffer(areas, np.int32),
+        "responsables": np.frombuffer(responsables, np.int32),
+        "docs_impacto": d[por_impacto],
+        "impactos": impactos[por_impacto],
+        "docs_orden": d[por_doc],
+        "impactos_orden": impactos[por_doc],
+    }
+    for clave, valor in arreglos.items():
+        np.save(os.path.join(carpeta, clave + ".npy"), valor)
+    manifiesto = {"generacion": generacion, "carpeta": nombre, "token": token,
+                  "documentos": n_docs, "largo_medio": largo_medio}
+    temporal = os.path.join(directorio, f"manifiesto.{os.getpid()}.tmp")
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f)
+    os.replace(temporal, os.path.join(directorio, "manifiesto.json"))
+
+    for viejo in sorted(n for n in os.listdir(directorio) if n.startswith("gen_"))[:-GENERACIONES_GUARDADAS]:
+        shutil.rmtree(os.path.join(directorio, viejo), ignore_errors=True)  # En Windows falla si sigue mapeado
+    return manifiesto
+
+def construir_segmento(db: Session, directorio=DIRECTORIO_INDICE):
+    """Lee las columnas de texto por lotes y publica un segmento nuevo. Devuelve
+    None si otro proceso ya está construyendo (uno solo por host)."""
+    os.makedirs(directorio, exist_ok=True)
+    bloqueo = tomar_bloqueo(os.path.join(directorio, "construccion.lock"))
+    if bloqueo is None:
+        return None
+    try:
+        token = consultas.token_cambios(db)  # Antes de leer: lo posterior entra por el delta
+        columnas = [getattr(models.Actividad, c) for c in CAMPOS_TEXTO]
+        query = db.query(
+            models.Actividad.id, models.Actividad.empresa_id, models.Actividad.area_id,
+            models.Actividad.responsable_id, *columnas,
+        ).order_by(models.Actividad.id)
+        filas = ((f[0], f[1], f[2], f[3], dict(zip(CAMPOS_TEXTO, f[4:]))) for f in query.yield_per(5000))
+        return escribir_segmento(directorio, token, filas)
+    finally:
+        bloqueo.close()
+
+def _lanzar_constructor(directorio):
+    """Construye en un proceso aparte: no compite por el GIL con las peticiones"""
+    raiz = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    # Mismo directorio de trabajo que el worker: las rutas relativas (índice, sqlite) coinciden
+    entorno = dict(os.environ, SIVIACK_INDICE_DIR=directorio,
+                   PYTHONPATH=os.pathsep.join(filter(None, [raiz, os.environ.get("PYTHONPATH")])))
+    return subprocess.Popen([sys.executable, "-m", "app.services.busqueda"], env=entorno)
+
+class Segmento:
+    """Segmento publicado, mapeado en memoria y de solo lectura"""
+    def __init__(self, directorio, manifiesto):
+        carpeta = os.path.join(directorio, manifiesto["carpeta"])
+        self.generacion, self.token = manifiesto["generacion"], manifiesto["token"]
+        self.n_docs, self.largo_medio = manifiesto["documentos"], manifiesto["largo_medio"]
+        for nombre in ("terminos", "inicios", "df", "ids", "empresas", "areas", "responsables",
+                       "docs_impacto", "impactos", "docs_orden", "impactos_orden"):
+            setattr(self, nombre, np.load(os.path.join(carpeta, nombre + ".npy"), mmap_mode="r"))
+
+    def termino(self, termino) -> int:
+        pos = int(np.searchsorted(self.terminos, termino))
+        return pos if pos < len(self.terminos) and self.terminos[pos] == termino else -1
+
+    def posiciones(self, ids) -> np.ndarray:
+        """Posición en el segmento de cada actividad_id (los ids ausentes se omiten)"""
+        ids = np.asarray(ids, np.int64)
+        pos = np.minimum(np.searchsorted(self.ids, ids), max(len(self.ids) - 1, 0))
+        return pos[self.ids[pos] == ids] if len(self.ids) else np.zeros(0, np.int64)
+
+    def _impactos_en(self, termino, docs):
+        """Impacto del término en cada doc (NaN si no lo contiene), por búsqueda binaria"""
+        a, b = self.inicios[termino], self.inicios[termino + 1]
+        lista = self.docs_orden[a:b]
+        pos = np.minimum(np.searchsorted(lista, docs), b - a - 1)
+        return np.where(lista[pos] == docs, self.impactos_orden[a:b][pos], np.nan)
+
+    def mejores(self, terminos, aceptar, limite):
+        """Top 'limite' [(puntaje, posicion)] con todos los términos (AND), por umbral
+        (Fagin): se recorren las listas por impacto descendente en bloques; cada doc
+        nuevo se puntúa completo con acceso directo a las demás listas. Se corta cuando
+        el peor de los 'limite' mejores supera la suma de los impactos pendientes (ningún
+        doc sin ver puede superarlo) o cuando se agota una lista (AND: ya se vio todo)."""
+        rangos = [(int(self.inicios[t]), int(self.inicios[t + 1])) for t in terminos]
+        cursores = [a for a, _ in rangos]
+        docs_top, puntajes_top = np.zeros(0, np.int64), np.zeros(0, np.float64)
+        bloque = BLOQUE_INICIAL
+        while True:
+            for i, (a, b) in enumerate(rangos):
+                fin = min(cursores[i] + bloque, b)
+                docs = np.asarray(self.docs_impacto[cursores[i]:fin], np.int64)
+                puntajes = np.asarray(self.impactos[cursores[i]:fin], np.float64)
+                cursores[i] = fin
+                for j, termino in enumerate(terminos):
+                    if j == i or not len(docs): continue
+                    puntajes = puntajes + self._impactos_en(termino, docs)
+                validos = ~np.isnan(puntajes)
+                if len(docs): validos &= aceptar(docs)
+                if validos.any():
+                    docs = np.concatenate((docs_top, docs[validos]))
+                    puntajes = np.concatenate((puntajes_top, puntajes[validos]))
+                    docs, unicos = np.unique(docs, return_index=True)
+                    puntajes = puntajes[unicos]
+                    if len(docs) > limite:
+                        corte = np.argpartition(-puntajes, limite - 1)[:limite]
+                        docs, puntajes = docs[corte], puntajes[corte]
+                    docs_top, puntajes_top = docs, puntajes
+            if any(c >= b for c, (_, b) in zip(cursores, rangos)):
+                break
+            umbral = sum(float(self.impactos[c]) for c in cursores)
+            if len(docs_top) >= limite and puntajes_top.min() >= umbral:
+                break
+            bloque = min(bloque * 2, BLOQUE_MAXIMO)
+        return list(zip(puntajes_top.tolist(), docs_top.tolist()))
+
+# ---------------------------------------------------------------------
+# ÍNDICE DEL WORKER (SEGMENTO + DELTA)
+# ---------------------------------------------------------------------
+class IndiceInvertido:
+    def __init__(self, directorio=DIRECTORIO_INDICE, construir=_lanzar_constructor):
+        self.directorio = directorio
+        # Pide un segmento nuevo: por defecto lanza el proceso constructor y devuelve
+        # el Popen; si construye en el mismo proceso, devuelve None
+        self.construir = construir
+        self.segmento = None
+        self.postings = {}    # Delta: termino -> {actividad_id: frecuencia ponderada}
+        self.docs = {}        # Delta: actividad_id -> (largo, empresa_id, area_id, responsable_id, terminos)
+        self.anulados = np.zeros(0, np.int64)  # Posiciones del segmento reemplazadas por el delta
+        self.token = None     # Marca de delta-sync ya aplicada
+        self.refrescado_en = 0.0
+        self.pedido_en = None
+        self._constructor = None
+        # _lock protege el delta y el cambio de segmento (rápido); _refresco deja a un
+        # solo hilo leyendo la BD, fuera de _lock
+        self._lock = threading.RLock()
+        self._refresco = threading.Lock()
+
+    # --- Mantenimiento ---
+    def indexar(self, id_, empresa_id, area_id, responsable_id, textos: dict):
+        self._agregar(id_, empresa_id, area_id, responsable_id, _frecuencias(textos))
+
+    def _agregar(self, id_, empresa_id, area_id, responsable_id, frecuencias):
+        with self._lock:
+            self.quitar(id_)
+            for termino, tf in frecuencias.items():
+                self.postings.setdefault(termino, {})[id_] = tf
+            self.docs[id_] = (sum(frecuencias.values()), empresa_id, area_id, responsable_id, tuple(frecuencias))
+
+    def quitar(self, id_):
+        with self._lock:
+            if self.segmento is not None:
+                pos = self.segmento.posiciones([id_])
+                if len(pos): self.anulados = np.union1d(self.anulados, pos)
+            doc = self.docs.pop(id_, None)
+            if not doc: return
+            for termino in doc[4]:
+                lista = self.postings.get(termino)
+                if lista is not None:
+                    lista.pop(id_, None)
+                    if not lista: del self.postings[termino]
+
+    def invalidar(self):
+        """El próximo refrescar aplica los cambios sin esperar SEGUNDOS_ENTRE_REFRESCOS"""
+        with self._lock:
+            self.refrescado_en = 0.0
+
+    def indexar_actividad(self, act):
+        self.indexar(act.id, act.empresa_id, act.area_id, act.responsable_id,
+                     {campo: getattr(act, campo) for campo in CAMPOS_TEXTO})
+
+    def pedir_segmento(self):
+        """Pide un segmento nuevo. Mientras no se publique, no se repite antes de
+        SEGUNDOS_ENTRE_CONSTRUCCIONES; si otro proceso ya construye, el pedido termina
+        sin hacer nada (bloqueo)."""
+        if self._constructor is not None and self._constructor.poll() is None:
+            return
+        if self.pedido_en is not None and time.monotonic() - self.pedido_en < SEGUNDOS_ENTRE_CONSTRUCCIONES:
+            return
+        self.pedido_en = time.monotonic()
+        self._constructor = self.construir(self.directorio)
+
+    def abrir(self) -> bool:
+        """Pasa al último segmento publicado si es más nuevo que el actual. El delta se
+        descarta: lo que cambió después del segmento vuelve por delta-sync."""
+        manifiesto = _leer_manifiesto(self.directorio)
+        if manifiesto is None:
+            return False
+        if self.segmento is not None and self.segmento.generacion == manifiesto["generacion"]:
+            return False
+        segmento = Segmento(self.directorio, manifiesto)
+        with self._lock:
+            self.segmento = segmento
+            self.postings, self.docs = {}, {}
+            self.anulados = np.zeros(0, np.int64)
+            self.token = segmento.token
+            self.pedido_en = None    # Pedido atendido
+        return True
+
+    def refrescar(self, db: Session):
+        """Abre un segmento más nuevo si lo hay y aplica los cambios desde el último
+        token. Si otro hilo ya está refrescando, se sigue con el índice actual."""
+        if self.segmento is not None and time.monotonic() - self.refrescado_en < SEGUNDOS_ENTRE_REFRESCOS:
+            return
+        if not self._refresco.acquire(blocking=False):
+            return
+        try:
+            if self.segmento is not None and time.monotonic() - self.refrescado_en < SEGUNDOS_ENTRE_REFRESCOS:
+                return
+            self.abrir()
+            if self.segmento is None:
+                self.pedir_segmento()
+                if not self.abrir(): return
+            nuevo_token = consultas.token_cambios(db)
+            if nuevo_token != self.token:
+                cambios = consultas.cambios_actividades(db, consultas.leer_token(self.token),
+                                                        consultas.leer_token(nuevo_token))
+                if cambios is None:
+                    # Demasiados cambios (p. ej. recálculo de toda la tabla): hasta que se
+                    # publique el segmento nuevo se sigue con el actual
+                    self.pedir_segmento()
+                else:
+                    actualizadas, eliminadas = cambios
+                    # Lectura y normalización fuera del lock; solo el reemplazo lo toma
+                    cambios = [
+                        (act.id, act.empresa_id, act.area_id, act.responsable_id,
+                         _frecuencias({campo: getattr(act, campo) for campo in CAMPOS_TEXTO}))
+                        for act in actualizadas
+                    ]
+                    with self._lock:
+                        for id_ in eliminadas: self.quitar(id_)
+                        for cambio in cambios: self._agregar(*cambio)
+                        self.token = nuevo_token
+                    if len(self.docs) > MAX_DELTA:
+                        self.pedir_segmento()
+            with self._lock:
+                self.refrescado_en = time.monotonic()
+        finally:
+            self._refresco.release()
+
+    # --- Consulta ---
+    def buscar(self, texto: str, empresa_id=None, area_id=None, responsable_id=None, limite: int = 50):
+        """Top 'limite' (id, puntaje) por BM25. Todos los términos deben aparecer (AND)."""
+        terminos = list(dict.fromkeys(normalizar(texto)))
+        if not terminos: return []
+        with self._lock:
+            segmento, anulados = self.segmento, self.anulados
+            if segmento is None:
+                raise IndiceNoDisponible()
+            resultados = self._buscar_delta(segmento, terminos, empresa_id, area_id, responsable_id, limite)
+
+        # El segmento es de solo lectura: se recorre fuera del lock
+        ids_terminos = [segmento.termino(t) for t in terminos]
+        if all(t >= 0 for t in ids_terminos):
+            def aceptar(docs):
+                validos = np.ones(len(docs), bool)
+                if empresa_id: validos &= segmento.empresas[docs] == empresa_id
+                if area_id: validos &= segmento.areas[docs] == area_id
+                if responsable_id: validos &= segmento.responsables[docs] == responsable_id
+                if len(anulados): validos &= ~np.isin(docs, anulados)
+                return validos
+            resultados += [(puntaje, int(segmento.ids[pos]))
+                           for puntaje, pos in segmento.mejores(ids_terminos, aceptar, limite)]
+        return [(id_, puntaje) for puntaje, id_ in heapq.nlargest(limite, resultados)]
+
+    def _buscar_delta(self, segmento, terminos, empresa_id, area_id, responsable_id, limite):
+        """BM25 sobre el delta con las estadísticas del segmento (idf y largo medio)"""
+        listas = [self.postings.get(t) for t in terminos]
+        if any(lista is None for lista in listas): return []
+        n_docs = segmento.n_docs + len(self.docs)
+        idf = []
+        for termino in terminos:
+            pos = segmento.termino(termino)
+            idf.append(float(_idf(n_docs, segmento.df[pos] if pos >= 0 else 0)))
+        orden = sorted(range(len(listas)), key=lambda i: len(listas[i]))
+        base, resto = listas[orden[0]], [listas[i] for i in orden[1:]]
+        resultados = []
+        for id_ in base:
+            if any(id_ not in lista for lista in resto): continue
+            largo, emp, area, resp, _ = self.docs[id_]
+            if empresa_id and emp != empresa_id: continue
+            if area_id and area != area_id: continue
+            if responsable_id and resp != responsable_id: continue
+            puntaje = sum(_bm25(peso, lista[id_], largo, segmento.largo_medio) for lista, peso in zip(listas, idf))
+            resultados.append((puntaje, id_))
+        return heapq.nlargest(limite, resultados)
+
+indice = IndiceInvertido()
+
+def precargar():
+    """Abre el segmento publicado (o pide construirlo) en segundo plano"""
+    def abrir():
+        db = SessionLocal()
+        try:
+            indice.refrescar(db)
+            if indice.segmento is not None:
+                print(f"🔎 Índice de búsqueda listo: {indice.segmento.n_docs} actividades "
+                      f"(generación {indice.segmento.generacion})")
+            else:
+                print("🔎 Índice de búsqueda en construcción")
+        except Exception as e:
+            print(f"❌ Error abriendo índice de búsqueda: {e}")
+        finally:
+            db.close()
+
+    hilo = threading.Thread(target=abrir, name="indice-busqueda", daemon=True)
+    hilo.start()
+    return hilo
+
+def buscar_actividades(db: Session, texto: str, empresa_id=None, area_id=None, responsable_id=None, limite: int = 50):
+    """Busca en el índice y trae las actividades (con nombres) en el orden del ranking.
+    La empresa se vuelve a verificar en la BD: el índice puede ir unos segundos atrasado."""
+    indice.refrescar(db)
+    ranking = indice.buscar(texto, empresa_id, area_id, responsable_id, limite)
+    if not ranking: return []
+    ids = [id_ for id_, _ in ranking]
+    query = consultas.query_actividades(db).filter(models.Actividad.id.in_(ids))
+    if empresa_id:
+        query = query.filter(models.Actividad.empresa_id == empresa_id)
+    por_id = {act.id: act for act in query}
+    resultados = []
+    for id_, puntaje in ranking:
+        act = por_id.get(id_)
+        if act is None: continue  # Borrada desde el último refresco
+        consultas.mapear_nombres(act).puntaje = round(puntaje, 4)
+        resultados.append(act)
+    return resultados
+
+# ---------------------------------------------------------------------
+# CONSTRUCCIÓN (PROCESO APARTE)
+# ---------------------------------------------------------------------
+# Uso: python -m app.services.busqueda
+# Para el despliegue o un cron; los workers lo lanzan solos si no hay segmento o si
+# el delta creció demasiado. Si ya hay una construcción en curso, termina sin hacer nada.
+if __name__ == "__main__":
+    db = SessionLocal()
+    try:
+        manifiesto = construir_segmento(db)
+    finally:
+        db.close()
+    if manifiesto is None:
+        print("⏳ Otro proceso ya está construyendo el índice de búsqueda")
+    else:
+        print(f"✅ Índice de búsqueda publicado: generación {manifiesto['generacion']}, "
+              f"{manifiesto['documentos']} actividades")
@@ -0,0 +1,136 @@
+import os
+import sys
+import json
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.db.database import SessionLocal
+from app.db import models
+
+# ---------------------------------------------------------------------
+# CONFIGURACIÓN
+# ---------------------------------------------------------------------
+# Uso: python -m app.services.catalogos [fuente.json] [--simular] [--retirar]
+# Los catálogos se declaran en catalogos.json ({catálogo: {"items": [...], "renombrar": {viejo: nuevo}}}).
+# Por catálogo: una consulta para leer lo existente, diferencia de conjuntos y
+# altas/renombres/bajas en bloque; todo en una sola transacción.
+ARCHIVO_CATALOGOS = os.path.join(os.path.dirname(__file__), "catalogos.json")
+
+CATALOGOS_MAP = {
+    "origenes": models.OrigenRequerimiento,
+    "tipos_req": models.TipoRequerimiento,
+    "servicios": models.TipoServicio,
+    "intervenciones": models.TipoIntervencion,
+    "medios": models.MedioControl,
+    "resultados": models.ControlResultados,
+    "status": models.StatusActividad
+}
+
+def cargar_fuente(ruta: str = ARCHIVO_CATALOGOS) -> dict:
+    with open(ruta, encoding="utf-8") as f:
+        fuente = json.load(f)
+    desconocidos = set(fuente) - set(CATALOGOS_MAP)
+    if desconocidos:
+        raise ValueError(f"Catálogos desconocidos en {ruta}: {', '.join(sorted(desconocidos))}")
+    return fuente
+
+# ---------------------------------------------------------------------
+# PLAN (DIFERENCIA ENTRE LA FUENTE Y LA BD)
+# ---------------------------------------------------------------------
+def _referencias(modelo):
+    """Columnas de otras tablas con FK hacia el catálogo (ej: actividades.status_id)"""
+    return [
+        columna
+        for tabla in models.Base.metadata.tables.values()
+        for columna in tabla.columns
+        if any(fk.column.table is modelo.__table__ for fk in columna.foreign_keys)
+    ]
+
+def _en_uso(db: Session, modelo, ids) -> set:
+    usados = set()
+    for columna in _referencias(modelo):
+        usados.update(db.execute(select(columna).where(columna.in_(ids)).distinct()).scalars())
+    return usados
+
+def planificar(db: Session, fuente: dict, retirar: bool = False) -> dict:
+    """{catálogo: {insertar, renombrar, retirar, en_uso, conflictos}} sin escribir nada.
+    Sin 'retirar', lo que está en la BD y no en la fuente se deja como está."""
+    plan = {}
+    for nombre, definicion in fuente.items():
+        modelo = CATALOGOS_MAP[nombre]
+        existentes = dict(db.query(modelo.nombre, modelo.id))  # Única consulta del catálogo
+        deseados = list(dict.fromkeys(n.strip() for n in definicion.get("items", [])))
+        en_fuente = set(deseados)
+
+        renombrar, conflictos = {}, []
+        for viejo, nuevo in definicion.get("renombrar", {}).items():
+            if viejo not in existentes: continue          # Ya aplicado o nunca existió
+            if nuevo in existentes: conflictos.append(f"'{viejo}' -> '{nuevo}' (ya existe)")
+            else: renombrar[viejo] = nuevo
+
+        actuales = {renombrar.get(n, n) for n in existentes}
+        sobrantes = [n for n in existentes if renombrar.get(n, n) not in en_fuente] if retirar else []
+        usados = _en_uso(db, modelo, [existentes[n] for n in sobrantes]) if sobrantes else set()
+        plan[nombre] = {
+            "insertar": [n for n in deseados if n not in actuales],
+            "renombrar": [(existentes[v], v, n) for v, n in renombrar.items()],
+            "retirar": [(existentes[n], n) for n in sobrantes if existentes[n] not in usados],
+            "en_uso": [n for n in sobrantes if existentes[n] in usados],  # No se borran: hay actividades que los usan
+            "conflictos": conflictos,
+        }
+    return plan
+
+def imprimir_plan(plan: dict):
+    for nombre, cambios in plan.items():
+        if not any(cambios.values()):
+            print(f"   · {nombre:<15} sin cambios")
+            continue
+        print(f"   · {nombre}")
+        for n in cambios["insertar"]: print(f"       + {n}")
+        for _, viejo, nuevo in cambios["renombrar"]: print(f"       ~ {viejo} -> {nuevo}")
+        for _, n in cambios["retirar"]: print(f"       - {n}")
+        for n in cambios["en_uso"]: print(f"       ! {n} (en uso, se conserva)")
+        for c in cambios["conflictos"]: print(f"       ! renombre omitido: {c}")
+
+# ---------------------------------------------------------------------
+# APLICACIÓN
+# ---------------------------------------------------------------------
+def aplicar(db: Session, plan: dict):
+    """Escribe el plan en bloque por catálogo. El commit lo hace quien llama."""
+    for nombre, cambios in plan.items():
+        modelo = CATALOGOS_MAP[nombre]
+        if cambios["renombrar"]:
+            db.bulk_update_mappings(modelo, [{"id": id_, "nombre": nuevo} for id_, _, nuevo in cambios["renombrar"]])
+        if cambios["insertar"]:
+            db.bulk_insert_mappings(modelo, [{"nombre": n} for n in cambios["insertar"]])
+        if cambios["retirar"]:
+            ids = [id_ for id_, _ in cambios["retirar"]]
+            db.query(modelo).filter(modelo.id.in_(ids)).delete(synchronize_session=False)
+
+def sincronizar(db: Session, ruta: str = ARCHIVO_CATALOGOS, retirar: bool = False, simular: bool = False) -> dict:
+    plan = planificar(db, cargar_fuente(ruta), retirar)
+    imprimir_plan(plan)
+    if simular:
+        db.rollback()
+        print("🔎 Simulación: no se escribió nada.")
+        return plan
+    try:
+        aplicar(db, plan)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return plan
+
+if __name__ == "__main__":
+    argumentos = [a for a in sys.argv[1:] if not a.startswith("--")]
+    db = SessionLocal()
+    print("🌱 Sincronizando catálogos...")
+    try:
+        sincronizar(db, argumentos[0] if argumentos else ARCHIVO_CATALOGOS,
+                    retirar="--retirar" in sys.argv, simular="--simular" in sys.argv)
+        if "--simular" not in sys.argv: print("🎉 Catálogos sincronizados.")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
@@ -0,0 +1,250 @@
+from datetime import date
+from sqlalchemy import and_, or_, case, func, select, text
+from sqlalchemy.orm import Session, joinedload
+from app.db.database import SessionLocal
+from app.db import models
+from app.schemas import schemas
+from app.services import recalculo
+
+# ---------------------------------------------------------------------
+# CARGA DE NOMBRES EXPANDIDOS (SIN N+1)
+# ---------------------------------------------------------------------
+# Todas las relaciones son muchos-a-uno, así que un LEFT JOIN por relación
+# trae los nombres en el mismo SELECT, sin importar cuántas filas haya.
+CARGA_NOMBRES = (
+    joinedload(models.Actividad.empresa_rel),
+    joinedload(models.Actividad.area_rel),
+    joinedload(models.Actividad.responsable_rel),
+    joinedload(models.Actividad.status_rel),
+    joinedload(models.Actividad.origen_rel),
+    joinedload(models.Actividad.tipo_req_rel),
+)
+
+def query_actividades(db: Session):
+    """Query base de actividades con los nombres relacionados ya cargados"""
+    return db.query(models.Actividad).options(*CARGA_NOMBRES)
+
+def select_actividades():
+    """Lo mismo como select() 2.0 para AsyncSession (filtros y paginación aplican igual)"""
+    return select(models.Actividad).options(*CARGA_NOMBRES)
+
+def mapear_nombres(act):
+    """Copia los nombres de las relaciones a los campos planos de ActividadOut"""
+    act.nombre_empresa = act.empresa_rel.razon_social if act.empresa_rel else "N/A"
+    act.nombre_area = act.area_rel.codigo if act.area_rel else "N/A"
+    act.nombre_responsable = act.responsable_rel.nombre_completo if act.responsable_rel else "S/A"
+    act.nombre_status = act.status_rel.nombre if act.status_rel else "Sin Estado"
+    act.nombre_origen = act.origen_rel.nombre if act.origen_rel else ""
+    act.nombre_tipo_req = act.tipo_req_rel.nombre if act.tipo_req_rel else ""
+    return act
+
+def obtener_con_nombres(db: Session, id: int):
+    """Trae una actividad por ID (con nombres) en una sola consulta, o None"""
+    act = query_actividades(db).filter(models.Actividad.id == id).first()
+    return mapear_nombres(act) if act else None
+
+# ---------------------------------------------------------------------
+# FILTROS Y PAGINACIÓN POR CURSOR (KEYSET)
+# ---------------------------------------------------------------------
+def filtrar_actividades(query, empresa_id=None, area_id=None, responsable_id=None,
+                        status_id=None, fecha_inicio=None, fecha_fin=None):
+    """Aplica los filtros del listado de actividades a cualquier query sobre Actividad"""
+    if empresa_id: query = query.filter(models.Actividad.empresa_id == empresa_id)
+    if area_id: query = query.filter(models.Actividad.area_id == area_id)
+    if responsable_id: query = query.filter(models.Actividad.responsable_id == responsable_id)
+    if status_id: query = query.filter(models.Actividad.status_id == status_id)
+    if fecha_inicio: query = query.filter(models.Actividad.fecha_compromiso >= fecha_inicio)
+    if fecha_fin: query = query.filter(models.Actividad.fecha_compromiso <= fecha_fin)
+    return query
+
+CONDICIONES_PENDIENTES = ("Abierta", "Atrasada")
+
+def filtrar_pendientes(query, responsable_id=None):
+    """Actividades aún no cerradas; si se indica responsable, solo las suyas"""
+    query = query.filter(models.Actividad.condicion_actual.in_(CONDICIONES_PENDIENTES))
+    if responsable_id: query = query.filter(models.Actividad.responsable_id == responsable_id)
+    return query
+
+def crear_cursor(act):
+    """Cursor opaco 'YYYY-MM-DD_id' que apunta a la última fila entregada"""
+    return f"{act.fecha_compromiso.isoformat()}_{act.id}"
+
+def leer_cursor(cursor: str):
+    """Devuelve (fecha_compromiso, id) o lanza ValueError si el cursor no es válido"""
+    fecha_txt, id_txt = cursor.split("_", 1)
+    return date.fromisoformat(fecha_txt), int(id_txt)
+
+def paginar_keyset(query, limit=None, after=None):
+    """Ordena por (fecha_compromiso, id) y continúa estrictamente después del cursor"""
+    query = query.order_by(models.Actividad.fecha_compromiso, models.Actividad.id)
+    if after:
+        fecha, ultimo_id = leer_cursor(after)
+        query = query.filter(or_(
+            models.Actividad.fecha_compromiso > fecha,
+            and_(models.Actividad.fecha_compromiso == fecha, models.Actividad.id > ultimo_id),
+        ))
+    if limit: query = query.limit(limit)
+    return query
+
+def hasta_cursor(query, hasta=None):
+    """Filas hasta el cursor inclusive: la ventana que el cliente ya tiene cargada"""
+    if not hasta: return query
+    fecha, ultimo_id = leer_cursor(hasta)
+    return query.filter(or_(
+        models.Actividad.fecha_compromiso < fecha,
+        and_(models.Actividad.fecha_compromiso == fecha, models.Actividad.id <= ultimo_id),
+    ))
+
+# ---------------------------------------------------------------------
+# STREAMING NDJSON (CURSOR DEL SERVIDOR)
+# ---------------------------------------------------------------------
+FILAS_POR_LOTE = 500
+
+def stream_ndjson(filtros: dict, limit=None, after=None):
+    """Genera una línea JSON por actividad leyendo por lotes desde un cursor del servidor.
+    Abre su propia sesión porque se consume después de que el endpoint ya respondió."""
+    db = SessionLocal()
+    try:
+        query = paginar_keyset(filtrar_actividades(query_actividades(db), **filtros), limit, after)
+        for act in query.yield_per(FILAS_POR_LOTE):
+            yield schemas.ActividadOut.model_validate(mapear_nombres(act)).model_dump_json() + "\n"
+    finally:
+        db.close()
+
+# ---------------------------------------------------------------------
+# RESUMEN DE KPIs (AGREGADO EN SQL)
+# ---------------------------------------------------------------------
+# Mismo criterio que usaba el Dashboard en el navegador y que recalculo.status_cerrado.
+# Cerrada y atrasada se excluyen: una fila cerrada no cuenta como atrasada.
+_NOMBRE_STATUS = func.lower(func.coalesce(models.StatusActividad.nombre, ""))
+ES_CERRADA = or_(
+    func.coalesce(models.Actividad.condicion_actual, "") == "Cerrada",
+    *[_NOMBRE_STATUS.like(patron) for patron in recalculo.PATRONES_STATUS_CERRADO],
+)
+ES_ATRASADA = and_(~ES_CERRADA, or_(
+    models.Actividad.prioridad_accion == "Atrasada",
+    models.Actividad.condicion_actual == "Atrasada",
+    _NOMBRE_STATUS.like("%atrasad%"),
+))
+
+def _contar(condicion):
+    return func.coalesce(func.sum(case((condicion, 1), else_=0)), 0)
+
+def _desglose(db: Session, filtros: dict, id_col, nombre_col, join_modelo, join_on):
+    """Total / cerradas / atrasadas agrupado por una dimensión (empresa, área, responsable)"""
+    query = (
+        db.query(id_col, nombre_col, func.count(models.Actividad.id), _contar(ES_CERRADA), _contar(ES_ATRASADA))
+        .select_from(models.Actividad)
+        .outerjoin(models.StatusActividad, models.Actividad.status_id == models.StatusActividad.id)
+        .outerjoin(join_modelo, join_on)
+    )
+    query = filtrar_actividades(query, **filtros).group_by(id_col, nombre_col)
+    return [
+        {"id": id_, "nombre": nombre or "S/A", "total": total, "cerradas": int(cerradas), "atrasadas": int(atrasadas)}
+        for id_, nombre, total, cerradas, atrasadas in query.all()
+    ]
+
+def resumen_kpis(db: Session, filtros: dict, desglose: bool = True):
+    """KPIs del Dashboard con un GROUP BY por (status, condición, prioridad).
+    El desglose por empresa/área/responsable agrega una consulta por dimensión."""
+    query = (
+        db.query(
+            models.Actividad.status_id,
+            models.StatusActividad.nombre,
+            models.Actividad.condicion_actual,
+            models.Actividad.prioridad_accion,
+            func.count(models.Actividad.id),
+            _contar(ES_CERRADA),
+            _contar(ES_ATRASADA),
+        )
+        .select_from(models.Actividad)
+        .outerjoin(models.StatusActividad, models.Actividad.status_id == models.StatusActividad.id)
+    )
+    query = filtrar_actividades(query, **filtros).group_by(
+        models.Actividad.status_id,
+        models.StatusActividad.nombre,
+        models.Actividad.condicion_actual,
+        models.Actividad.prioridad_accion,
+    )
+
+    total = cerradas = atrasadas = 0
+    por_status, por_condicion, por_prioridad = {}, {}, {}
+    for status_id, nombre_status, condicion, prioridad, n, n_cerradas, n_atrasadas in query.all():
+        total += n
+        cerradas += int(n_cerradas)
+        atrasadas += int(n_atrasadas)
+        clave = (status_id, nombre_status or "Sin Estado")
+        por_status[clave] = por_status.get(clave, 0) + n
+        por_condicion[condicion or "Abierta"] = por_condicion.get(condicion or "Abierta", 0) + n
+        por_prioridad[prioridad or "Sin Prioridad"] = por_prioridad.get(prioridad or "Sin Prioridad", 0) + n
+
+    resumen = {
+        "total": total,
+        "cerradas": cerradas,
+        "atrasadas": atrasadas,
+        "cumplimiento": round(cerradas * 100 / total) if total else 0,
+        "por_status": [{"id": k[0], "nombre": k[1], "total": v} for k, v in por_status.items()],
+        "por_condicion": [{"nombre": k, "total": v} for k, v in por_condicion.items()],
+        "por_prioridad": [{"nombre": k, "total": v} for k, v in por_prioridad.items()],
+        "por_empresa": [],
+        "por_area": [],
+        "por_responsable": [],
+    }
+    if desglose:
+        resumen["por_empresa"] = _desglose(db, filtros, models.Actividad.empresa_id, models.Empresa.razon_social,
+                                           models.Empresa, models.Actividad.empresa_id == models.Empresa.id)
+        resumen["por_area"] = _desglose(db, filtros, models.Actividad.area_id, models.Area.codigo,
+                                        models.Area, models.Actividad.area_id == models.Area.id)
+        resumen["por_responsable"] = _desglose(db, filtros, models.Actividad.responsable_id, models.Usuario.nombre_completo,
+                                               models.Usuario, models.Actividad.responsable_id == models.Usuario.id)
+    return resumen
+
+# ---------------------------------------------------------------------
+# DELTA-SYNC (CAMBIOS DESDE UN TOKEN)
+# ---------------------------------------------------------------------
+# El token es una versión (models.VersionCambio) por debajo de la cual todo está
+# confirmado: en SQL Server, MIN_ACTIVE_ROWVERSION(); en SQLite, el contador + 1
+# (un solo escritor). Una transacción que confirma tarde igual queda >= token y
+# sale en la siguiente consulta. Los cambios se piden en [desde, token actual).
+LIMITE_CAMBIOS = 1000   # Más que esto (p. ej. tras recalcular toda la tabla): conviene recargar
+
+def token_cambios(db: Session) -> str:
+    if db.get_bind().dialect.name == "mssql":
+        valor = db.execute(text("SELECT CAST(MIN_ACTIVE_ROWVERSION() AS BIGINT)")).scalar()
+    else:
+        valor = db.execute(text("SELECT valor + 1 FROM secuencia_cambios")).scalar()
+    return str(valor)
+
+def leer_token(token: str) -> int:
+    """Lanza ValueError si el token no es una versión válida"""
+    valor = int(token)
+    if valor < 0: raise ValueError(token)
+    return valor
+
+def cambios_actividades(db: Session, desde: int, hasta: int, limite: int = None, empresa_id: int = None):
+    """(actualizadas, IDs eliminados) con versión en [desde, hasta), o None si son más
+    de 'limite' (LIMITE_CAMBIOS): el llamador recarga todo en vez de traer la tabla fila por fila.
+    Con empresa_id solo trae las actualizadas de esa empresa (las lápidas no la guardan: van todas,
+    son solo IDs)."""
+    limite = limite or LIMITE_CAMBIOS
+    query = query_actividades(db).filter(models.Actividad.version >= desde, models.Actividad.version < hasta)
+    if empresa_id is not None:
+        query = query.filter(models.Actividad.empresa_id == empresa_id)
+    actualizadas = query.order_by(models.Actividad.version).limit(limite + 1).all()
+    eliminadas = [
+        id_ for (id_,) in db.query(models.Eliminacion.entidad_id)
+        .filter(models.Eliminacion.entidad == "Actividad",
+                models.Eliminacion.version >= desde, models.Eliminacion.version < hasta)
+        .distinct()
+        .limit(limite + 1)
+    ]
+    if len(actualizadas) + len(eliminadas) > limite:
+        return None
+    return [mapear_nombres(act) for act in actualizadas], eliminadas
+
+def ids_en_vista(db: Session, ids, filtros: dict, hasta=None) -> set:
+    """De los IDs dados, los que cumplen los filtros del listado y caen dentro de la
+    ventana cargada ('hasta' = cursor de la última fila; sin cursor, la lista completa)"""
+    if not ids: return set()
+    query = db.query(models.Actividad.id).filter(models.Actividad.id.in_(ids))
+    return {id_ for (id_,) in hasta_cursor(filtrar_actividades(query, **filtros), hasta)}
@@ -1,5 +1,14 @@
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import unicodedata
 import pandas as pd
 import numpy as np
+from datetime import date
+import openpyxl
 from sqlalchemy.orm import Session
 from app.db.database import SessionLocal, engine
 from app.db import models
@@ -8,159 +17,510 @@ from app.db import models
 # CONFIGURACIÓN
 # ---------------------------------------------------------------------
 ARCHIVO_SCP = "datos_scp.csv.xlsx"  # El nombre exacto de tu archivo
+MARCA_ENCABEZADO = "BACKLOG"        # Texto que identifica la fila de títulos del SCP
+FILAS_BUSQUEDA_ENCABEZADO = 20      # Filas del preámbulo donde se busca esa fila
+LARGO_DESCRIPCION = 500
+FILAS_POR_BLOQUE = 20_000   # Filas leídas, limpiadas e insertadas por commit
+FILAS_POR_LOTE = 5000       # Actividades por executemany
 
-def limpiar_fecha(fecha):
-    """Convierte cualquier cosa a fecha válida o devuelve None"""
-    if pd.isna(fecha) or str(fecha).strip() == "":
-        return None
+# RENOMBRAR COLUMNAS: Estandarizamos los nombres feos del Excel
+# Esto es vital para que el código sea limpio
+MAPA_COLUMNAS = {
+    'Proceso / SP': 'codigo_area',
+    'Description of the Activity\n(BACKLOG)': 'descripcion',
+    'Responsable del Éxito\nProcess owner': 'responsable',
+    'Fecha de Entrega\nEnd Date': 'fecha_entrega',
+    'Fecha de Compromiso\nDeliver Date': 'fecha_compromiso',
+    'Origin Date': 'fecha_origen',
+    'Evidencia del Control ': 'evidencia', # Ojo con el espacio al final si lo tiene
+    'Condición Actual ': 'condicion',
+    'Status': 'estado',
+    '% Avance': 'avance'
+}
+
+# ---------------------------------------------------------------------
+# LECTURA
+# ---------------------------------------------------------------------
+def _ubicar_en_libro(wb, archivo: str):
+    """(hoja, filas_a_saltar) de la tabla SCP. El libro trae hojas auxiliares
+    (listas de valores) y un preámbulo de título/KPIs antes de los encabezados."""
+    for hoja in wb.worksheets:
+        for i, fila in enumerate(hoja.iter_rows(max_row=FILAS_BUSQUEDA_ENCABEZADO, values_only=True)):
+            if any(isinstance(v, str) and MARCA_ENCABEZADO in v for v in fila):
+                return hoja, i
+    raise ValueError(f"No se encontró la fila de encabezados ('{MARCA_ENCABEZADO}') en {archivo}")
+
+def ubicar_encabezado(archivo: str):
+    wb = openpyxl.load_workbook(archivo, read_only=True)
     try:
-        # Intenta convertir. dayfirst=True es clave para fechas Perú (dd/mm/yyyy)
-        return pd.to_datetime(fecha, dayfirst=True, errors='coerce')
-    except:
-        return None
+        hoja, saltar = _ubicar_en_libro(wb, archivo)
+        return hoja.title, saltar
+    finally:
+        wb.close()
+
+def _renombrar(df: pd.DataFrame) -> pd.DataFrame:
+    # Los encabezados a veces traen espacios de más: se comparan sin ellos
+    mapa = {k.strip(): v for k, v in MAPA_COLUMNAS.items()}
+    df = df.rename(columns=lambda c: mapa.get(str(c).strip(), c))
+
+    # Validamos que exista la columna descripción
+    if 'descripcion' not in df.columns:
+        # Fallback: A veces pandas nombra columnas diferente si hay caracteres raros
+        col_desc = [c for c in df.columns if MARCA_ENCABEZADO in str(c)]
+        if col_desc:
+            df = df.rename(columns={col_desc[0]: 'descripcion'})
+    return df
+
+def leer_excel(archivo: str = ARCHIVO_SCP) -> pd.DataFrame:
+    """Libro completo en memoria. El índice es el número de fila en el Excel."""
+    hoja, saltar = ubicar_encabezado(archivo)
+    df = pd.read_excel(archivo, sheet_name=hoja, skiprows=saltar)
+    df.index = df.index + saltar + 2
+    return _renombrar(df)
 
-def limpiar_porcentaje(valor):
-    """Convierte 0.8 o '80%' a 80.0"""
-    if pd.isna(valor): return 0.0
+def leer_excel_por_bloques(archivo: str = ARCHIVO_SCP, filas_por_bloque: int = None, desde_fila: int = 0,
+                           hasta_fila: int = None):
+    """Lee la hoja fila a fila (openpyxl read_only) y entrega DataFrames de
+    'filas_por_bloque' filas. Memoria acotada sin importar el tamaño del libro.
+    'desde_fila' salta las filas del Excel ya procesadas (reanudar); 'hasta_fila'
+    corta la lectura después de esa fila."""
+    filas_por_bloque = filas_por_bloque or FILAS_POR_BLOQUE
+    wb = openpyxl.load_workbook(archivo, read_only=True, data_only=True)
     try:
-        if isinstance(valor, str) and '%' in valor:
-            return float(valor.replace('%', ''))
-        # Si es decimal (0.8), lo pasamos a 80.0 si prefieres escala 0-100, 
-        # o lo dejamos tal cual si tu app usa 0.0-1.0
-        # Asumiremos que el Excel trae 0.8 para representar 80%
-        return float(valor) * 100 if float(valor) <= 1 else float(valor)
-    except:
-        return 0.0
-
-def cargar_datos():
-    db = SessionLocal()
-    print("🚀 Iniciando Análisis y Carga de Datos...")
+        hoja, saltar = _ubicar_en_libro(wb, archivo)
+        filas = hoja.iter_rows(min_row=saltar + 1, values_only=True)
+        encabezados = [str(c) if c is not None else f"Unnamed: {k}" for k, c in enumerate(next(filas))]
+        bloque, numeros = [], []
+        for numero, fila in enumerate(filas, start=saltar + 2):
+            if hasta_fila is not None and numero > hasta_fila:
+                break
+            if numero <= desde_fila or not any(v is not None for v in fila):
+                continue
+            bloque.append(fila[:len(encabezados)])
+            numeros.append(numero)
+            if len(bloque) == filas_por_bloque:
+                yield _renombrar(pd.DataFrame(bloque, columns=encabezados[:max(map(len, bloque))], index=numeros))
+                bloque, numeros = [], []
+        if bloque:
+            yield _renombrar(pd.DataFrame(bloque, columns=encabezados[:max(map(len, bloque))], index=numeros))
+    finally:
+        wb.close()
+
+# ---------------------------------------------------------------------
+# LIMPIEZA VECTORIZADA (COLUMNA COMPLETA, UNA SOLA PASADA)
+# ---------------------------------------------------------------------
+class ReporteLimpieza:
+    """Por columna: filas rechazadas (no se importan) y valores corregidos (se importan con otro valor)"""
+    def __init__(self):
+        self.rechazadas = {}
+        self.corregidas = {}
+
+    def rechazar(self, columna: str, mascara):
+        n = int(np.count_nonzero(mascara))
+        if n: self.rechazadas[columna] = self.rechazadas.get(columna, 0) + n
+
+    def corregir(self, columna: str, mascara):
+        n = int(np.count_nonzero(mascara))
+        if n: self.corregidas[columna] = self.corregidas.get(columna, 0) + n
+
+    def imprimir(self):
+        for columna in sorted(set(self.rechazadas) | set(self.corregidas)):
+            print(f"   · {columna:<18} rechazadas: {self.rechazadas.get(columna, 0):>6}  corregidas: {self.corregidas.get(columna, 0):>6}")
+
+def _columna(df: pd.DataFrame, nombre: str) -> pd.Series:
+    return df[nombre] if nombre in df.columns else pd.Series(np.nan, index=df.index, dtype="object")
+
+def _texto(serie: pd.Series) -> pd.Series:
+    """Texto sin espacios a los lados; vacío -> NA"""
+    txt = serie.astype("string").str.strip()
+    return txt.mask(txt == "")
+
+def _fechas(serie: pd.Series) -> pd.Series:
+    """Fechas con dayfirst (Perú: dd/mm/yyyy). Primero el formato dominante de la
+    columna (vectorizado); solo lo que no calza se reintenta valor por valor."""
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie.dt.normalize()
+    serie = serie.mask((serie.astype("string").str.strip() == "").fillna(False))
+    fechas = pd.to_datetime(serie, dayfirst=True, errors="coerce")
+    pendientes = fechas.isna() & serie.notna()
+    if pendientes.any():
+        fechas[pendientes] = pd.to_datetime(serie[pendientes].astype(str), dayfirst=True, errors="coerce", format="mixed")
+    return fechas.dt.normalize()
+
+def _porcentajes(serie: pd.Series) -> pd.Series:
+    """0.8 o '80%' -> 80.0 (escala 0-100). Vacío -> 0."""
+    txt = serie.astype("string").str.strip()
+    con_signo = txt.str.endswith("%").fillna(False)
+    numero = pd.to_numeric(txt.str.rstrip("%").str.replace(",", ".", regex=False).str.strip(), errors="coerce")
+    # Asumiremos que el Excel trae 0.8 para representar 80%
+    return numero.where(con_signo | (numero > 1), numero * 100)
+
+def limpiar_dataframe(df: pd.DataFrame, reporte: ReporteLimpieza = None):
+    """Devuelve (frame tipado listo para cargar, ReporteLimpieza). Conserva el índice
+    (fila del Excel). Con 'reporte' acumula sobre uno existente (carga por bloques)."""
+    reporte = reporte or ReporteLimpieza()
+    limpio = pd.DataFrame(index=df.index)
+
+    # --- Descripción: sin tarea no hay fila ---
+    descripcion = _texto(_columna(df, "descripcion"))
+    largo = descripcion.str.len()
+    reporte.corregir("descripcion", (largo > LARGO_DESCRIPCION).fillna(False))
+    limpio["descripcion"] = descripcion.str.slice(0, LARGO_DESCRIPCION)
+    valida = descripcion.notna()
+    reporte.rechazar("descripcion", ~valida)
+
+    # --- Área ---
+    limpio["codigo_area"] = _texto(_columna(df, "codigo_area"))
+    sin_area = valida & limpio["codigo_area"].isna()
+    reporte.rechazar("codigo_area", sin_area)
+    valida &= ~sin_area
+
+    # --- Responsable ---
+    responsable = _texto(_columna(df, "responsable")).str.replace(r"\s+", " ", regex=True)
+    reporte.corregir("responsable", valida & responsable.isna())
+    limpio["responsable"] = responsable.fillna("Sin Asignar")
+
+    # --- Fechas ---
+    for columna in ("fecha_origen", "fecha_compromiso", "fecha_entrega"):
+        original = _columna(df, columna)
+        fechas = _fechas(original)
+        invalida = valida & fechas.isna() & original.notna()
+        if columna == "fecha_compromiso":
+            # Obligatoria en la BD: sin fecha de compromiso la fila no entra
+            reporte.rechazar(columna, valida & fechas.isna())
+            valida &= fechas.notna()
+        else:
+            reporte.corregir(columna, invalida)  # Valor ilegible -> vacío
+        limpio[columna] = fechas
+
+    # --- Avance ---
+    original = _columna(df, "avance")
+    avance = _porcentajes(original)
+    fuera_de_rango = avance.notna() & ((avance < 0) | (avance > 100))
+    reporte.corregir("avance", valida & ((avance.isna() & original.notna()) | fuera_de_rango))
+    limpio["avance"] = avance.clip(0, 100).fillna(0.0).astype("float64")
+
+    # --- Condición (permitidas por el CHECK: Abierta, Cerrada, Atrasada, Bloqueado) ---
+    texto = (_texto(_columna(df, "condicion")).fillna("") + " " + _texto(_columna(df, "estado")).fillna("")).str.lower()
+    condicion = np.select(
+        [texto.str.contains(patron).to_numpy(dtype=bool) for patron in ("cerrad", "atrasad", "bloq|block")],
+        ["Cerrada", "Atrasada", "Bloqueado"],
+        default="Abierta",
+    )
+    limpio["condicion_actual"] = pd.Series(condicion, index=df.index, dtype="string")
+
+    # --- Evidencia ---
+    limpio["link_evidencia"] = _texto(_columna(df, "evidencia"))
+
+    return limpio[valida], reporte
+
+# ---------------------------------------------------------------------
+# RESOLUCIÓN DE MAESTROS (UNA CONSULTA POR CONJUNTO, ALTAS EN BLOQUE)
+# ---------------------------------------------------------------------
+PARAMETROS_POR_IN = 1000    # SQL Server admite hasta 2100 parámetros por sentencia
+
+def _en_partes(valores, tamano):
+    valores = list(valores)
+    for i in range(0, len(valores), tamano):
+        yield valores[i:i + tamano]
+
+def resolver_areas(db: Session, empresa_id: int, codigos) -> dict:
+    """codigo -> area_id de la empresa; crea en bloque los códigos que falten"""
+    def buscar(lista):
+        ids = {}
+        for parte in _en_partes(lista, PARAMETROS_POR_IN):
+            filas = db.query(models.Area.codigo, models.Area.id).filter(
+                models.Area.empresa_id == empresa_id, models.Area.codigo.in_(parte))
+            ids.update({codigo: id_ for codigo, id_ in filas})
+        return ids
+
+    codigos = set(codigos)
+    ids = buscar(codigos)
+    faltantes = sorted(codigos - set(ids))
+    if faltantes:
+        db.bulk_insert_mappings(models.Area, [
+            {"codigo": c, "nombre": f"Área {c}", "empresa_id": empresa_id} for c in faltantes
+        ])
+        ids.update(buscar(faltantes))
+        print(f"🏷️ {len(faltantes)} áreas nuevas.")
+    return ids
+
+def email_generado(nombre: str) -> str:
+    """Email falso estable: mismo nombre -> mismo email en cualquier corrida o archivo"""
+    base = unicodedata.normalize("NFKD", nombre).encode("ascii", "ignore").decode().lower()
+    base = re.sub(r"[^a-z0-9]+", ".", base).strip(".")[:60] or "usuario"
+    return f"{base}.{hashlib.sha1(nombre.encode('utf-8')).hexdigest()[:6]}@siviack.com"
 
+def resolver_usuarios(db: Session, empresa_id: int, nombres) -> dict:
+    """nombre_completo -> usuario_id; crea en bloque los responsables que falten"""
+    def buscar(lista):
+        ids = {}
+        for parte in _en_partes(lista, PARAMETROS_POR_IN):
+            filas = db.query(models.Usuario.nombre_completo, models.Usuario.id).filter(
+                models.Usuario.nombre_completo.in_(parte))
+            ids.update({nombre: id_ for nombre, id_ in filas})
+        return ids
+
+    nombres = list(dict.fromkeys(nombres))
+    ids = buscar(nombres)
+    faltantes = [n for n in nombres if n not in ids]
+    if faltantes:
+        db.bulk_insert_mappings(models.Usuario, [
+            {
+                "nombre_completo": nombre,
+                "email": email_generado(nombre),
+                "password_hash": "123456",
+                "rol": "CONSULTOR",
+                "empresa_id": empresa_id,
+            }
+            for nombre in faltantes
+        ])
+        ids.update(buscar(faltantes))
+        print(f"👤 {len(faltantes)} responsables nuevos.")
+    return ids
+
+# ---------------------------------------------------------------------
+# IDENTIDAD DE FILAS (RE-IMPORTACIÓN IDEMPOTENTE)
+# ---------------------------------------------------------------------
+# clave_origen: identifica la fila del SCP entre corridas = fecha de origen + área +
+#   descripción + n° de aparición (hay tareas repetidas con el mismo texto).
+# huella: resumen del contenido que se carga; si no cambió, la fila no se toca.
+_SEPARADOR = "\x1f"
+
+def _sha1_filas(columnas) -> list:
+    texto = None
+    for col in columnas:
+        col = col.astype("string").fillna("")
+        texto = col if texto is None else texto.str.cat(col, sep=_SEPARADOR)
+    return [hashlib.sha1(t.encode("utf-8")).hexdigest() for t in texto]
+
+def _fecha_txt(serie: pd.Series) -> pd.Series:
+    return serie.dt.strftime("%Y-%m-%d")
+
+class Apariciones:
+    """Cuenta las claves base ya vistas en bloques anteriores del mismo archivo.
+    Las vistas se guardan como enteros de 64 bits en un arreglo ordenado (8 bytes
+    por fila distinta); el conteo exacto solo se lleva para las que se repiten."""
+    def __init__(self):
+        self.vistas = np.empty(0, dtype=np.uint64)
+        self.repetidas = {}     # clave base -> apariciones, solo las vistas más de una vez
+
+    def numerar(self, base: pd.Series) -> pd.Series:
+        """N° de aparición (0, 1, ...) de cada fila del bloque, contando los anteriores"""
+        conteo = base.value_counts(sort=False)
+        cortas = np.array([int(c[:16], 16) for c in conteo.index], dtype=np.uint64)
+        posicion = np.searchsorted(self.vistas, cortas)
+        vista = posicion < len(self.vistas)
+        vista[vista] = self.vistas[posicion[vista]] == cortas[vista]
+        previas = pd.Series([self.repetidas.get(c, 1) if v else 0 for c, v in zip(conteo.index, vista)],
+                            index=conteo.index, dtype="int64")
+        totales = previas + conteo
+        self.repetidas.update(totales[totales > 1].to_dict())
+        self.vistas = np.union1d(self.vistas, cortas)
+        return base.groupby(base).cumcount() + base.map(previas)
+
+def _clave_base(df: pd.DataFrame) -> pd.Series:
+    return pd.Series(_sha1_filas([_fecha_txt(df["fecha_origen"]), df["codigo_area"], df["descripcion"]]), index=df.index)
+
+def identificar(df: pd.DataFrame, apariciones: Apariciones) -> pd.DataFrame:
+    """Agrega clave_origen y huella. 'apariciones' se actualiza con las claves del bloque."""
+    df = df.copy()
+    if df.empty:
+        df["clave_origen"] = pd.Series(dtype="string")
+        df["huella"] = pd.Series(dtype="string")
+        return df
+    base = _clave_base(df)
+    numero = apariciones.numerar(base)
+    df["clave_origen"] = _sha1_filas([base, numero])
+    df["huella"] = _sha1_filas([
+        df["descripcion"], df["codigo_area"], df["responsable"], _fecha_txt(df["fecha_origen"]),
+        _fecha_txt(df["fecha_compromiso"]), _fecha_txt(df["fecha_entrega"]),
+        df["avance"].round(2), df["condicion_actual"], df["link_evidencia"],
+    ])
+    return df
+
+def registros_actividades(df: pd.DataFrame, empresa_id: int, areas: dict, usuarios: dict):
+    """Filas listas para executemany: ids resueltos y tipos del driver (date / None)"""
+    salida = pd.DataFrame({
+        "empresa_id": empresa_id,
+        "area_id": df["codigo_area"].map(areas).astype("int64"),
+        "responsable_id": df["responsable"].map(usuarios).astype("int64"),
+        "descripcion": df["descripcion"],
+        "origin_date": df["fecha_origen"].fillna(pd.Timestamp(date.today())).dt.date,
+        "fecha_compromiso": df["fecha_compromiso"].dt.date,
+        "fecha_entrega_real": df["fecha_entrega"].dt.date,
+        "condicion_actual": df["condicion_actual"],
+        "avance": df["avance"].round(2),
+        "link_evidencia": df["link_evidencia"],
+        "clave_origen": df["clave_origen"],
+        "huella": df["huella"],
+    }, index=df.index)
+    # NaT / NA -> None para que el driver mande NULL
+    salida = salida.astype(object).where(salida.notna(), None)
+    return salida.to_dict("records")
+
+def guardar_actividades(db: Session, empresa_id: int, registros) -> dict:
+    """Upsert por clave_origen: inserta las nuevas, actualiza (por id, en lote) las
+    que cambiaron de huella y no toca las iguales. Devuelve los conteos."""
+    A = models.Actividad
+    existentes = {}
+    for parte in _en_partes([r["clave_origen"] for r in registros], PARAMETROS_POR_IN):
+        filas = db.query(A.clave_origen, A.id, A.huella).filter(A.empresa_id == empresa_id, A.clave_origen.in_(parte))
+        existentes.update({clave: (id_, huella) for clave, id_, huella in filas})
+
+    nuevas, cambiadas = [], []
+    for registro in registros:
+        previo = existentes.get(registro["clave_origen"])
+        if previo is None:
+            nuevas.append(registro)
+        elif previo[1] != registro["huella"]:
+            cambiadas.append({**registro, "id": previo[0]})
+
+    # executemany en lotes (fast_executemany en SQL Server)
+    for lote in _en_partes(nuevas, FILAS_POR_LOTE):
+        db.bulk_insert_mappings(A, lote)
+    for lote in _en_partes(cambiadas, FILAS_POR_LOTE):
+        db.bulk_update_mappings(A, lote)
+    return {"insertadas": len(nuevas), "actualizadas": len(cambiadas),
+            "sin_cambios": len(registros) - len(nuevas) - len(cambiadas)}
+
+# ---------------------------------------------------------------------
+# PUNTOS DE CONTROL (REANUDAR UNA CARGA CORTADA)
+# ---------------------------------------------------------------------
+# '<archivo>.checkpoint.json' guarda la última fila del Excel ya confirmada en la BD.
+# Solo vale para el mismo archivo (tamaño y fecha de modificación); se borra al terminar.
+# Las apariciones no se guardan (crecen con el archivo): al reanudar se recalculan
+# releyendo las filas ya confirmadas.
+def _ruta_checkpoint(archivo: str):
+    return archivo + ".checkpoint.json"
+
+def _huella_archivo(archivo: str):
+    info = os.stat(archivo)
+    return {"tamano": info.st_size, "modificado": info.st_mtime}
+
+def leer_checkpoint(archivo: str):
     try:
-        # 1. CREAR EMPRESA DEFAULT
-        # ----------------------------------------
-        empresa = db.query(models.Empresa).filter_by(razon_social="SIVIACK Cliente").first()
-        if not empresa:
-            empresa = models.Empresa(razon_social="SIVIACK Cliente", ruc="20600000001")
-            db.add(empresa)
-            db.commit()
-            print("🏢 Empresa base configurada.")
-
-        # 2. CARGAR Y LIMPIAR DATAFRAME
-        # ----------------------------------------
-        print(f"📂 Leyendo {ARCHIVO_SCP}...")
-        
-        # Leemos saltando las primeras 7 filas basura
-        df = pd.read_excel(ARCHIVO_SCP, skiprows=7)
-    
-        # RENOMBRAR COLUMNAS: Estandarizamos los nombres feos del Excel
-        # Esto es vital para que el código sea limpio
-        mapa_columnas = {
-            'Proceso / SP': 'codigo_area',
-            'Description of the Activity\n(BACKLOG)': 'descripcion',
-            'Responsable del Éxito\nProcess owner': 'responsable',
-            'Fecha de Entrega\nEnd Date': 'fecha_entrega',
-            'Fecha de Compromiso\nDeliver Date': 'fecha_compromiso',
-            'Origin Date': 'fecha_origen',
-            'Evidencia del Control ': 'evidencia', # Ojo con el espacio al final si lo tiene
-            'Status': 'estado',
-            '% Avance': 'avance'
-        }
-        
-        # Intentamos renombrar, si alguna columna no coincide exacto, no fallará, solo la ignora
-        df.rename(columns=mapa_columnas, inplace=True)
-        
-        # Validamos que exista la columna descripción, si no, es fila vacía
-        if 'descripcion' not in df.columns:
-            # Fallback: A veces pandas nombra columnas diferente si hay caracteres raros
-            # Buscamos la columna que contenga "BACKLOG"
-            col_desc = [c for c in df.columns if "BACKLOG" in str(c)]
-            if col_desc:
-                df.rename(columns={col_desc[0]: 'descripcion'}, inplace=True)
-        
-        df = df.dropna(subset=['descripcion']) # Borramos filas sin tarea
-        
-        print(f"📊 Procesando {len(df)} filas de actividades...")
-
-        count_nuevos = 0
-        
-        # 3. PROCESAMIENTO FILA POR FILA
-        # ----------------------------------------
-        for index, row in df.iterrows():
-            
-            # --- A. ÁREA ---
-            # Buscamos el código del área (Ej: ACD, ATH)
-            # A veces viene como "Proceso / SP" o ya renombrada a 'codigo_area'
-            cod_area = row.get('codigo_area')
-            if pd.isna(cod_area): continue
-
-            area_db = db.query(models.Area).filter_by(codigo=cod_area).first()
-            if not area_db:
-                area_db = models.Area(codigo=cod_area, nombre=f"Área {cod_area}")
-                db.add(area_db)
-                db.commit()
-                db.refresh(area_db)
-
-            # --- B. USUARIO (RESPONSABLE) ---
-            nom_resp = row.get('responsable')
-            if pd.isna(nom_resp): nom_resp = "Sin Asignar"
-            
-            # Limpieza del nombre (quitar espacios extra)
-            nom_resp = str(nom_resp).strip()
-
-            usuario_db = db.query(models.Usuario).filter_by(nombre_completo=nom_resp).first()
-            if not usuario_db:
-                # Generar email falso único
-                email_fake = f"{nom_resp.split(' ')[0].lower()}_{index}@siviack.com"
-                
-                usuario_db = models.Usuario(
-                    nombre_completo=nom_resp,
-                    email=email_fake,
-                    password_hash="123456",
-                    rol="CONSULTOR",
-                    empresa_id=empresa.id
-                )
-                db.add(usuario_db)
-                db.commit()
-                db.refresh(usuario_db)
-
-            # --- C. ACTIVIDAD ---
-            # Limpieza de fechas usando la función helper
-            f_origen = limpiar_fecha(row.get('fecha_origen'))
-            f_compromiso = limpiar_fecha(row.get('fecha_compromiso'))
-            f_entrega = limpiar_fecha(row.get('fecha_entrega'))
-            
-            # Limpieza de avance
-            val_avance = limpiar_porcentaje(row.get('avance'))
-            
-            # Limpieza de estado
-            estado_raw = str(row.get('estado', 'Abierta')).capitalize()
-            # Validamos que el estado esté en los permitidos por tu SQL Check
-            # ('Abierta', 'Cerrada', 'Atrasada', 'Bloqueado')
-            if 'Cerrada' in estado_raw: estado_final = 'Cerrada'
-            elif 'Atrasada' in estado_raw: estado_final = 'Atrasada'
-            elif 'Block' in estado_raw: estado_final = 'Bloqueado'
-            else: estado_final = 'Abierta'
-
-            # Crear Actividad
-            actividad = models.Actividad(
-                empresa_id = empresa.id,
-                area_id = area_db.id,
-                descripcion = str(row.get('descripcion'))[0:500],
-                fecha_compromiso = f_compromiso,
-                fecha_entrega_real = f_entrega,
-                estado = estado_final,
-                avance = val_avance,
-                link_evidencia = str(row.get('evidencia', ''))
-            )
-            
-            db.add(actividad)
-            count_nuevos += 1
+        with open(_ruta_checkpoint(archivo), encoding="utf-8") as f:
+            datos = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return datos if datos.get("archivo") == _huella_archivo(archivo) else None
 
+def guardar_checkpoint(archivo: str, ultima_fila: int, conteos: dict):
+    ruta = _ruta_checkpoint(archivo)
+    with open(ruta + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"archivo": _huella_archivo(archivo), "ultima_fila": ultima_fila, "conteos": conteos}, f)
+    os.replace(ruta + ".tmp", ruta)
+
+def borrar_checkpoint(archivo: str):
+    try: os.remove(_ruta_checkpoint(archivo))
+    except FileNotFoundError: pass
+
+def apariciones_hasta(archivo: str, ultima_fila: int, filas_por_bloque: int = None) -> Apariciones:
+    """Apariciones de las filas hasta 'ultima_fila' (ya confirmadas), para reanudar"""
+    apariciones = Apariciones()
+    for bloque in leer_excel_por_bloques(archivo, filas_por_bloque, hasta_fila=ultima_fila):
+        df, _ = limpiar_dataframe(bloque, ReporteLimpieza())
+        if not df.empty: apariciones.numerar(_clave_base(df))
+    return apariciones
+
+# ---------------------------------------------------------------------
+# CARGA
+# ---------------------------------------------------------------------
+def empresa_por_defecto(db: Session):
+    empresa = db.query(models.Empresa).filter_by(razon_social="SIVIACK Cliente").first()
+    if not empresa:
+        empresa = models.Empresa(razon_social="SIVIACK Cliente", ruc="20600000001")
+        db.add(empresa)
         db.commit()
-        print(f"✅ ¡ÉXITO TOTAL! Se han importado {count_nuevos} actividades limpias a SQL Server.")
+        print("🏢 Empresa base configurada.")
+    return empresa
+
+def _medir(tiempos, etapa: str, desde: float) -> float:
+    ahora = time.perf_counter()
+    if tiempos is not None:
+        tiempos[etapa] = tiempos.get(etapa, 0.0) + ahora - desde
+    return ahora
+
+def preparar_bloque(bloque: pd.DataFrame, reporte: ReporteLimpieza, apariciones: Apariciones) -> pd.DataFrame:
+    """Limpieza + identidad de un bloque leído. No toca la BD (sirve en procesos aparte)."""
+    df, _ = limpiar_dataframe(bloque, reporte)
+    return identificar(df, apariciones)
+
+def resolver_maestros(db: Session, empresa_id: int, df: pd.DataFrame, areas: dict, usuarios: dict):
+    """Completa los cachés codigo -> area_id y nombre -> usuario_id con lo que trae 'df'.
+    Solo se consultan los códigos y nombres que no se vieron en bloques anteriores."""
+    codigos = [c for c in df["codigo_area"].unique() if c not in areas]
+    if codigos: areas.update(resolver_areas(db, empresa_id, codigos))
+    nombres = [n for n in df["responsable"].unique() if n not in usuarios]
+    if nombres: usuarios.update(resolver_usuarios(db, empresa_id, nombres))
+
+def importar_archivo(db: Session, archivo: str, empresa_id: int = None, filas_por_bloque: int = FILAS_POR_BLOQUE,
+                     reiniciar: bool = False, progreso=None, tiempos: dict = None):
+    """Importa un libro SCP por bloques. Lanza la excepción si algo falla (el
+    checkpoint queda para reanudar). 'progreso(filas_leidas, conteos, reporte)'
+    se llama después de confirmar cada bloque; 'tiempos' acumula segundos por
+    etapa (lectura, limpieza, resolucion, insercion)."""
+    # 1. EMPRESA DESTINO
+    # ----------------------------------------
+    empresa = db.get(models.Empresa, empresa_id) if empresa_id else empresa_por_defecto(db)
+    if empresa is None:
+        raise ValueError(f"Empresa {empresa_id} no existe")
+
+    # 2. LEER, LIMPIAR, RESOLVER E INSERTAR POR BLOQUES
+    # ----------------------------------------
+    # Cada bloque se confirma con su propio commit y deja un checkpoint:
+    # si la carga se corta, la siguiente corrida sigue desde ahí.
+    # Re-importar el mismo libro solo inserta/actualiza lo nuevo o modificado.
+    checkpoint = None if reiniciar else leer_checkpoint(archivo)
+    desde_fila = checkpoint["ultima_fila"] if checkpoint else 0
+    conteos = checkpoint["conteos"] if checkpoint else {"insertadas": 0, "actualizadas": 0, "sin_cambios": 0}
+    apariciones = Apariciones()
+    if checkpoint:
+        print(f"⏩ Reanudando después de la fila {desde_fila}.")
+        apariciones = apariciones_hasta(archivo, desde_fila, filas_por_bloque)
+
+    print(f"📂 Leyendo {archivo}...")
+    reporte = ReporteLimpieza()
+    areas, usuarios = {}, {}
+    leidas = 0
+    bloques = leer_excel_por_bloques(archivo, filas_por_bloque, desde_fila)
+    while True:
+        t = time.perf_counter()
+        bloque = next(bloques, None)
+        t = _medir(tiempos, "lectura", t)
+        if bloque is None: break
+        leidas += len(bloque)
+        df = preparar_bloque(bloque, reporte, apariciones)
+        t = _medir(tiempos, "limpieza", t)
+        resolver_maestros(db, empresa.id, df, areas, usuarios)
+        t = _medir(tiempos, "resolucion", t)
+
+        resultado = guardar_actividades(db, empresa.id, registros_actividades(df, empresa.id, areas, usuarios))
+        db.commit()
+        _medir(tiempos, "insercion", t)
+        conteos = {k: conteos[k] + resultado[k] for k in conteos}
+        guardar_checkpoint(archivo, int(bloque.index[-1]), conteos)
+        print(f"📊 Filas hasta la {bloque.index[-1]}: {conteos}")
+        if progreso: progreso(leidas, conteos, reporte)
+
+    print(f"🧹 Limpieza: {leidas} filas leídas")
+    reporte.imprimir()
+    borrar_checkpoint(archivo)
+    return conteos
+
+def cargar_datos(archivo: str = ARCHIVO_SCP, filas_por_bloque: int = FILAS_POR_BLOQUE, reiniciar: bool = False):
+    db = SessionLocal()
+    print("🚀 Iniciando Análisis y Carga de Datos...")
+
+    try:
+        conteos = importar_archivo(db, archivo, filas_por_bloque=filas_por_bloque, reiniciar=reiniciar)
+        print(f"✅ ¡ÉXITO TOTAL! {conteos['insertadas']} insertadas, {conteos['actualizadas']} actualizadas, "
+              f"{conteos['sin_cambios']} sin cambios.")
+        return conteos
 
     except Exception as e:
+        db.rollback()
         print(f"❌ Error crítico importando datos: {e}")
         import traceback
         traceback.print_exc() # Esto nos dirá exactamente dónde falló si pasa algo
@@ -168,4 +528,6 @@ def cargar_datos():
         db.close()
 
 if __name__ == "__main__":
-    cargar_datos()
\ No newline at end of file
+    # Uso: python -m app.services.etl_carga [archivo] [--reiniciar]
+    argumentos = [a for a in sys.argv[1:] if not a.startswith("--")]
+    cargar_datos(argumentos[0] if argumentos else ARCHIVO_SCP, reiniciar="--reiniciar" in sys.argv)
@@ -0,0 +1,99 @@
+import sys
+import random
+from datetime import datetime, timedelta
+import openpyxl
+
+# ---------------------------------------------------------------------
+# CONFIGURACIÓN
+# ---------------------------------------------------------------------
+# Uso: python -m app.services.generar_scp salida.xlsx [filas] [areas] [responsables] [sucias]
+# Escribe un libro con el formato del SCP (hoja "GESTIÓN SCP", preámbulo de
+# título/KPIs y la fila de encabezados que espera etl_carga.MAPA_COLUMNAS)
+# para medir la importación con volúmenes y datos sucios controlados.
+HOJA = "GESTIÓN SCP"
+FILAS_DEFAULT = 10_000
+AREAS_DEFAULT = 40
+RESPONSABLES_DEFAULT = 200
+SUCIAS_DEFAULT = 0.05          # Proporción de fechas y porcentajes con valores sucios
+FECHA_BASE = datetime(2025, 1, 1)
+
+PREAMBULO = [
+    [None, None, None, "PLANNING AND PROYECT MANAGEMENT 2025-2026"],
+    [None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, "Código: RE-ACD-DSI-GG-5"],
+    [],
+]
+ENCABEZADOS = [
+    'Origin Date ', '#', 'SHK', 'Proceso / SP', 'Description of the Activity\n(BACKLOG)', 'DEVELOPMENT \n(DOING)',
+    'Orden de Servicio y/o Requerimiento Legal ', 'PRIODIDAD DE ATENCIÓN  ', 'Origen del Requerimiento',
+    'Tipo de Requerimiento', 'DUEÑO DEL PROCESO \nQuien Elabora', 'Tipo de Servicio ', 'Tipo de Intervención ',
+    'Quien Revisa ', 'Quien Aprueba ', 'Autoridad que lo RQ', 'Responsable del Éxito\nProcess owner',
+    'Fecha de Compromiso\nDeliver Date', 'Fecha de Entrega\nEnd Date', 'Days late', 'Prioridad de Acción',
+    'Condición Actual ', '% Avance', 'Producto Entregable', 'Medio de Control ', 'Frecuencia de Control  en días',
+    'Control de Resultados ', 'Próxima Validación ', 'Evidencia del Control ', 'Status', 'Observaciones Sugerida ',
+]
+COL = {nombre: i for i, nombre in enumerate(ENCABEZADOS)}
+
+VERBOS = ["Elaborar", "Revisar", "Validar", "Actualizar", "Solicitar", "Implementar", "Socializar"]
+OBJETOS = ["el PR de", "el MA de", "la Ficha Técnica de", "el Plan Anual de", "el Instructivo de", "los Indicadores de"]
+TEMAS = ["Mantenimiento", "SST", "Gestión Documentaria", "Remuneraciones", "Inspecciones", "Capacitación", "Compras"]
+STATUS = ["Entregado a Tiempo", "Entregado Fuera de Plazo", "En Proceso", "Bloqueado", "Enviado para su Revición"]
+FECHAS_SUCIAS = ["31/02/2025", "pendiente", "-", "2025-13-01", "N/A"]
+AVANCES_SUCIOS = ["n/a", "80 %", "1.5", "", "cien"]
+
+def _fecha(rnd, base, sucias):
+    if rnd.random() < sucias:
+        return rnd.choice(FECHAS_SUCIAS)
+    if rnd.random() < sucias:
+        return base.strftime("%d/%m/%Y")  # Fecha válida pero escrita como texto
+    return base
+
+def _avance(rnd, sucias):
+    if rnd.random() < sucias:
+        return rnd.choice(AVANCES_SUCIOS)
+    return rnd.choice([0.2, 0.5, 0.8, 1])
+
+def generar(salida: str, filas: int = FILAS_DEFAULT, areas: int = AREAS_DEFAULT,
+            responsables: int = RESPONSABLES_DEFAULT, sucias: float = SUCIAS_DEFAULT, semilla: int = 42):
+    rnd = random.Random(semilla)
+    codigos = [f"A{i:03d}" for i in range(1, areas + 1)]
+    nombres = [f"Consultor {i:04d}" for i in range(1, responsables + 1)]
+
+    wb = openpyxl.Workbook(write_only=True)  # Escribe en streaming: memoria constante
+    hoja = wb.create_sheet(HOJA)
+    for fila in PREAMBULO:
+        hoja.append(fila)
+    hoja.append(ENCABEZADOS)
+
+    for i in range(filas):
+        origen = FECHA_BASE + timedelta(days=rnd.randint(0, 540))
+        compromiso = origen + timedelta(days=rnd.randint(1, 30))
+        entregada = rnd.random() < 0.7
+        fila = [None] * len(ENCABEZADOS)
+        fila[COL['Origin Date ']] = origen
+        fila[COL['#']] = i + 1
+        fila[COL['Proceso / SP']] = rnd.choice(codigos)
+        fila[COL['Description of the Activity\n(BACKLOG)']] = f"{rnd.choice(VERBOS)} {rnd.choice(OBJETOS)} {rnd.choice(TEMAS)} #{i + 1}"
+        fila[COL['Responsable del Éxito\nProcess owner']] = rnd.choice(nombres)
+        fila[COL['Fecha de Compromiso\nDeliver Date']] = _fecha(rnd, compromiso, sucias)
+        if entregada:
+            fila[COL['Fecha de Entrega\nEnd Date']] = _fecha(rnd, compromiso + timedelta(days=rnd.randint(-5, 10)), sucias)
+        fila[COL['Condición Actual ']] = "Cerrada" if entregada else "Abierta"
+        fila[COL['% Avance']] = 1 if entregada else _avance(rnd, sucias)
+        fila[COL['Status']] = rnd.choice(STATUS)
+        hoja.append(fila)
+
+    wb.save(salida)
+    return salida
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("Uso: python -m app.services.generar_scp salida.xlsx [filas] [areas] [responsables] [sucias]")
+    argumentos = sys.argv[1:]
+    generar(
+        argumentos[0],
+        filas=int(argumentos[1]) if len(argumentos) > 1 else FILAS_DEFAULT,
+        areas=int(argumentos[2]) if len(argumentos) > 2 else AREAS_DEFAULT,
+        responsables=int(argumentos[3]) if len(argumentos) > 3 else RESPONSABLES_DEFAULT,
+        sucias=float(argumentos[4]) if len(argumentos) > 4 else SUCIAS_DEFAULT,
+    )
+    print(f"📄 Libro SCP generado en {argumentos[0]}")
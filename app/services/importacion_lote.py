@@ -0,0 +1,151 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import pandas as pd
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.core import cache
+from app.db.database import SessionLocal
+from app.db import models
+from app.services import busqueda, etl_carga, recalculo
+
+# ---------------------------------------------------------------------
+# CONFIGURACIÓN
+# ---------------------------------------------------------------------
+# Uso: python -m app.services.importacion_lote <carpeta | libro.xlsx[=empresa]> ... [--procesos=N]
+# Un libro SCP por cliente. Cada libro va a la empresa indicada tras '=' (RUC o razón
+# social); sin '=', a la que coincida con el nombre del archivo (se crea si no existe).
+# Lectura y limpieza corren en procesos aparte (pandas/openpyxl no liberan el GIL);
+# este proceso es el único escritor: resuelve maestros e inserta por empresa.
+# Los bloques limpios pasan por disco (un pickle por bloque), no por la memoria:
+# ni el trabajador ni el escritor tienen más de un bloque a la vez.
+PROCESOS = int(os.getenv("SIVIACK_IMPORT_PROCESOS", str(os.cpu_count() or 1)))
+EN_VUELO_POR_PROCESO = 2    # Libros limpios esperando al escritor (acota el disco temporal)
+
+# ---------------------------------------------------------------------
+# TRABAJADORES (SIN BD)
+# ---------------------------------------------------------------------
+def _preparar_libro(archivo: str, filas_por_bloque: int):
+    """Lee y limpia el libro bloque a bloque, guardando cada bloque limpio en una carpeta
+    temporal. Devuelve (carpeta, rutas de los bloques, reporte, filas leídas)."""
+    reporte = etl_carga.ReporteLimpieza()
+    apariciones, bloques, leidas = etl_carga.Apariciones(), [], 0
+    carpeta = tempfile.mkdtemp(prefix="lote_")
+    try:
+        for numero, bloque in enumerate(etl_carga.leer_excel_por_bloques(archivo, filas_por_bloque)):
+            leidas += len(bloque)
+            ruta = os.path.join(carpeta, f"{numero:06d}.pkl")
+            etl_carga.preparar_bloque(bloque, reporte, apariciones).to_pickle(ruta)
+            bloques.append(ruta)
+    except Exception:
+        shutil.rmtree(carpeta, ignore_errors=True)
+        raise
+    return carpeta, bloques, reporte, leidas
+
+# ---------------------------------------------------------------------
+# ESCRITOR (UN SOLO PROCESO CON BD)
+# ---------------------------------------------------------------------
+def libros_de(entradas) -> list:
+    """[(archivo, clave_empresa)] a partir de carpetas y 'libro.xlsx[=empresa]'"""
+    libros = []
+    for entrada in entradas:
+        ruta, _, clave = entrada.partition("=")
+        if os.path.isdir(ruta):
+            libros.extend(
+                (os.path.join(ruta, nombre), os.path.splitext(nombre)[0])
+                for nombre in sorted(os.listdir(ruta))
+                if nombre.lower().endswith(".xlsx") and not nombre.startswith("~$")
+            )
+        else:
+            libros.append((ruta, clave or os.path.splitext(os.path.basename(ruta))[0]))
+    return libros
+
+def empresa_para(db: Session, clave: str):
+    """Empresa por RUC o razón social (sin distinguir mayúsculas); la crea si no existe"""
+    E = models.Empresa
+    empresa = db.query(E).filter((E.ruc == clave) | (func.lower(E.razon_social) == clave.lower())).first()
+    if not empresa:
+        empresa = E(razon_social=clave)
+        db.add(empresa)
+        db.commit()
+        print(f"🏢 Empresa '{clave}' creada.")
+    return empresa
+
+def _escribir(db: Session, empresa_id: int, bloques: list, areas: dict, usuarios: dict):
+    """Inserta los bloques en orden, cargando uno a la vez y borrándolo al confirmar"""
+    conteos = {"insertadas": 0, "actualizadas": 0, "sin_cambios": 0}
+    for ruta in bloques:
+        parte = pd.read_pickle(ruta)
+        if parte.empty:
+            os.remove(ruta)
+            continue
+        etl_carga.resolver_maestros(db, empresa_id, parte, areas, usuarios)
+        resultado = etl_carga.guardar_actividades(
+            db, empresa_id, etl_carga.registros_actividades(parte, empresa_id, areas, usuarios))
+        db.commit()
+        os.remove(ruta)
+        conteos = {k: conteos[k] + resultado[k] for k in conteos}
+    return conteos
+
+def importar_lote(libros, procesos: int = PROCESOS, filas_por_bloque: int = etl_carga.FILAS_POR_BLOQUE) -> dict:
+    """Importa [(archivo, clave_empresa)] en paralelo. Devuelve {archivo: conteos | error}.
+    Un libro que falla no detiene a los demás; re-ejecutar es seguro (upsert por clave_origen).
+    Al final recalcula los estados de las empresas tocadas, como la importación de un archivo."""
+    db = SessionLocal()
+    resultados = {}
+    empresas = set()   # También las de libros fallidos: sus bloques confirmados quedan en la BD
+    areas_por_empresa, usuarios = {}, {}   # Cachés de maestros compartidos entre libros
+    pendientes = list(reversed(libros))
+    en_vuelo = {}
+    try:
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            while pendientes or en_vuelo:
+                while pendientes and len(en_vuelo) < procesos * EN_VUELO_POR_PROCESO:
+                    archivo, clave = pendientes.pop()
+                    en_vuelo[pool.submit(_preparar_libro, archivo, filas_por_bloque)] = (archivo, clave)
+                listos, _ = wait(en_vuelo, return_when=FIRST_COMPLETED)
+                for futuro in listos:
+                    archivo, clave = en_vuelo.pop(futuro)
+                    carpeta = None
+                    try:
+                        carpeta, bloques, reporte, leidas = futuro.result()
+                        empresa = empresa_para(db, clave)
+                        empresas.add(empresa.id)
+                        areas = areas_por_empresa.setdefault(empresa.id, {})
+                        conteos = _escribir(db, empresa.id, bloques, areas, usuarios)
+                        resultados[archivo] = {"empresa": empresa.razon_social, "leidas": leidas,
+                                               "rechazadas": sum(reporte.rechazadas.values()), **conteos}
+                        print(f"✅ {archivo} -> {empresa.razon_social}: {resultados[archivo]}")
+                    except Exception as e:
+                        db.rollback()
+                        resultados[archivo] = {"error": str(e)}
+                        print(f"❌ {archivo}: {e}")
+                    finally:
+                        if carpeta: shutil.rmtree(carpeta, ignore_errors=True)
+        if empresas:
+            cambios = recalculo.recalcular_estados(db, empresas=sorted(empresas))  # days_late / prioridad
+            print(f"🔄 Recalculo de estados: {cambios}")
+    finally:
+        db.close()
+        # Empresas, responsables y actividades nuevas. Otros procesos (la API) las ven por el
+        # TTL de la caché y el delta-sync del índice; esto cubre el llamado desde la misma app.
+        cache.empresas.invalidar()
+        cache.usuarios.invalidar()
+        busqueda.indice.invalidar()
+    return resultados
+
+if __name__ == "__main__":
+    argumentos = [a for a in sys.argv[1:] if not a.startswith("--")]
+    procesos = next((int(a.split("=", 1)[1]) for a in sys.argv[1:] if a.startswith("--procesos=")), PROCESOS)
+    if not argumentos:
+        sys.exit("Uso: python -m app.services.importacion_lote <carpeta | libro.xlsx[=empresa]> ... [--procesos=N]")
+    libros = libros_de(argumentos)
+    print(f"🚀 Importando {len(libros)} libros con {procesos} procesos...")
+    inicio = time.perf_counter()
+    resultados = importar_lote(libros, procesos)
+    fallidos = [a for a, r in resultados.items() if "error" in r]
+    print(f"🏁 {len(libros) - len(fallidos)} libros importados en {time.perf_counter() - inicio:.1f} s, {len(fallidos)} con error.")
+    sys.exit(1 if fallidos else 0)
@@ -0,0 +1,99 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from app.db.database import SessionLocal
+from app.core import cache
+from app.services import busqueda, etl_carga, recalculo
+
+# ---------------------------------------------------------------------
+# CONFIGURACIÓN
+# ---------------------------------------------------------------------
+# Las importaciones subidas por la API corren en un pool propio: el request
+# solo guarda el archivo y devuelve el id del trabajo.
+IMPORT_WORKERS = int(os.getenv("SIVIACK_IMPORT_WORKERS", "2"))
+MAX_TRABAJOS_GUARDADOS = 200     # Historial en memoria (los terminados más viejos se olvidan)
+
+EN_COLA, EN_PROCESO, COMPLETADO, ERROR = "EN_COLA", "EN_PROCESO", "COMPLETADO", "ERROR"
+
+class Trabajo:
+    def __init__(self, archivo: str, nombre_original: str, empresa_id=None, solicitado_por=None):
+        self.id = uuid.uuid4().hex
+        self.archivo = archivo                  # Temporal en disco (se borra al terminar)
+        self.nombre_archivo = nombre_original
+        self.empresa_id = empresa_id
+        self.solicitado_por = solicitado_por
+        self.estado = EN_COLA
+        self.filas_leidas = 0
+        self.rechazadas = 0
+        self.insertadas = 0
+        self.actualizadas = 0
+        self.sin_cambios = 0
+        self.error = None
+        self.creado_en = datetime.now().astimezone()
+        self.iniciado_en = None
+        self.terminado_en = None
+        self._inicio = None
+        self._fin = None
+
+    @property
+    def filas_por_segundo(self):
+        if self._inicio is None: return 0.0
+        fin = self._fin if self.terminado_en else time.monotonic()
+        return round(self.filas_leidas / max(fin - self._inicio, 1e-6), 1)
+
+    def _progreso(self, leidas, conteos, reporte):
+        self.filas_leidas = leidas
+        self.rechazadas = sum(reporte.rechazadas.values())
+        self.insertadas = conteos["insertadas"]
+        self.actualizadas = conteos["actualizadas"]
+        self.sin_cambios = conteos["sin_cambios"]
+
+_pool = ThreadPoolExecutor(max_workers=IMPORT_WORKERS, thread_name_prefix="importacion")
+_trabajos = OrderedDict()    # id -> Trabajo
+_lock = threading.Lock()
+
+def _ejecutar(trabajo: Trabajo):
+    trabajo.estado = EN_PROCESO
+    trabajo.iniciado_en = datetime.now().astimezone()
+    trabajo._inicio = time.monotonic()
+    db = SessionLocal()
+    try:
+        etl_carga.importar_archivo(db, trabajo.archivo, empresa_id=trabajo.empresa_id,
+                                   reiniciar=True, progreso=trabajo._progreso)
+        recalculo.recalcular_estados(db)  # days_late / prioridad de lo recién cargado
+        trabajo.estado = COMPLETADO
+    except Exception as e:
+        db.rollback()
+        trabajo.error = str(e)
+        trabajo.estado = ERROR
+        print(f"❌ Importación {trabajo.id} falló: {e}")
+    finally:
+        db.close()
+        trabajo._fin = time.monotonic()
+        trabajo.terminado_en = datetime.now().astimezone()
+        # Aun si falló, los bloques ya confirmados quedan en la BD: pudo crear la empresa
+        # base y responsables nuevos, y el índice de búsqueda aún no ve las actividades
+        cache.empresas.invalidar()
+        cache.usuarios.invalidar()
+        busqueda.indice.invalidar()
+        etl_carga.borrar_checkpoint(trabajo.archivo)
+        try: os.remove(trabajo.archivo)
+        except OSError: pass
+
+def encolar(archivo: str, nombre_original: str, empresa_id=None, solicitado_por=None) -> Trabajo:
+    trabajo = Trabajo(archivo, nombre_original, empresa_id, solicitado_por)
+    with _lock:
+        _trabajos[trabajo.id] = trabajo
+        terminados = [t.id for t in _trabajos.values() if t.estado in (COMPLETADO, ERROR)]
+        for id_ in terminados[:max(0, len(_trabajos) - MAX_TRABAJOS_GUARDADOS)]:
+            del _trabajos[id_]
+    _pool.submit(_ejecutar, trabajo)
+    return trabajo
+
+def obtener(id_: str):
+    with _lock:
+        return _trabajos.get(id_)
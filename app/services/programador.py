@@ -0,0 +1,69 @@
+import os
+import sys
+import threading
+import time
+from app.core.bloqueos import BloqueoGlobal
+from app.services import recalculo, retencion
+
+# ---------------------------------------------------------------------
+# CONFIGURACIÓN
+# ---------------------------------------------------------------------
+# Tareas periódicas que corren en UN solo proceso aunque haya varios workers (o
+# varios hosts): el recálculo de estados y la retención de auditoría (dos procesos
+# archivando y borrando a la vez se pisan los lotes). Cada worker intenta tomar el
+# bloqueo global; el que lo tiene corre las tareas y los demás reintentan cada
+# SEGUNDOS_ENTRE_INTENTOS, por si ese proceso muere.
+# Con SIVIACK_PROGRAMADOR=externo los workers no corren nada y se agenda en cron:
+# Uso: python -m app.services.programador [tarea ...]   (ej: retencion-auditoria)
+MODO = os.getenv("SIVIACK_PROGRAMADOR", "workers")   # "workers" o "externo"
+NOMBRE_BLOQUEO = "siviack-programador"
+SEGUNDOS_ENTRE_INTENTOS = 60
+TAREAS = {
+    "recalculo-estados": (recalculo.ejecutar, recalculo.INTERVALO_RECALCULO_HORAS),
+    "retencion-auditoria": (retencion.ejecutar, retencion.INTERVALO_RETENCION_HORAS),
+}
+
+def _ciclo(bloqueo: BloqueoGlobal):
+    proximas = {}   # tarea -> time.monotonic() de la próxima corrida; vacío = recién tomado
+    while True:
+        if not bloqueo.tomar():
+            proximas = {}
+            time.sleep(SEGUNDOS_ENTRE_INTENTOS)
+            continue
+        for nombre, (tarea, horas) in TAREAS.items():
+            if nombre not in proximas or time.monotonic() >= proximas[nombre]:
+                tarea()
+                proximas[nombre] = time.monotonic() + horas * 3600
+        # Se despierta al menos cada SEGUNDOS_ENTRE_INTENTOS para verificar que sigue teniendo el bloqueo
+        espera = min(proximas.values()) - time.monotonic()
+        time.sleep(max(0.0, min(espera, SEGUNDOS_ENTRE_INTENTOS)))
+
+def iniciar():
+    """Hilo demonio de cada worker: corre las tareas solo mientras tiene el bloqueo"""
+    if MODO == "externo":
+        return None
+    hilo = threading.Thread(target=_ciclo, args=(BloqueoGlobal(NOMBRE_BLOQUEO),), name="programador", daemon=True)
+    hilo.start()
+    return hilo
+
+def ejecutar_una_vez(nombres=None) -> bool:
+    """Corre las tareas (todas o las nombradas) si ningún otro proceso tiene el bloqueo"""
+    bloqueo = BloqueoGlobal(NOMBRE_BLOQUEO)
+    if not bloqueo.tomar():
+        return False
+    try:
+        for nombre in nombres or TAREAS:
+            TAREAS[nombre][0]()
+    finally:
+        bloqueo.soltar()
+    return True
+
+if __name__ == "__main__":
+    nombres = sys.argv[1:]
+    desconocidas = [n for n in nombres if n not in TAREAS]
+    if desconocidas:
+        print(f"❌ Tareas desconocidas: {', '.join(desconocidas)} (disponibles: {', '.join(TAREAS)})")
+        sys.exit(2)
+    if not ejecutar_una_vez(nombres):
+        print("⏳ Las tareas ya corren en otro proceso (bloqueo tomado)")
+        sys.exit(1)
@@ -0,0 +1,118 @@
+from datetime import date
+from sqlalchemy import update, case, func, select, or_, Integer, literal
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+from sqlalchemy.orm import Session
+from app.db.database import SessionLocal
+from app.db import models
+
+# ---------------------------------------------------------------------
+# CONFIGURACIÓN
+# ---------------------------------------------------------------------
+INTERVALO_RECALCULO_HORAS = 6   # Cada cuánto lo corre app.services.programador
+DIAS_POR_VENCER = 7             # Ventana para marcar "Por Vencer"
+CONDICIONES_MANUALES = ("Cerrada", "Bloqueado")  # Las fija el consultor, no las fechas
+# Status del catálogo que ya cierran la actividad aunque falte fecha_entrega_real
+# ("Entregado a Tiempo", "Entregado Fuera de Plazo", "... Cerrada")
+PATRONES_STATUS_CERRADO = ("entregado%", "%cerrad%")
+
+def status_cerrado():
+    """Condición SQL: el status de la actividad es uno de los que la dan por cerrada"""
+    S = models.StatusActividad
+    ids = select(S.id).where(or_(*[func.lower(S.nombre).like(p) for p in PATRONES_STATUS_CERRADO]))
+    return models.Actividad.status_id.in_(ids)
+
+# ---------------------------------------------------------------------
+# DIFERENCIA DE DÍAS PORTABLE (SQL Server / SQLite / otros)
+# ---------------------------------------------------------------------
+class dias_entre(FunctionElement):
+    """Días enteros desde 'inicio' hasta 'fin' (fin - inicio)"""
+    type = Integer()
+    inherit_cache = True
+
+@compiles(dias_entre)
+def _dias_entre_default(element, compiler, **kw):
+    inicio, fin = list(element.clauses)
+    return f"({compiler.process(fin, **kw)} - {compiler.process(inicio, **kw)})"
+
+@compiles(dias_entre, "mssql")
+def _dias_entre_mssql(element, compiler, **kw):
+    inicio, fin = list(element.clauses)
+    return f"DATEDIFF(day, {compiler.process(inicio, **kw)}, {compiler.process(fin, **kw)})"
+
+@compiles(dias_entre, "sqlite")
+def _dias_entre_sqlite(element, compiler, **kw):
+    inicio, fin = list(element.clauses)
+    return f"CAST(julianday({compiler.process(fin, **kw)}) - julianday({compiler.process(inicio, **kw)}) AS INTEGER)"
+
+# ---------------------------------------------------------------------
+# REGLAS (EXPRESADAS EN SQL)
+# ---------------------------------------------------------------------
+def _expresiones(hoy: date):
+    A = models.Actividad
+    hoy_sql = literal(hoy)
+    entregada = A.fecha_entrega_real.isnot(None)
+    cerrada_por_status = status_cerrado()
+
+    condicion = case(
+        (A.condicion_actual.in_(CONDICIONES_MANUALES), A.condicion_actual),
+        (entregada | cerrada_por_status, "Cerrada"),
+        (A.fecha_compromiso < hoy_sql, "Atrasada"),
+        else_="Abierta",
+    )
+    # Con entrega: retraso real de la entrega. Sin entrega y sin cerrar: retraso a la fecha.
+    dias = case(
+        (entregada, dias_entre(A.fecha_compromiso, A.fecha_entrega_real)),
+        (A.condicion_actual == "Cerrada", 0),
+        (cerrada_por_status, 0),
+        else_=dias_entre(A.fecha_compromiso, hoy_sql),
+    )
+    days_late = case((dias > 0, dias), else_=0)
+    prioridad = case(
+        (entregada | (A.condicion_actual == "Cerrada") | cerrada_por_status, "Completada"),
+        (A.fecha_compromiso < hoy_sql, "Atrasada"),
+        (dias_entre(hoy_sql, A.fecha_compromiso) <= DIAS_POR_VENCER, "Por Vencer"),
+        else_="En Plazo",
+    )
+    return condicion, days_late, prioridad
+
+def recalcular_estados(db: Session, hoy: date = None, ids=None, empresas=None):
+    """Actualiza condicion_actual, days_late y prioridad_accion con UPDATEs por conjunto.
+    Solo toca filas cuyo valor guardado difiere del calculado. Devuelve filas cambiadas por
+    campo (rowcount de cada UPDATE): una fila que cambió en dos campos cuenta en los dos, así
+    que la suma no es el total de filas distintas."""
+    hoy = hoy or date.today()
+    A = models.Actividad
+    cambios = {}
+
+    # El orden importa: days_late y prioridad leen la condición ya actualizada
+    for campo in ("condicion_actual", "days_late", "prioridad_accion"):
+        condicion, days_late, prioridad = _expresiones(hoy)
+        valor = {"condicion_actual": condicion, "days_late": days_late, "prioridad_accion": prioridad}[campo]
+        columna = getattr(A, campo)
+        stmt = update(A).where(columna.is_distinct_from(valor)).values({campo: valor})
+        if ids is not None:
+            stmt = stmt.where(A.id.in_(ids))
+        if empresas is not None:
+            stmt = stmt.where(A.empresa_id.in_(empresas))
+        cambios[campo] = db.execute(stmt.execution_options(synchronize_session=False)).rowcount
+    db.commit()
+    return cambios
+
+# ---------------------------------------------------------------------
+# EJECUCIÓN PROGRAMADA
+# ---------------------------------------------------------------------
+def ejecutar():
+    db = SessionLocal()
+    try:
+        cambios = recalcular_estados(db)
+        print(f"🔄 Recalculo de estados: {cambios}")
+        return cambios
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error en recalculo de estados: {e}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    ejecutar()   # Idempotente: se puede correr a mano aunque el programador esté activo
@@ -0,0 +1,246 @@
+import zipfile
+from datetime import date
+from xml.sax.saxutils import escape
+from app.db.database import SessionLocal
+from app.db import models
+from app.services import consultas
+
+# ---------------------------------------------------------------------
+# EXPORTACIÓN DE REPORTES (EXCEL / PDF) EN STREAMING
+# ---------------------------------------------------------------------
+# Mismas columnas que exportaba el Dashboard en el navegador
+COLUMNAS = ["ID", "Cliente", "Área", "Descripción", "Responsable", "Vence", "Estado", "Avance (%)"]
+ANCHOS_XLSX = [8, 25, 12, 40, 20, 15, 18, 12]
+FILAS_POR_LOTE = 1000
+TAMANO_CHUNK = 64 * 1024
+
+def filas_reporte(filtros: dict):
+    """Lee solo las columnas del reporte desde un cursor del servidor, lote por lote.
+    Abre su propia sesión porque se consume mientras se envía la respuesta."""
+    db = SessionLocal()
+    try:
+        query = (
+            db.query(
+                models.Actividad.id,
+                models.Empresa.razon_social,
+                models.Area.codigo,
+                models.Actividad.descripcion,
+                models.Usuario.nombre_completo,
+                models.Actividad.fecha_compromiso,
+                models.StatusActividad.nombre,
+                models.Actividad.avance,
+            )
+            .select_from(models.Actividad)
+            .outerjoin(models.Empresa, models.Actividad.empresa_id == models.Empresa.id)
+            .outerjoin(models.Area, models.Actividad.area_id == models.Area.id)
+            .outerjoin(models.Usuario, models.Actividad.responsable_id == models.Usuario.id)
+            .outerjoin(models.StatusActividad, models.Actividad.status_id == models.StatusActividad.id)
+        )
+        query = consultas.paginar_keyset(consultas.filtrar_actividades(query, **filtros))
+        for id_, empresa, area, desc, resp, vence, estado, avance in query.yield_per(FILAS_POR_LOTE):
+            yield (
+                id_,
+                empresa or "N/A",
+                area or "N/A",
+                desc or "",
+                resp or "S/A",
+                vence.isoformat() if vence else "-",
+                estado or "Abierta",
+                float(avance or 0),
+            )
+    finally:
+        db.close()
+
+class _BufferSalida:
+    """Destino de escritura no 'seekable' que se vacía en cada yield del generador"""
+    def __init__(self):
+        self.partes = []
+        self.tamano = 0
+        self.posicion = 0
+
+    def write(self, datos):
+        self.partes.append(bytes(datos))
+        self.tamano += len(datos)
+        self.posicion += len(datos)
+        return len(datos)
+
+    def tell(self):
+        return self.posicion
+
+    def flush(self):
+        pass
+
+    def vaciar(self):
+        datos = b"".join(self.partes)
+        self.partes, self.tamano = [], 0
+        return datos
+
+# ---------------------------------------------------------------------
+# EXCEL (.xlsx) — SpreadsheetML mínimo escrito fila por fila en un ZIP
+# ---------------------------------------------------------------------
+_XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+_XLSX_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_XLSX_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="Reporte SIVIACK" sheetId="1" r:id="rId1"/></sheets></workbook>'
+)
+_XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+    '</Relationships>'
+)
+# Estilo 1: encabezado en negrita, texto blanco sobre azul SIVIACK (#002B5C)
+_XLSX_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><color rgb="FFFFFFFF"/><name val="Calibri"/></font></fonts>'
+    '<fills count="3"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill>'
+    '<fill><patternFill patternType="solid"><fgColor rgb="FF002B5C"/></patternFill></fill></fills>'
+    '<borders count="1"><border/></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="2" borderId="0" xfId="0" applyFont="1" applyFill="1"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+def _celda_xlsx(valor, estilo=""):
+    if isinstance(valor, (int, float)):
+        return f"<c{estilo}><v>{valor}</v></c>"
+    return f'<c t="inlineStr"{estilo}><is><t xml:space="preserve">{escape(str(valor))}</t></is></c>'
+
+def stream_xlsx(filtros: dict):
+    """Genera el .xlsx por partes: memoria constante sin importar el número de filas"""
+    salida = _BufferSalida()
+    with zipfile.ZipFile(salida, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("[Content_Types].xml", _XLSX_CONTENT_TYPES)
+        zf.writestr("_rels/.rels", _XLSX_RELS)
+        zf.writestr("xl/workbook.xml", _XLSX_WORKBOOK)
+        zf.writestr("xl/_rels/workbook.xml.rels", _XLSX_WORKBOOK_RELS)
+        zf.writestr("xl/styles.xml", _XLSX_STYLES)
+
+        with zf.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as hoja:
+            cols = "".join(f'<col min="{i}" max="{i}" width="{w}" customWidth="1"/>' for i, w in enumerate(ANCHOS_XLSX, 1))
+            hoja.write((
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                f'<cols>{cols}</cols><sheetData>'
+                '<row>' + "".join(_celda_xlsx(c, ' s="1"') for c in COLUMNAS) + '</row>'
+            ).encode("utf-8"))
+
+            for fila in filas_reporte(filtros):
+                hoja.write(("<row>" + "".join(_celda_xlsx(v) for v in fila) + "</row>").encode("utf-8"))
+                if salida.tamano >= TAMANO_CHUNK:
+                    yield salida.vaciar()
+
+            hoja.write(b"</sheetData></worksheet>")
+    yield salida.vaciar()
+
+# ---------------------------------------------------------------------
+# PDF — páginas A4 horizontales escritas a medida que llegan las filas
+# ---------------------------------------------------------------------
+PDF_ANCHO, PDF_ALTO = 842, 595
+PDF_FILAS_POR_PAGINA = 38
+PDF_X_COLUMNAS = [30, 75, 205, 255, 525, 625, 685, 785]
+
+def _texto_pdf(valor):
+    """Escapa para un string literal PDF en WinAnsi (tildes y ñ incluidas)"""
+    txt = str(valor).encode("cp1252", "replace").decode("latin-1")
+    return txt.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def _celdas_pdf(fila):
+    id_, empresa, area, desc, resp, vence, estado, avance = fila
+    return [
+        id_,
+        empresa[0:20],
+        area,
+        (desc[0:50] + "...") if len(desc) > 50 else desc,
+        resp.split(" ")[0] if resp else "-",
+        vence,
+        estado[0:18],
+        f"{avance:g}%",
+    ]
+
+def _contenido_pagina(filas, encabezado):
+    ops = ["BT /F1 16 Tf 0 0.17 0.36 rg 30 560 Td (" + _texto_pdf("Reporte de Actividades - SIVIACK") + ") Tj ET"]
+    ops.append("BT /F1 9 Tf 0.4 0.4 0.4 rg 30 545 Td (" + _texto_pdf(encabezado) + ") Tj ET")
+    ops.append("0 0.17 0.36 rg 25 515 792 18 re f")
+    y = 521
+    for x, titulo in zip(PDF_X_COLUMNAS, COLUMNAS):
+        ops.append(f"BT /F2 8 Tf 1 1 1 rg {x} {y} Td ({_texto_pdf(titulo)}) Tj ET")
+    for i, fila in enumerate(filas):
+        y = 503 - i * 13
+        if i % 2:
+            ops.append(f"0.96 0.96 0.96 rg 25 {y - 4} 792 13 re f")
+        for x, valor in zip(PDF_X_COLUMNAS, _celdas_pdf(fila)):
+            ops.append(f"BT /F1 8 Tf 0 0 0 rg {x} {y} Td ({_texto_pdf(valor)}) Tj ET")
+    return "\n".join(ops).encode("latin-1")
+
+def stream_pdf(filtros: dict, generado_por: str):
+    """Genera el PDF página por página; solo la tabla xref se guarda hasta el final"""
+    encabezado = f"Generado por: {generado_por} | Fecha: {date.today().strftime('%d/%m/%Y')}"
+    offsets = {}
+    kids = []
+    posicion = 0
+    siguiente_obj = 5  # 1: Catalog, 2: Pages, 3-4: Fuentes
+
+    def objeto(num, cuerpo: bytes):
+        nonlocal posicion
+        offsets[num] = posicion
+        datos = f"{num} 0 obj\n".encode() + cuerpo + b"\nendobj\n"
+        posicion += len(datos)
+        return datos
+
+    def pagina(filas):
+        nonlocal siguiente_obj
+        contenido = _contenido_pagina(filas, encabezado)
+        num_contenido, num_pagina = siguiente_obj, siguiente_obj + 1
+        siguiente_obj += 2
+        kids.append(num_pagina)
+        return objeto(num_contenido, f"<< /Length {len(contenido)} >>\nstream\n".encode() + contenido + b"\nendstream") + objeto(
+            num_pagina,
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PDF_ANCHO} {PDF_ALTO}] "
+            f"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents {num_contenido} 0 R >>".encode(),
+        )
+
+    cabecera = b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n"
+    posicion = len(cabecera)
+    yield cabecera + objeto(1, b"<< /Type /Catalog /Pages 2 0 R >>") + objeto(
+        3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"
+    ) + objeto(4, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>")
+
+    filas = []
+    for fila in filas_reporte(filtros):
+        filas.append(fila)
+        if len(filas) == PDF_FILAS_POR_PAGINA:
+            yield pagina(filas)
+            filas = []
+    if filas or not kids:
+        yield pagina(filas)
+
+    paginas = objeto(2, f"<< /Type /Pages /Kids [{' '.join(f'{k} 0 R' for k in kids)}] /Count {len(kids)} >>".encode())
+    inicio_xref = posicion
+    xref = [f"xref\n0 {siguiente_obj}\n", "0000000000 65535 f \n"]
+    xref += [f"{offsets[n]:010d} 00000 n \n" for n in range(1, siguiente_obj)]
+    yield paginas + "".join(xref).encode() + (
+        f"trailer\n<< /Size {siguiente_obj} /Root 1 0 R >>\nstartxref\n{inicio_xref}\n%%EOF\n"
+    ).encode()
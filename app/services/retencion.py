@@ -0,0 +1,155 @@
+import gzip
+import heapq
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session
+from app.db.database import SessionLocal
+from app.db import models
+from app.services import auditoria
+
+# ---------------------------------------------------------------------
+# CONFIGURACIÓN
+# ---------------------------------------------------------------------
+# Los eventos de auditoría más viejos que DIAS_RETENCION salen de 'audit_logs'
+# a segmentos gzip JSONL en disco, uno por corrida y por mes:
+#   <DIRECTORIO_ARCHIVO>/2025-03/1739990000000000000.jsonl.gz
+# Los segmentos no se reescriben nunca; la consulta solo abre los meses del rango.
+DIAS_RETENCION = int(os.getenv("SIVIACK_AUDIT_RETENCION_DIAS", "180"))
+DIRECTORIO_ARCHIVO = os.getenv("SIVIACK_AUDIT_ARCHIVO", "archivo_auditoria")
+FILAS_POR_LOTE = 1000             # Filas movidas (y borradas) por transacción
+INTERVALO_RETENCION_HORAS = 24   # Cada cuánto lo corre app.services.programador
+COLUMNAS = ("id", "fecha", "usuario", "rol", "accion", "entidad", "detalle")
+
+# ---------------------------------------------------------------------
+# ARCHIVADO
+# ---------------------------------------------------------------------
+def _escribir_segmento(directorio: str, mes: str, filas):
+    """Escribe un segmento nuevo del mes y lo publica con un rename atómico"""
+    carpeta = os.path.join(directorio, mes)
+    os.makedirs(carpeta, exist_ok=True)
+    ruta = os.path.join(carpeta, f"{time.time_ns()}.jsonl.gz")
+    with open(ruta + ".tmp", "wb") as crudo:
+        with gzip.GzipFile(fileobj=crudo, mode="wb") as gz:
+            for fila in filas:
+                gz.write((json.dumps({**fila, "fecha": fila["fecha"].isoformat()}, ensure_ascii=False) + "\n").encode("utf-8"))
+        crudo.flush()
+        os.fsync(crudo.fileno())
+    os.replace(ruta + ".tmp", ruta)
+    return ruta
+
+def archivar(db: Session, dias: int = DIAS_RETENCION, directorio: str = DIRECTORIO_ARCHIVO):
+    """Mueve al archivo los eventos con más de 'dias' y los borra por lotes.
+    Cada lote queda en disco antes de borrarse: un corte a mitad puede duplicar
+    un lote en el archivo (la consulta deduplica por id), nunca perderlo."""
+    L = models.AuditLog
+    limite = datetime.now().astimezone() - timedelta(days=dias)
+    columnas = [getattr(L, c) for c in COLUMNAS]
+    movidas = 0
+    while True:
+        filas = [fila._asdict() for fila in
+                 db.query(*columnas).filter(L.fecha < limite).order_by(L.fecha, L.id).limit(FILAS_POR_LOTE)]
+        if not filas: break
+        por_mes = {}
+        for fila in filas:
+            por_mes.setdefault(fila["fecha"].strftime("%Y-%m"), []).append(fila)
+        for mes, del_mes in por_mes.items():
+            _escribir_segmento(directorio, mes, del_mes)
+        db.query(L).filter(L.id.in_([f["id"] for f in filas])).delete(synchronize_session=False)
+        db.commit()
+        movidas += len(filas)
+    return movidas
+
+# ---------------------------------------------------------------------
+# CONSULTA DEL ARCHIVO
+# ---------------------------------------------------------------------
+def _comparable(fecha: datetime):
+    """Fechas sin zona se toman como hora local para poder compararlas"""
+    return fecha.astimezone() if fecha.tzinfo is None else fecha
+
+def _meses(directorio: str, desde=None, hasta=None):
+    """Carpetas 'AAAA-MM' que pueden tener eventos del rango (sin abrir las demás)"""
+    if not os.path.isdir(directorio): return []
+    # Un día de margen: la carpeta sale de la zona horaria guardada, que puede no ser la del filtro
+    mes_desde = (desde - timedelta(days=1)).strftime("%Y-%m") if desde else None
+    mes_hasta = (hasta + timedelta(days=1)).strftime("%Y-%m") if hasta else None
+    return sorted(
+        m for m in os.listdir(directorio)
+        if (mes_desde is None or m >= mes_desde) and (mes_hasta is None or m <= mes_hasta)
+    )
+
+def _fin_de_mes(mes: str) -> datetime:
+    """Cota superior de las fechas que puede tener la carpeta 'AAAA-MM' (con el día de margen)"""
+    anio, numero = map(int, mes.split("-"))
+    siguiente = datetime(anio + numero // 12, numero % 12 + 1, 1)
+    return (siguiente + timedelta(days=1)).astimezone()
+
+def _leer_meses(directorio: str, meses):
+    for mes in meses:
+        carpeta = os.path.join(directorio, mes)
+        for nombre in sorted(os.listdir(carpeta)):
+            if not nombre.endswith(".jsonl.gz"): continue
+            with gzip.open(os.path.join(carpeta, nombre), "rt", encoding="utf-8") as f:
+                for linea in f:
+                    fila = json.loads(linea)
+                    fila["fecha"] = datetime.fromisoformat(fila["fecha"])
+                    yield fila
+
+def consultar_archivo(usuario=None, rol=None, accion=None, entidad=None, desde=None, hasta=None,
+                      limit: int = 100, after: str = None, directorio: str = DIRECTORIO_ARCHIVO):
+    """Mismos filtros y orden que /audit-logs/ (más recientes primero, cursor 'after').
+    Recorre los meses del más nuevo al más viejo, desde el del cursor, guardando solo las
+    'limit' filas más recientes (heap), y corta apenas ningún mes más viejo puede entrar."""
+    desde_c = _comparable(desde) if desde else None
+    hasta_c = _comparable(hasta) if hasta else None
+    tope = None
+    if after:
+        fecha, ultimo_id = auditoria.leer_cursor(after)
+        tope = (_comparable(fecha), ultimo_id)
+    techo = min((f for f in (hasta_c, tope and tope[0]) if f), default=None)
+
+    mejores, en_pagina = [], set()   # Heap de (clave, fila): la raíz es la más vieja de la página
+    for mes in reversed(_meses(directorio, desde, techo)):
+        if len(mejores) == limit and mejores[0][0][0] >= _fin_de_mes(mes):
+            break   # Este mes y los anteriores son más viejos que toda la página
+        for fila in _leer_meses(directorio, [mes]):
+            if fila["id"] in en_pagina: continue   # Lote duplicado por un corte al archivar
+            if usuario and fila["usuario"] != usuario: continue
+            if rol and fila["rol"] != rol: continue
+            if accion and fila["accion"] != accion: continue
+            if entidad and fila["entidad"] != entidad: continue
+            clave = (_comparable(fila["fecha"]), fila["id"])
+            if desde_c and clave[0] < desde_c: continue
+            if hasta_c and clave[0] >= hasta_c: continue
+            if tope and clave >= tope: continue
+            if len(mejores) < limit:
+                heapq.heappush(mejores, (clave, fila))
+            elif clave > mejores[0][0]:
+                _, sale = heapq.heapreplace(mejores, (clave, fila))
+                en_pagina.discard(sale["id"])
+            else:
+                continue
+            en_pagina.add(fila["id"])
+    return [fila for _, fila in sorted(mejores, key=lambda c: c[0], reverse=True)]
+
+# ---------------------------------------------------------------------
+# EJECUCIÓN PROGRAMADA
+# ---------------------------------------------------------------------
+def ejecutar():
+    db = SessionLocal()
+    try:
+        movidas = archivar(db)
+        print(f"🗄️ Retención de auditoría: {movidas} eventos archivados en {DIRECTORIO_ARCHIVO}")
+        return movidas
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error archivando auditoría: {e}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    # Con el bloqueo del programador: nunca en paralelo con la corrida programada
+    from app.services import programador
+    sys.exit(0 if programador.ejecutar_una_vez(["retencion-auditoria"]) else 1)
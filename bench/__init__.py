@@ -0,0 +1,14 @@
+import os
+
+# ---------------------------------------------------------------------
+# BENCHMARKS
+# ---------------------------------------------------------------------
+# Scripts de medición y verificación: la app no los importa. Se corren desde la
+# raíz del repo (python -m bench.<script>) y dejan lo que generan (BD sembradas,
+# libros sintéticos, índices) en bench/salida/, que git ignora.
+DIRECTORIO_SALIDA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "salida")
+
+def salida(*partes: str) -> str:
+    """Ruta dentro de DIRECTORIO_SALIDA (lo crea si no existe)"""
+    os.makedirs(DIRECTORIO_SALIDA, exist_ok=True)
+    return os.path.join(DIRECTORIO_SALIDA, *partes)
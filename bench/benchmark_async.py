@@ -0,0 +1,160 @@
+import os
+import sys
+import time
+import queue
+import asyncio
+import multiprocessing
+from typing import List
+from bench import salida
+
+# La app arma sus engines al importarse: la BD local se fija antes (si no se indicó otra)
+os.environ.setdefault("SIVIACK_DATABASE_URL", f"sqlite:///{salida('benchmark_async.db')}")
+
+import httpx
+from fastapi import FastAPI, Depends, Request, Response
+from sqlalchemy.exc import TimeoutError as PoolAgotado
+from sqlalchemy.orm import Session
+from app.db.database import SessionLocal, engine, get_db, motor_async
+from app.db import models
+from app.core import security, cache
+from app.schemas import schemas
+from app.services import consultas
+from bench.verificar_indices import sembrar
+from app import main
+
+# ---------------------------------------------------------------------
+# CONFIGURACIÓN
+# ---------------------------------------------------------------------
+# Uso: python -m bench.benchmark_async [clientes ...]   (ej: 50 200 1000)
+# Carga concurrente (cliente ASGI en proceso, sin red) sobre los seis endpoints de
+# lectura, en round-robin, contra la app real (async) y contra 'app_sync', que
+# conserva los handlers 'def' + Session de antes como referencia (solo existe aquí:
+# la app no importa bench/).
+# Cada corrida va en un proceso propio: si no termina en CORRIDA_MAX_S se corta y se
+# reporta "trabado". Con el pool por defecto (10+20) el camino sync se traba desde
+# ~200 clientes: los hilos del threadpool esperan conexión mientras las conexiones
+# esperan la limpieza de get_db, que necesita un hilo. Para comparar rendimiento
+# sin ese efecto:
+#   SIVIACK_DB_POOL_SIZE=1100 SIVIACK_DB_MAX_OVERFLOW=0 python -m bench.benchmark_async
+CLIENTES_DEFAULT = [50, 200, 1000]
+REQUESTS_POR_CORRIDA = 600
+ACTIVIDADES = 300
+CORRIDA_MAX_S = 300
+RUTAS = ["/actividades/?limit=50", "/mis-pendientes/", "/config/listas", "/empresas/", "/areas/", "/usuarios/"]
+
+# --- Handlers sync anteriores (referencia) ---
+app_sync = FastAPI()
+app_sync.add_exception_handler(PoolAgotado, main.pool_agotado)
+
+@app_sync.get("/actividades/", response_model=List[schemas.ActividadOut])
+def listar_actividades(response: Response, limit: int = None, after: str = None, db: Session = Depends(get_db)):
+    query = consultas.filtrar_actividades(consultas.query_actividades(db))
+    actividades = consultas.paginar_keyset(query, limit, after).all()
+    if limit and len(actividades) == limit:
+        response.headers["X-Next-Cursor"] = consultas.crear_cursor(actividades[-1])
+    return [consultas.mapear_nombres(act) for act in actividades]
+
+@app_sync.get("/mis-pendientes/", response_model=List[schemas.ActividadOut])
+def listar_mis_pendientes(db: Session = Depends(get_db), current_user: security.Principal = Depends(main.get_current_user)):
+    responsable_id = current_user.id if current_user.rol == 'CONSULTOR' else None
+    query = consultas.filtrar_pendientes(consultas.query_actividades(db), responsable_id)
+    return [consultas.mapear_nombres(act) for act in query.all()]
+
+@app_sync.get("/config/listas", response_model=schemas.ListasDesplegables)
+def obtener_listas_desplegables(request: Request, db: Session = Depends(get_db)):
+    cuerpo, etag = cache.listas.obtener(lambda: main.serializar_listas(db))
+    return Response(content=cuerpo, media_type="application/json", headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+@app_sync.get("/empresas/", response_model=List[schemas.EmpresaOut])
+def listar_empresas(db: Session = Depends(get_db)):
+    return db.query(models.Empresa).all()
+
+@app_sync.get("/areas/", response_model=List[schemas.AreaOut])
+def listar_areas(db: Session = Depends(get_db)):
+    areas = db.query(models.Area).all()
+    for a in areas:
+        a.nombre_empresa = a.empresa.razon_social if a.empresa else "N/A"
+    return areas
+
+@app_sync.get("/usuarios/", response_model=List[schemas.UsuarioOut])
+def listar_usuarios(db: Session = Depends(get_db)):
+    return db.query(models.Usuario).all()
+
+# ---------------------------------------------------------------------
+# MEDICIÓN
+# ---------------------------------------------------------------------
+def _preparar() -> dict:
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        if not db.query(models.Actividad.id).first():
+            print(f"🌱 Sembrando {ACTIVIDADES} actividades...")
+            sembrar(db, ACTIVIDADES)
+        consultor = db.get(models.Usuario, 1)
+        token = security.create_access_token({"sub": consultor.email, "rol": consultor.rol, "id": consultor.id})
+        return {"Authorization": f"Bearer {token}"}
+    finally:
+        db.close()
+        engine.dispose()    # Los procesos hijos abren sus propias conexiones
+
+def _percentil(valores, p):
+    return valores[max(int(len(valores) * p) - 1, 0)] * 1000 if valores else 0.0
+
+async def correr(aplicacion, cabeceras: dict, clientes: int, por_cliente: int):
+    latencias, codigos = [], {}
+    transporte = httpx.ASGITransport(app=aplicacion)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://benchmark") as cliente:
+        async def usuario(i):
+            for k in range(por_cliente):
+                inicio = time.perf_counter()
+                codigo = (await cliente.get(RUTAS[(i + k) % len(RUTAS)], headers=cabeceras)).status_code
+                latencias.append(time.perf_counter() - inicio)
+                codigos[codigo] = codigos.get(codigo, 0) + 1
+        inicio = time.perf_counter()
+        await asyncio.gather(*(usuario(i) for i in range(clientes)))
+        total = time.perf_counter() - inicio
+    latencias.sort()
+    return {"rps": len(latencias) / total, "p99_ms": _percentil(latencias, 0.99), "codigos": codigos}
+
+APLICACIONES = {"sync": app_sync, "async": main.app}
+
+async def _corrida(camino: str, cabeceras: dict, clientes: int):
+    aplicacion = APLICACIONES[camino]
+    try:
+        await correr(aplicacion, cabeceras, 10, 6)     # Calentamiento
+        return await correr(aplicacion, cabeceras, clientes, max(1, REQUESTS_POR_CORRIDA // clientes))
+    finally:
+        await motor_async().dispose()   # Cierra los hilos de conexión de aiosqlite
+
+def _proceso(camino: str, cabeceras: dict, clientes: int, cola):
+    cola.put(asyncio.run(_corrida(camino, cabeceras, clientes)))
+
+def medir(tamanos=CLIENTES_DEFAULT):
+    cabeceras = _preparar()
+    resultados = []
+    for camino in APLICACIONES:
+        for clientes in tamanos:
+            print(f"⏱️ {camino}: {clientes} clientes...")
+            cola = multiprocessing.Queue()
+            proceso = multiprocessing.Process(target=_proceso, args=(camino, cabeceras, clientes, cola))
+            proceso.start()
+            try:
+                r = cola.get(timeout=CORRIDA_MAX_S)
+            except queue.Empty:
+                r = None
+                proceso.terminate()
+            proceso.join()
+            resultados.append((camino, clientes, r))
+
+    print()
+    print(f"{'camino':>7} {'clientes':>9} {'req/s':>8} {'p99 ms':>9}  respuestas")
+    for camino, clientes, r in resultados:
+        if r is None:
+            print(f"{camino:>7} {clientes:>9} {'-':>8} {'-':>9}  trabado: sin terminar en {CORRIDA_MAX_S} s")
+            continue
+        print(f"{camino:>7} {clientes:>9} {r['rps']:>8.0f} {r['p99_ms']:>9.1f}  {r['codigos']}")
+    return resultados
+
+if __name__ == "__main__":
+    tamanos = [int(a) for a in sys.argv[1:]] or CLIENTES_DEFAULT
+    medir(tamanos)
@@ -0,0 +1,100 @@
+import os
+import sys
+import time
+import random
+from concurrent.futures import ProcessPoolExecutor
+from app.services import busqueda, generar_scp
+from bench import salida
+from bench.benchmark_etl import memoria_pico_mb
+
+# ---------------------------------------------------------------------
+# CONFIGURACIÓN
+# ---------------------------------------------------------------------
+# Uso: python -m bench.benchmark_busqueda [documentos]   (ej: 1000000)
+# Arma un segmento del índice con descripciones sintéticas (vocabulario del SCP +
+# términos de cola larga con frecuencia tipo Zipf) en un proceso aparte, como en
+# producción, y mide desde este proceso (un "worker") la latencia de consultas
+# representativas contra OBJETIVO_MS. No usa la BD: mide solo el índice (la carga
+# de las actividades encontradas es una consulta por id).
+DOCUMENTOS_DEFAULT = 1_000_000
+DIRECTORIO = salida("benchmark_busqueda")
+REPETICIONES = 20
+OBJETIVO_MS = 50
+EMPRESAS, AREAS, RESPONSABLES = 20, 200, 500
+VOCABULARIO_COLA = 20_000       # Términos poco frecuentes (códigos, nombres, lugares)
+EXTRAS_POR_DOCUMENTO = 6
+
+CONSULTAS = [
+    ("término frecuente", "revisar", {}),
+    ("término frecuente + empresa", "revisar", {"empresa_id": 3}),
+    ("dos frecuentes", "plan mantenimiento", {}),
+    ("tres frecuentes", "actualizar plan mantenimiento", {}),
+    ("frecuente + raro", "instructivo tema1500", {}),
+    ("raro", "tema15000", {}),
+    ("con tildes", "inspección capacitación", {}),
+    ("sin resultados", "inexistente", {}),
+]
+
+def _cola(rnd) -> str:
+    # Zipf aproximado: pocos términos muy repetidos, muchos casi únicos
+    return f"tema{int(VOCABULARIO_COLA ** rnd.random())}"
+
+def documentos_sinteticos(documentos: int, semilla: int = 42):
+    rnd = random.Random(semilla)
+    for id_ in range(1, documentos + 1):
+        descripcion = (f"{rnd.choice(generar_scp.VERBOS)} {rnd.choice(generar_scp.OBJETOS)} "
+                       f"{rnd.choice(generar_scp.TEMAS)} " + " ".join(_cola(rnd) for _ in range(EXTRAS_POR_DOCUMENTO)))
+        textos = {"descripcion": descripcion}
+        if rnd.random() < 0.3:
+            textos["observaciones"] = f"Pendiente de {rnd.choice(generar_scp.VERBOS).lower()} con {_cola(rnd)}"
+        yield id_, rnd.randint(1, EMPRESAS), rnd.randint(1, AREAS), rnd.randint(1, RESPONSABLES), textos
+
+def _construir(documentos: int):
+    """Corre en el proceso hijo (el constructor): arma y publica el segmento"""
+    inicio = time.perf_counter()
+    busqueda.escribir_segmento(DIRECTORIO, "1", documentos_sinteticos(documentos))
+    return time.perf_counter() - inicio, memoria_pico_mb()
+
+def medir(documentos: int = DOCUMENTOS_DEFAULT):
+    print(f"🔎 Construyendo el segmento con {documentos} documentos sintéticos...")
+    os.makedirs(DIRECTORIO, exist_ok=True)
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        armado, memoria = pool.submit(_construir, documentos).result()
+    indice = busqueda.IndiceInvertido(DIRECTORIO)
+    indice.abrir()
+    segmento = indice.segmento
+    carpeta = os.path.join(DIRECTORIO, f"gen_{segmento.generacion:06d}")
+    disco = sum(os.path.getsize(os.path.join(carpeta, n)) for n in os.listdir(carpeta)) / (1024 * 1024)
+    print(f"   {segmento.n_docs} documentos, {len(segmento.terminos)} términos en {armado:.1f} s"
+          + (f", {memoria:.0f} MB pico del constructor" if memoria is not None else ""))
+    print(f"   {disco:.0f} MB en disco, mapeados y compartidos por todos los workers")
+
+    print()
+    print(f"{'consulta':>28} {'lista corta':>12} {'resultados':>11} {'p50 ms':>8} {'p99 ms':>8}")
+    fallas = 0
+    for nombre, texto, filtros in CONSULTAS:
+        terminos = busqueda.normalizar(texto)
+        largos = [int(segmento.df[p]) if p >= 0 else 0 for p in map(segmento.termino, terminos)]
+        corta = min(largos, default=0)
+        tiempos = []
+        for _ in range(REPETICIONES):
+            t = time.perf_counter()
+            resultados = indice.buscar(texto, **filtros)
+            tiempos.append((time.perf_counter() - t) * 1000)
+        tiempos.sort()
+        p99 = tiempos[max(int(len(tiempos) * 0.99) - 1, 0)]
+        marca = "✅" if p99 < OBJETIVO_MS else "❌"
+        fallas += p99 >= OBJETIVO_MS
+        print(f"{marca} {nombre:>26} {corta:>12} {len(resultados):>11} {tiempos[len(tiempos) // 2]:>8.1f} {p99:>8.1f}")
+    memoria = memoria_pico_mb()
+    if memoria is not None:
+        print(f"   {memoria:.0f} MB pico del worker (incluye las páginas mapeadas que leyó)")
+    if fallas:
+        print(f"❌ {fallas} consulta(s) sobre {OBJETIVO_MS} ms (p99).")
+    else:
+        print(f"🎉 Todas las consultas bajo {OBJETIVO_MS} ms (p99).")
+    return fallas == 0
+
+if __name__ == "__main__":
+    documentos = int(sys.argv[1]) if len(sys.argv) > 1 else DOCUMENTOS_DEFAULT
+    sys.exit(0 if medir(documentos) else 1)
@@ -0,0 +1,78 @@
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.db import models
+from app.services import etl_carga, generar_scp
+from bench import salida
+
+try:
+    import resource  # Solo Unix: en Windows la memoria pico queda como "n/d"
+except ImportError:
+    resource = None
+
+# ---------------------------------------------------------------------
+# CONFIGURACIÓN
+# ---------------------------------------------------------------------
+# Uso: python -m bench.benchmark_etl [filas ...]   (ej: 1000 100000)
+# Genera libros SCP sintéticos (se reutilizan entre corridas), importa cada uno
+# en una BD SQLite local vacía y reporta filas/s, memoria pico y segundos por etapa.
+# Cada tamaño corre en un proceso propio para que la memoria pico sea solo la suya.
+# Por defecto va de 1k a 1M filas; el libro de 1M se genera una vez (unos minutos).
+BD_LOCAL = f"sqlite:///{salida('benchmark_etl.db')}"
+DIRECTORIO_LIBROS = salida("benchmark_etl")
+TAMANOS_DEFAULT = [1_000, 10_000, 100_000, 1_000_000]
+ETAPAS = ("lectura", "limpieza", "resolucion", "insercion")
+
+def libro_sintetico(filas: int) -> str:
+    os.makedirs(DIRECTORIO_LIBROS, exist_ok=True)
+    ruta = os.path.join(DIRECTORIO_LIBROS, f"scp_{filas}.xlsx")
+    if not os.path.exists(ruta):
+        print(f"📄 Generando {ruta}...")
+        generar_scp.generar(ruta, filas)
+    return ruta
+
+def memoria_pico_mb():
+    if resource is None: return None
+    # ru_maxrss viene en KB en Linux y en bytes en macOS
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+
+def _medir_importacion(archivo: str, url: str) -> dict:
+    """Corre en el proceso hijo: BD vacía, importación completa y mediciones"""
+    engine = create_engine(url)
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    tiempos = {}
+    try:
+        inicio = time.perf_counter()
+        conteos = etl_carga.importar_archivo(db, archivo, reiniciar=True, tiempos=tiempos)
+        total = time.perf_counter() - inicio
+    finally:
+        db.close()
+        engine.dispose()
+    return {"conteos": conteos, "tiempos": tiempos, "total": total, "memoria_mb": memoria_pico_mb()}
+
+def medir(tamanos=TAMANOS_DEFAULT, url: str = BD_LOCAL):
+    resultados = []
+    for filas in tamanos:
+        archivo = libro_sintetico(filas)
+        print(f"⏱️ Importando {filas} filas en {url}...")
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            r = pool.submit(_medir_importacion, archivo, url).result()
+        resultados.append((filas, r))
+
+    print()
+    print(f"{'filas':>9} {'filas/s':>9} {'total s':>8} {'MB pico':>8} " + " ".join(f"{e:>10}" for e in ETAPAS))
+    for filas, r in resultados:
+        memoria = f"{r['memoria_mb']:.0f}" if r["memoria_mb"] is not None else "n/d"
+        etapas = " ".join(f"{r['tiempos'].get(e, 0.0):>10.2f}" for e in ETAPAS)
+        print(f"{filas:>9} {filas / max(r['total'], 1e-6):>9.0f} {r['total']:>8.2f} {memoria:>8} {etapas}")
+    return resultados
+
+if __name__ == "__main__":
+    tamanos = [int(a) for a in sys.argv[1:]] or TAMANOS_DEFAULT
+    medir(tamanos)
@@ -0,0 +1,109 @@
+import os
+import sys
+import time
+import pandas as pd
+from app.services import etl_carga
+from bench.benchmark_etl import libro_sintetico
+
+# ---------------------------------------------------------------------
+# CONFIGURACIÓN
+# ---------------------------------------------------------------------
+# Uso: python -m bench.benchmark_limpieza [filas] [filas_por_celda]
+# Compara la limpieza por celda (df.iterrows() + pd.to_datetime por valor, la versión
+# anterior) con etl_carga.limpiar_dataframe sobre el libro incluido (ARCHIVO_SCP) y
+# sobre un frame sintético de 'filas' filas con ~5% de valores sucios.
+# Solo se mide la limpieza: el frame ya está leído. La versión por celda corre sobre
+# las primeras 'filas_por_celda' filas y se extrapola (a 1M filas tardaría minutos).
+FILAS_DEFAULT = 1_000_000
+FILAS_POR_CELDA_DEFAULT = 20_000
+FILAS_LIBRO_BASE = 20_000       # Libro sintético que se replica hasta 'filas'
+
+# --- Versión anterior, tal como estaba en etl_carga (referencia) ---
+def limpiar_fecha(fecha):
+    """Convierte cualquier cosa a fecha válida o devuelve None"""
+    if pd.isna(fecha) or str(fecha).strip() == "":
+        return None
+    try:
+        return pd.to_datetime(fecha, dayfirst=True, errors='coerce')
+    except:
+        return None
+
+def limpiar_porcentaje(valor):
+    """Convierte 0.8 o '80%' a 80.0"""
+    if pd.isna(valor): return 0.0
+    try:
+        if isinstance(valor, str) and '%' in valor:
+            return float(valor.replace('%', ''))
+        return float(valor) * 100 if float(valor) <= 1 else float(valor)
+    except:
+        return 0.0
+
+def limpiar_por_celda(df: pd.DataFrame) -> list:
+    filas = []
+    for _, row in df.dropna(subset=['descripcion']).iterrows():
+        if pd.isna(row.get('codigo_area')): continue
+        estado_raw = str(row.get('estado', 'Abierta')).capitalize()
+        if 'Cerrada' in estado_raw: estado_final = 'Cerrada'
+        elif 'Atrasada' in estado_raw: estado_final = 'Atrasada'
+        elif 'Block' in estado_raw: estado_final = 'Bloqueado'
+        else: estado_final = 'Abierta'
+        filas.append((
+            limpiar_fecha(row.get('fecha_origen')),
+            limpiar_fecha(row.get('fecha_compromiso')),
+            limpiar_fecha(row.get('fecha_entrega')),
+            limpiar_porcentaje(row.get('avance')),
+            estado_final,
+            str(row.get('descripcion'))[0:500],
+        ))
+    return filas
+
+# ---------------------------------------------------------------------
+# MEDICIÓN
+# ---------------------------------------------------------------------
+def _leer(archivo: str) -> pd.DataFrame:
+    """El libro completo como un solo frame (columnas ya renombradas)"""
+    return pd.concat(list(etl_carga.leer_excel_por_bloques(archivo)))
+
+def _sintetico(filas: int) -> pd.DataFrame:
+    base = _leer(libro_sintetico(FILAS_LIBRO_BASE))
+    copias = -(-filas // len(base))
+    return pd.concat([base] * copias, ignore_index=True).iloc[:filas]
+
+def _cronometrar(funcion, *args):
+    inicio = time.perf_counter()
+    resultado = funcion(*args)
+    return time.perf_counter() - inicio, resultado
+
+def comparar(nombre: str, df: pd.DataFrame, filas_por_celda: int) -> dict:
+    muestra = df.iloc[:filas_por_celda]
+    segundos_celda, _ = _cronometrar(limpiar_por_celda, muestra)
+    por_celda = segundos_celda * len(df) / max(len(muestra), 1)
+    vectorizada, (limpio, reporte) = _cronometrar(etl_carga.limpiar_dataframe, df)
+    extrapolada = len(muestra) < len(df)
+    print(f"{nombre:>22} {len(df):>9} {por_celda:>11.3f}{'*' if extrapolada else ' '} {vectorizada:>11.3f} "
+          f"{por_celda / max(vectorizada, 1e-9):>8.1f}x {len(df) - len(limpio):>10}")
+    return {"filas": len(df), "por_celda_s": por_celda, "vectorizada_s": vectorizada, "reporte": reporte}
+
+def medir(filas: int = FILAS_DEFAULT, filas_por_celda: int = FILAS_POR_CELDA_DEFAULT):
+    entradas = []
+    if os.path.exists(etl_carga.ARCHIVO_SCP):
+        entradas.append((etl_carga.ARCHIVO_SCP, _leer(etl_carga.ARCHIVO_SCP)))
+    else:
+        print(f"⚠️ No se encontró {etl_carga.ARCHIVO_SCP}: se mide solo el sintético.")
+    print(f"📄 Armando frame sintético de {filas} filas...")
+    entradas.append(("sintético", _sintetico(filas)))
+
+    print()
+    print(f"{'entrada':>22} {'filas':>9} {'por celda s':>12} {'vector. s':>11} {'mejora':>9} {'rechazadas':>10}")
+    resultados = {nombre: comparar(nombre, df, filas_por_celda) for nombre, df in entradas}
+    if any(r["filas"] > filas_por_celda for r in resultados.values()):
+        print(f"   * extrapolado desde las primeras {filas_por_celda} filas")
+    for nombre, r in resultados.items():
+        print(f"🧹 {nombre}:")
+        r["reporte"].imprimir()
+    return resultados
+
+if __name__ == "__main__":
+    filas = int(sys.argv[1]) if len(sys.argv) > 1 else FILAS_DEFAULT
+    filas_por_celda = int(sys.argv[2]) if len(sys.argv) > 2 else FILAS_POR_CELDA_DEFAULT
+    medir(filas, filas_por_celda)
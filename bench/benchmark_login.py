@@ -0,0 +1,97 @@
+import os
+import sys
+import time
+import asyncio
+from bench import salida
+
+# La app arma su engine al importarse: la BD local se fija antes (si no se indicó otra)
+os.environ.setdefault("SIVIACK_DATABASE_URL", f"sqlite:///{salida('benchmark_login.db')}")
+
+import httpx
+from app.db.database import SessionLocal, engine, motor_async
+from app.db import models
+from app.core import security
+from app.main import app
+
+# ---------------------------------------------------------------------
+# CONFIGURACIÓN
+# ---------------------------------------------------------------------
+# Uso: python -m bench.benchmark_login [logins] [concurrencia]
+# Mide la latencia de otros endpoints (listas y primera página de actividades)
+# en reposo y durante una ráfaga de logins concurrentes contra la app en proceso
+# (cliente ASGI, sin red). Los logins que encuentran el pool de hashing lleno
+# deben volver 503 al instante sin arrastrar al resto de la API.
+# El tamaño del pool se ajusta con SIVIACK_HASH_WORKERS / SIVIACK_HASH_MAX_EN_COLA
+# y el costo con SIVIACK_BCRYPT_ROUNDS.
+LOGINS_DEFAULT = 200
+CONCURRENCIA_DEFAULT = 100
+SONDEOS = 60                    # Requests de la sonda por fase
+PAUSA_SONDA_S = 0.01
+RUTAS_SONDA = ["/config/listas", "/actividades/?limit=50"]
+EMAIL, PASSWORD = "benchmark@siviack.com", "benchmark"
+
+def _preparar():
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        usuario = db.query(models.Usuario).filter_by(email=EMAIL).first()
+        if not usuario:
+            usuario = models.Usuario(nombre_completo="Benchmark", email=EMAIL, rol="ADMIN",
+                                     password_hash=security.get_password_hash(PASSWORD))
+            db.add(usuario)
+            db.commit()
+        return security.create_access_token({"sub": EMAIL, "rol": "ADMIN", "id": usuario.id})
+    finally:
+        db.close()
+
+def _percentil(valores, p):
+    valores = sorted(valores)
+    return valores[max(int(len(valores) * p) - 1, 0)] * 1000 if valores else 0.0
+
+async def _sonda(cliente, cabeceras, latencias: list, activa=lambda: True):
+    """Requests en serie a los otros endpoints mientras 'activa()'"""
+    for i in range(SONDEOS):
+        if not activa(): break
+        inicio = time.perf_counter()
+        respuesta = await cliente.get(RUTAS_SONDA[i % len(RUTAS_SONDA)], headers=cabeceras)
+        latencias.append(time.perf_counter() - inicio)
+        respuesta.raise_for_status()
+        await asyncio.sleep(PAUSA_SONDA_S)
+
+async def _rafaga(cliente, logins: int, concurrencia: int, codigos: dict):
+    pendientes = iter(range(logins))
+    async def usuario():
+        for _ in pendientes:
+            respuesta = await cliente.post("/token", data={"username": EMAIL, "password": PASSWORD})
+            codigos[respuesta.status_code] = codigos.get(respuesta.status_code, 0) + 1
+    await asyncio.gather(*(usuario() for _ in range(concurrencia)))
+
+async def medir(logins: int = LOGINS_DEFAULT, concurrencia: int = CONCURRENCIA_DEFAULT):
+    cabeceras = {"Authorization": f"Bearer {_preparar()}"}
+    transporte = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://benchmark", timeout=300) as cliente:
+        await _sonda(cliente, cabeceras, [])                      # Calentamiento (cachés, pool de conexiones)
+        reposo = []
+        await _sonda(cliente, cabeceras, reposo)
+
+        durante, codigos = [], {}
+        inicio = time.perf_counter()
+        rafaga = asyncio.ensure_future(_rafaga(cliente, logins, concurrencia, codigos))
+        await _sonda(cliente, cabeceras, durante, activa=lambda: not rafaga.done())
+        await rafaga
+        total = time.perf_counter() - inicio
+    await motor_async().dispose()   # Cierra los hilos de conexión de aiosqlite
+
+    print(f"🔐 {logins} logins con {concurrencia} concurrentes en {total:.2f} s "
+          f"(pool de hashing: {security.HASH_WORKERS} hilos + {security.HASH_MAX_EN_COLA} en cola, "
+          f"bcrypt {security.BCRYPT_ROUNDS} rondas)")
+    print(f"   respuestas: {dict(sorted(codigos.items()))}, {codigos.get(200, 0) / total:.1f} logins/s aceptados")
+    print(f"{'fase':>14} {'requests':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for fase, latencias in (("en reposo", reposo), ("durante logins", durante)):
+        print(f"{fase:>14} {len(latencias):>9} {_percentil(latencias, 0.5):>8.1f} {_percentil(latencias, 0.99):>8.1f}")
+    return {"codigos": codigos, "total": total, "reposo": reposo, "durante": durante}
+
+if __name__ == "__main__":
+    logins = int(sys.argv[1]) if len(sys.argv) > 1 else LOGINS_DEFAULT
+    concurrencia = int(sys.argv[2]) if len(sys.argv) > 2 else CONCURRENCIA_DEFAULT
+    asyncio.run(medir(logins, concurrencia))
@@ -0,0 +1,75 @@
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.db import database, models
+from app.services import reportes
+from bench import salida
+from bench.benchmark_etl import memoria_pico_mb
+from bench.verificar_indices import sembrar
+
+# ---------------------------------------------------------------------
+# CONFIGURACIÓN
+# ---------------------------------------------------------------------
+# Uso: python -m bench.benchmark_reportes [filas ...]   (ej: 10000 100000 500000)
+# Siembra una BD SQLite por tamaño (se reutiliza entre corridas) y exporta el reporte
+# completo en xlsx y pdf consumiendo el mismo generador que envía StreamingResponse.
+# Cada exportación corre en un proceso propio: 'MB inicio' es la memoria antes de
+# exportar y 'MB pico' la máxima; si el streaming funciona, no crecen con las filas.
+DIRECTORIO_BD = salida("benchmark_reportes")
+TAMANOS_DEFAULT = [10_000, 100_000, 500_000]
+FORMATOS = ("xlsx", "pdf")
+
+def _bd(filas: int) -> str:
+    os.makedirs(DIRECTORIO_BD, exist_ok=True)
+    ruta = os.path.join(DIRECTORIO_BD, f"actividades_{filas}.db")
+    url = f"sqlite:///{ruta}"
+    if not os.path.exists(ruta):
+        print(f"🌱 Sembrando {filas} actividades en {ruta}...")
+        engine = create_engine(url)
+        models.Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        try:
+            sembrar(db, filas)
+        finally:
+            db.close()
+            engine.dispose()
+    return url
+
+def _medir_exportacion(url: str, formato: str) -> dict:
+    """Corre en el proceso hijo: apunta las sesiones de reportes a la BD del tamaño y exporta todo"""
+    engine = create_engine(url)
+    database.SessionLocal.configure(bind=engine)
+    memoria_inicio = memoria_pico_mb()
+    try:
+        inicio = time.perf_counter()
+        generador = reportes.stream_xlsx({}) if formato == "xlsx" else reportes.stream_pdf({}, "benchmark")
+        total_bytes = sum(len(trozo) for trozo in generador)
+        total = time.perf_counter() - inicio
+    finally:
+        engine.dispose()
+    return {"total": total, "bytes": total_bytes, "memoria_inicio_mb": memoria_inicio, "memoria_mb": memoria_pico_mb()}
+
+def medir(tamanos=TAMANOS_DEFAULT):
+    resultados = []
+    for filas in tamanos:
+        url = _bd(filas)
+        for formato in FORMATOS:
+            print(f"⏱️ Exportando {filas} filas a {formato}...")
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                r = pool.submit(_medir_exportacion, url, formato).result()
+            resultados.append((filas, formato, r))
+
+    print()
+    print(f"{'filas':>9} {'formato':>8} {'filas/s':>9} {'total s':>8} {'MB salida':>10} {'MB inicio':>10} {'MB pico':>8}")
+    for filas, formato, r in resultados:
+        memoria = lambda mb: f"{mb:.0f}" if mb is not None else "n/d"
+        print(f"{filas:>9} {formato:>8} {filas / max(r['total'], 1e-6):>9.0f} {r['total']:>8.2f} "
+              f"{r['bytes'] / 1024 / 1024:>10.1f} {memoria(r['memoria_inicio_mb']):>10} {memoria(r['memoria_mb']):>8}")
+    return resultados
+
+if __name__ == "__main__":
+    tamanos = [int(a) for a in sys.argv[1:]] or TAMANOS_DEFAULT
+    medir(tamanos)
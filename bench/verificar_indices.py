@@ -0,0 +1,109 @@
+import sys
+import time
+import random
+from datetime import date, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.orm import sessionmaker
+from app.db import models
+from app.services import consultas
+from bench import salida
+
+# ---------------------------------------------------------------------
+# CONFIGURACIÓN
+# ---------------------------------------------------------------------
+# Uso: python -m bench.verificar_indices [filas]
+# Siembra una BD SQLite local, mide cada combinación de filtros y falla (exit 1)
+# si alguna ruta principal vuelve a hacer un recorrido completo de 'actividades'.
+BD_LOCAL = f"sqlite:///{salida('verificar_indices.db')}"
+FILAS_DEFAULT = 100_000
+EMPRESAS, AREAS_POR_EMPRESA, RESPONSABLES, STATUS = 20, 10, 50, 8
+FECHA_BASE = date(2024, 1, 1)
+
+def sembrar(db, filas: int):
+    """Crea maestros y 'filas' actividades con distribución parecida a producción"""
+    rnd = random.Random(42)
+    db.bulk_insert_mappings(models.Empresa, [{"id": i, "razon_social": f"Empresa {i}"} for i in range(1, EMPRESAS + 1)])
+    db.bulk_insert_mappings(models.Area, [
+        {"id": (e - 1) * AREAS_POR_EMPRESA + a, "codigo": f"A{a}", "nombre": f"Área {a}", "empresa_id": e}
+        for e in range(1, EMPRESAS + 1) for a in range(1, AREAS_POR_EMPRESA + 1)
+    ])
+    db.bulk_insert_mappings(models.Usuario, [
+        {"id": i, "nombre_completo": f"Consultor {i}", "email": f"c{i}@siviack.com", "rol": "CONSULTOR"}
+        for i in range(1, RESPONSABLES + 1)
+    ])
+    db.bulk_insert_mappings(models.StatusActividad, [{"id": i, "nombre": f"Status {i}"} for i in range(1, STATUS + 1)])
+
+    lote = []
+    for i in range(filas):
+        empresa = rnd.randint(1, EMPRESAS)
+        lote.append({
+            "empresa_id": empresa,
+            "area_id": (empresa - 1) * AREAS_POR_EMPRESA + rnd.randint(1, AREAS_POR_EMPRESA),
+            "responsable_id": rnd.randint(1, RESPONSABLES),
+            "status_id": rnd.randint(1, STATUS),
+            "condicion_actual": rnd.choice(["Abierta", "Cerrada", "Cerrada", "Cerrada", "Atrasada", "Bloqueado"]),
+            "descripcion": f"Actividad {i}",
+            "fecha_compromiso": FECHA_BASE + timedelta(days=rnd.randint(0, 730)),
+        })
+        if len(lote) == 10_000:
+            db.bulk_insert_mappings(models.Actividad, lote)
+            lote = []
+    if lote: db.bulk_insert_mappings(models.Actividad, lote)
+    db.commit()
+
+def _combinaciones(db):
+    """(nombre, query) tal como las arman listar_actividades y listar_mis_pendientes"""
+    base = lambda: consultas.query_actividades(db)
+    desde, hasta = date(2024, 6, 1), date(2024, 6, 30)
+    pagina = lambda q: consultas.paginar_keyset(q, limit=100)
+    return [
+        ("empresa", pagina(consultas.filtrar_actividades(base(), empresa_id=3))),
+        ("empresa + rango fechas", pagina(consultas.filtrar_actividades(base(), empresa_id=3, fecha_inicio=desde, fecha_fin=hasta))),
+        ("empresa + status", pagina(consultas.filtrar_actividades(base(), empresa_id=3, status_id=2))),
+        ("área", pagina(consultas.filtrar_actividades(base(), area_id=25))),
+        ("responsable", pagina(consultas.filtrar_actividades(base(), responsable_id=7))),
+        ("status", pagina(consultas.filtrar_actividades(base(), status_id=2))),
+        ("rango fechas", pagina(consultas.filtrar_actividades(base(), fecha_inicio=desde, fecha_fin=hasta))),
+        ("sin filtros (página keyset)", pagina(base())),
+        ("mis pendientes (consultor)", consultas.filtrar_pendientes(base(), responsable_id=7)),
+        ("mis pendientes (admin)", consultas.filtrar_pendientes(base())),
+    ]
+
+def _plan(db, query):
+    sql = str(query.statement.compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True}))
+    return [fila[-1] for fila in db.connection().exec_driver_sql("EXPLAIN QUERY PLAN " + sql)]
+
+def verificar(filas: int = FILAS_DEFAULT, url: str = BD_LOCAL):
+    engine = create_engine(url)
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    print(f"🌱 Sembrando {filas} actividades en {url}...")
+    sembrar(db, filas)
+    db.connection().exec_driver_sql("ANALYZE")
+
+    fallas = 0
+    for nombre, query in _combinaciones(db):
+        plan = _plan(db, query)
+        # 'SCAN actividades' sin índice = recorrido completo de la tabla
+        scan_completo = any(paso.strip() == "SCAN actividades" for paso in plan)
+        inicio = time.perf_counter()
+        n = len(query.all())
+        ms = (time.perf_counter() - inicio) * 1000
+        db.expunge_all()
+        marca = "❌ SCAN COMPLETO" if scan_completo else "✅"
+        pasos = [p for p in plan if "actividades" in p or "TEMP B-TREE" in p]
+        print(f"{marca} {nombre:<30} {n:>6} filas {ms:>8.1f} ms | {' / '.join(pasos)}")
+        fallas += scan_completo
+
+    db.close()
+    if fallas:
+        print(f"❌ {fallas} combinación(es) sin índice.")
+    else:
+        print("🎉 Todas las rutas principales usan índice.")
+    return fallas == 0
+
+if __name__ == "__main__":
+    filas = int(sys.argv[1]) if len(sys.argv) > 1 else FILAS_DEFAULT
+    sys.exit(0 if verificar(filas) else 1)
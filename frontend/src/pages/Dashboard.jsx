@@ -1,23 +1,24 @@
 import React, { useEffect, useState } from 'react';
 import { useNavigate } from 'react-router-dom';
 import axios from 'axios';
-import ExcelJS from 'exceljs';
 import { saveAs } from 'file-saver';
-import jsPDF from 'jspdf';
-import autoTable from 'jspdf-autotable';
 import ActivityFormModal from '../components/ActivityFormModal';
 import ActivityDetailsModal from '../components/ActivityDetailsModal';
 
 const API_URL = "http://127.0.0.1:8000";
+const TAMANO_PAGINA = 100;
 
 const Dashboard = () => {
     const navigate = useNavigate();
     
     // --- ESTADOS ---
     const [actividades, setActividades] = useState([]);
+    const [siguienteCursor, setSiguienteCursor] = useState(null);
+    const [tokenCambios, setTokenCambios] = useState('');
     const [empresas, setEmpresas] = useState([]);
     const [trabajadores, setTrabajadores] = useState([]);
     const [statusList, setStatusList] = useState([]);
+    const [resumen, setResumen] = useState({ total: 0, cerradas: 0, atrasadas: 0, cumplimiento: 0 });
     
     const [loading, setLoading] = useState(true);
     const [usuario, setUsuario] = useState({ nombre: "Usuario", rol: "" });
@@ -56,38 +57,107 @@ const Dashboard = () => {
             setUsuario({ nombre: payload.sub, rol: payload.rol });
         } catch (e) { console.error("Token error"); handleLogout(); }
 
-        cargarMaestros(token);
-        cargarDatos(token);
+        cargarInicio(token);
     }, []);
 
-    const cargarMaestros = async (token) => {
+    // Carga inicial en una sola llamada. Catálogos, empresas y usuarios se guardan
+    // con su versión: el servidor solo los reenvía (no null) si cambiaron.
+    const cargarInicio = async (token) => {
+        setLoading(true);
+        setErrorMsg(null);
         try {
-            const config = { headers: { Authorization: `Bearer ${token}` } };
-            const [resListas, resEmp, resUser] = await Promise.all([
-                axios.get(`${API_URL}/config/listas`, config),
-                axios.get(`${API_URL}/empresas/`, config),
-                axios.get(`${API_URL}/usuarios/?rol=CONSULTOR,ADMIN`, config)
-            ]);
-            setStatusList(resListas.data.status);
-            setEmpresas(resEmp.data);
-            setTrabajadores(resUser.data);
-        } catch (e) { console.error("Error filtros"); }
+            const guardado = JSON.parse(localStorage.getItem('bootstrap_cache') || '{"versiones":{}}');
+            const versiones = Object.entries(guardado.versiones).map(([parte, v]) => `${parte}=${v}`).join(',');
+            const config = { headers: { Authorization: `Bearer ${token}` }, params: versiones ? { versiones } : {} };
+            const { data } = await axios.get(`${API_URL}/bootstrap`, config);
+
+            const maestros = {
+                versiones: data.versiones,
+                listas: data.listas ?? guardado.listas,
+                empresas: data.empresas ?? guardado.empresas,
+                usuarios: data.usuarios ?? guardado.usuarios
+            };
+            localStorage.setItem('bootstrap_cache', JSON.stringify(maestros));
+
+            setStatusList(maestros.listas?.status || []);
+            setEmpresas(maestros.empresas || []);
+            setTrabajadores(maestros.usuarios || []);
+            setActividades(data.actividades);
+            setSiguienteCursor(data.siguiente_cursor);
+            setTokenCambios(data.token_cambios);
+            setResumen(data.resumen);
+            if (data.usuario.rol === 'CLIENTE' && data.usuario.empresa_id) {
+                setFiltros(f => ({ ...f, empresa_id: String(data.usuario.empresa_id) }));
+            }
+        } catch (error) {
+            if (error.response?.status === 401) handleLogout();
+            else setErrorMsg("Error de conexión.");
+        } finally { setLoading(false); }
+    };
+
+    const paramsFiltros = () => {
+        const params = {};
+        Object.keys(filtros).forEach(key => { if (filtros[key] !== "") params[key] = filtros[key]; });
+        return params;
     };
 
     const cargarDatos = async (token) => {
         setLoading(true);
         setErrorMsg(null);
         try {
-            const config = { headers: { Authorization: `Bearer ${token}` }, params: {} };
-            Object.keys(filtros).forEach(key => { if (filtros[key] !== "") config.params[key] = filtros[key]; });
-            const response = await axios.get(`${API_URL}/actividades/`, config);
+            const config = { headers: { Authorization: `Bearer ${token}` }, params: paramsFiltros() };
+            // Token de cambios ANTES de descargar: lo que cambie durante la descarga sale en el próximo delta
+            const { data: marca } = await axios.get(`${API_URL}/actividades/cambios`, { headers: config.headers });
+            const [response, resResumen] = await Promise.all([
+                axios.get(`${API_URL}/actividades/`, { ...config, params: { ...config.params, limit: TAMANO_PAGINA } }),
+                axios.get(`${API_URL}/actividades/resumen`, { ...config, params: { ...config.params, desglose: false } })
+            ]);
             setActividades(response.data);
+            setSiguienteCursor(response.headers['x-next-cursor'] || null);
+            setTokenCambios(marca.token);
+            setResumen(resResumen.data);
         } catch (error) {
             if (error.response?.status === 401) handleLogout();
             else setErrorMsg("Error de conexión.");
         } finally { setLoading(false); }
     };
 
+    // Siguiente página (cursor por fecha de compromiso + ID)
+    const cargarMas = async () => {
+        try {
+            const config = { headers: { Authorization: `Bearer ${localStorage.getItem('access_token')}` }, params: { ...paramsFiltros(), limit: TAMANO_PAGINA, after: siguienteCursor } };
+            const response = await axios.get(`${API_URL}/actividades/`, config);
+            setActividades(prev => [...prev, ...response.data]);
+            setSiguienteCursor(response.headers['x-next-cursor'] || null);
+        } catch (error) { setErrorMsg("Error de conexión."); }
+    };
+
+    // Mismo orden que el cursor del servidor: (fecha_compromiso, id)
+    const ordenKeyset = (a, b) => a.fecha_compromiso.localeCompare(b.fecha_compromiso) || a.id - b.id;
+
+    // Tras guardar: solo se piden las filas cambiadas desde el último token. El servidor
+    // dice cuáles caen en la ventana cargada (filtros + hasta el cursor) y cuáles salieron
+    const sincronizar = async (token) => {
+        if (!tokenCambios) { cargarDatos(token); return; }
+        try {
+            const config = { headers: { Authorization: `Bearer ${token}` } };
+            const [{ data }, resResumen] = await Promise.all([
+                axios.get(`${API_URL}/actividades/cambios`, { ...config, params: { ...paramsFiltros(), desde: tokenCambios, hasta: siguienteCursor || undefined } }),
+                axios.get(`${API_URL}/actividades/resumen`, { ...config, params: { ...paramsFiltros(), desglose: false } })
+            ]);
+            if (data.resync) { cargarDatos(token); return; } // Demasiados cambios: se recarga la lista
+            setActividades(prev => {
+                const porId = new Map(prev.map(a => [a.id, a]));
+                data.eliminadas.forEach(id => porId.delete(id));
+                data.fuera_de_vista.forEach(id => porId.delete(id));
+                data.actualizadas.forEach(a => porId.set(a.id, a)); // Nuevas o editadas dentro de la ventana
+                return [...porId.values()].sort(ordenKeyset);
+            });
+            setTokenCambios(data.token);
+            setResumen(resResumen.data);
+        } catch (error) { cargarDatos(token); }
+    };
+
     const handleFiltroChange = (e) => setFiltros({ ...filtros, [e.target.name]: e.target.value });
     const aplicarFiltros = () => cargarDatos(localStorage.getItem('access_token'));
     const limpiarFiltros = () => {
@@ -122,7 +192,7 @@ const Dashboard = () => {
             else await axios.post(`${API_URL}/actividades/`, payload, config);
             
             setShowModal(false);
-            cargarDatos(token);
+            sincronizar(token);
             alert("✅ Guardado exitoso");
         } catch (error) { 
             alert(`Error al guardar: ${error.response?.data?.detail || "Datos inválidos"}`);
@@ -131,99 +201,31 @@ const Dashboard = () => {
 
     // --- FUNCIONES DE EXPORTACIÓN ---
 
-    const exportarExcel = async () => {
+    // El servidor genera el archivo con los mismos filtros (streaming, sin armarlo en el navegador)
+    const descargarReporte = async (formato) => {
         try {
-            if (actividades.length === 0) { alert("No hay datos para exportar."); return; }
-            
-            const workbook = new ExcelJS.Workbook();
-            const worksheet = workbook.addWorksheet('Reporte SIVIACK');
-
-            worksheet.columns = [
-                { header: 'ID', key: 'id', width: 8 },
-                { header: 'Cliente', key: 'cliente', width: 25 },
-                { header: 'Área', key: 'area', width: 12 },
-                { header: 'Descripción', key: 'desc', width: 40 },
-                { header: 'Responsable', key: 'resp', width: 20 },
-                { header: 'Vence', key: 'vence', width: 15 },
-                { header: 'Estado', key: 'estado', width: 18 },
-                { header: 'Avance (%)', key: 'avance', width: 12 },
-            ];
-
-            worksheet.getRow(1).font = { bold: true, color: { argb: 'FFFFFFFF' } };
-            worksheet.getRow(1).fill = { type: 'pattern', pattern: 'solid', fgColor: { argb: 'FF002B5C' } };
-
-            actividades.forEach(act => {
-                worksheet.addRow({
-                    id: act.id,
-                    cliente: act.nombre_empresa,
-                    area: act.nombre_area,
-                    desc: act.descripcion,
-                    resp: act.nombre_responsable || 'S/A',
-                    vence: act.fecha_compromiso || '-',
-                    estado: act.nombre_status || 'Abierta',
-                    avance: (act.avance || 0) + '%'
-                });
-            });
-
-            const buffer = await workbook.xlsx.writeBuffer();
-            const blob = new Blob([buffer], { type: 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet' });
-            saveAs(blob, `Reporte_SIVIACK_${new Date().toISOString().slice(0,10)}.xlsx`);
+            if (resumen.total === 0) { alert("No hay datos para exportar."); return; }
+            const config = {
+                headers: { Authorization: `Bearer ${localStorage.getItem('access_token')}` },
+                params: paramsFiltros(),
+                responseType: 'blob'
+            };
+            const response = await axios.get(`${API_URL}/actividades/export.${formato}`, config);
+            saveAs(response.data, `Reporte_SIVIACK_${new Date().toISOString().slice(0,10)}.${formato}`);
             setDropdownOpen(false); // Cerrar menú
         } catch (error) {
-            console.error("Error Excel:", error);
-            alert("Error al generar el Excel. Ver consola.");
+            console.error(`Error ${formato}:`, error);
+            alert("Error al generar el reporte. Ver consola.");
         }
     };
 
-    const exportarPDF = () => {
-        try {
-            if (actividades.length === 0) { alert("No hay datos para exportar."); return; }
-
-            const doc = new jsPDF({ orientation: 'landscape' });
-            
-            doc.setFontSize(16);
-            doc.setTextColor(0, 43, 92);
-            doc.text("Reporte de Actividades - SIVIACK", 14, 15);
-            
-            doc.setFontSize(10);
-            doc.setTextColor(100);
-            doc.text(`Generado por: ${usuario.nombre} | Fecha: ${new Date().toLocaleDateString()}`, 14, 22);
-
-            const data = actividades.map(act => [
-                act.id,
-                (act.nombre_empresa || '').substring(0, 20),
-                act.nombre_area || '',
-                (act.descripcion || '').substring(0, 50) + '...',
-                act.nombre_responsable || '-',
-                act.fecha_compromiso || '-',
-                act.nombre_status || 'Abierta',
-                `${act.avance || 0}%`
-            ]);
-
-            autoTable(doc, {
-                head: [['ID', 'Cliente', 'Área', 'Descripción', 'Resp.', 'Vence', 'Estado', 'Avance']],
-                body: data,
-                startY: 30,
-                theme: 'grid',
-                headStyles: { fillColor: [0, 43, 92], textColor: 255, fontStyle: 'bold' },
-                styles: { fontSize: 8, cellPadding: 3 },
-                alternateRowStyles: { fillColor: [245, 245, 245] }
-            });
-
-            doc.save(`Reporte_SIVIACK_${new Date().toISOString().slice(0,10)}.pdf`);
-            setDropdownOpen(false); // Cerrar menú
-        } catch (error) {
-            console.error("Error PDF:", error);
-            alert("Error al generar el PDF. Ver consola.");
-        }
-    };
+    const exportarExcel = () => descargarReporte('xlsx');
+    const exportarPDF = () => descargarReporte('pdf');
 
     const esCliente = usuario.rol === 'CLIENTE';
     const puedeEditar = usuario.rol === 'ADMIN' || usuario.rol === 'CONSULTOR';
-    const total = actividades.length;
-    const cerradas = actividades.filter(a => (a.nombre_status || '').toLowerCase().includes('cerrada')).length;
-    const atrasadas = actividades.filter(a => (a.prioridad_accion === 'Atrasada') || (a.nombre_status || '').toLowerCase().includes('atrasado')).length;
-    const cumplimiento = total > 0 ? Math.round((cerradas / total) * 100) : 0;
+    // KPIs calculados en el servidor (/actividades/resumen)
+    const { total, cerradas, atrasadas, cumplimiento } = resumen;
 
     return (
         <div className="min-vh-100" style={{ backgroundColor: '#F3F6F9', fontFamily: 'Poppins, sans-serif' }}>
@@ -379,6 +381,11 @@ const Dashboard = () => {
                                             }
                                         </tbody>
                                     </table>
+                                    {siguienteCursor && (
+                                        <div className="text-center p-3">
+                                            <button className="btn btn-light text-primary border shadow-sm fw-bold px-4" onClick={cargarMas}>Cargar más</button>
+                                        </div>
+                                    )}
                                 </div>
                             )}
                         </div>
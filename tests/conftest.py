@@ -0,0 +1,64 @@
+import os
+
+# BD en memoria (una sola conexión compartida): se fija antes de importar la app
+os.environ.setdefault("SIVIACK_DATABASE_URL", "sqlite://")
+
+from datetime import date
+import pytest
+from app.db.database import SessionLocal, engine
+from app.db import models
+
+@pytest.fixture
+def db():
+    models.Base.metadata.create_all(bind=engine)
+    sesion = SessionLocal()
+    try:
+        yield sesion
+    finally:
+        sesion.close()
+        models.Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture
+def maestros(db):
+    """Empresa, área, responsable y status mínimos para crear actividades"""
+    empresa = models.Empresa(razon_social="Empresa Test")
+    db.add(empresa)
+    db.flush()
+    area = models.Area(codigo="A1", nombre="Área 1", empresa_id=empresa.id)
+    usuario = models.Usuario(nombre_completo="Consultor Test", email="c@test.com", rol="CONSULTOR", password_hash="x")
+    status = {n: models.StatusActividad(nombre=n) for n in ("En Proceso", "Entregado a Tiempo", "Entregado Fuera de Plazo")}
+    db.add_all([area, usuario, *status.values()])
+    db.commit()
+    return {"empresa": empresa, "area": area, "usuario": usuario, "status": status}
+
+def nueva_actividad(db, maestros, **campos):
+    datos = dict(
+        empresa_id=maestros["empresa"].id, area_id=maestros["area"].id, responsable_id=maestros["usuario"].id,
+        descripcion="Actividad", fecha_compromiso=date(2025, 1, 10), condicion_actual="Abierta",
+    )
+    datos.update(campos)
+    act = models.Actividad(**datos)
+    db.add(act)
+    db.commit()
+    return act
+
+def otra_empresa(db, razon_social="Otra"):
+    """Segunda empresa con un área, para probar el alcance de los clientes"""
+    empresa = models.Empresa(razon_social=razon_social)
+    db.add(empresa)
+    db.commit()
+    area = models.Area(codigo="B1", nombre="Área B", empresa_id=empresa.id)
+    db.add(area)
+    db.commit()
+    return empresa, area
+
+def usuario_cliente(db, email, empresa_id):
+    usuario = models.Usuario(nombre_completo="Cliente", email=email, rol="CLIENTE", password_hash="x", empresa_id=empresa_id)
+    db.add(usuario)
+    db.commit()
+    return usuario
+
+def cabeceras(usuario):
+    from app.core import security
+    token = security.create_access_token({"sub": usuario.email, "rol": usuario.rol, "id": usuario.id})
+    return {"Authorization": f"Bearer {token}"}
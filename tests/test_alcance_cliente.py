@@ -0,0 +1,55 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services import busqueda, consultas, reportes
+from tests.conftest import cabeceras, nueva_actividad, otra_empresa, usuario_cliente
+
+@pytest.mark.parametrize("ruta, generador", [("/actividades/export.xlsx", "stream_xlsx"), ("/actividades/export.pdf", "stream_pdf")])
+def test_exportacion_de_cliente_solo_su_empresa(db, maestros, monkeypatch, ruta, generador):
+    otra, _ = otra_empresa(db)
+    pedidos = []
+    monkeypatch.setattr(reportes, generador, lambda filtros, *args: pedidos.append(filtros) or iter([b""]))
+    cliente = usuario_cliente(db, "cliente@test.com", maestros["empresa"].id)
+
+    assert TestClient(app).get(ruta, params={"empresa_id": otra.id}, headers=cabeceras(cliente)).status_code == 200
+    assert TestClient(app).get(ruta, headers=cabeceras(cliente)).status_code == 200
+    assert [f["empresa_id"] for f in pedidos] == [maestros["empresa"].id] * 2
+
+    sin_empresa = usuario_cliente(db, "sin.empresa@test.com", None)
+    assert TestClient(app).get(ruta, headers=cabeceras(sin_empresa)).status_code == 403
+    assert TestClient(app).get(ruta, params={"empresa_id": otra.id}, headers=cabeceras(maestros["usuario"])).status_code == 200
+    assert pedidos[-1]["empresa_id"] == otra.id   # Los demás roles eligen la empresa
+
+def test_cambios_de_cliente_solo_su_empresa(db, maestros):
+    otra, area_otra = otra_empresa(db)
+    token = consultas.token_cambios(db)
+    propia = nueva_actividad(db, maestros, descripcion="Propia")
+    nueva_actividad(db, maestros, descripcion="Ajena", empresa_id=otra.id, area_id=area_otra.id)
+    cliente = usuario_cliente(db, "cliente@test.com", maestros["empresa"].id)
+
+    respuesta = TestClient(app).get("/actividades/cambios", params={"desde": token, "empresa_id": otra.id},
+                                    headers=cabeceras(cliente))
+    datos = respuesta.json()
+    assert [a["id"] for a in datos["actualizadas"]] == [propia.id]
+    assert datos["fuera_de_vista"] == []    # Ni siquiera los IDs de la otra empresa
+
+    sin_empresa = usuario_cliente(db, "sin.empresa@test.com", None)
+    assert TestClient(app).get("/actividades/cambios", headers=cabeceras(sin_empresa)).status_code == 403
+    assert TestClient(app).get("/actividades/cambios").status_code == 401
+
+def test_busqueda_de_cliente_solo_su_empresa(db, maestros, monkeypatch, tmp_path):
+    otra, area_otra = otra_empresa(db)
+    propia = nueva_actividad(db, maestros, descripcion="Instructivo de compras")
+    nueva_actividad(db, maestros, descripcion="Instructivo de ventas", empresa_id=otra.id, area_id=area_otra.id)
+    busqueda.construir_segmento(db, str(tmp_path))
+    monkeypatch.setattr(busqueda, "indice", busqueda.IndiceInvertido(str(tmp_path)))
+    cliente = usuario_cliente(db, "cliente@test.com", maestros["empresa"].id)
+
+    respuesta = TestClient(app).get("/actividades/buscar", params={"q": "instructivo", "empresa_id": otra.id},
+                                    headers=cabeceras(cliente))
+    assert [a["id"] for a in respuesta.json()] == [propia.id]
+
+    sin_empresa = usuario_cliente(db, "sin.empresa@test.com", None)
+    assert TestClient(app).get("/actividades/buscar", params={"q": "instructivo"},
+                               headers=cabeceras(sin_empresa)).status_code == 403
+    assert TestClient(app).get("/actividades/buscar", params={"q": "instructivo"}).status_code == 401
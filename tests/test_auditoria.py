@@ -0,0 +1,43 @@
+import os
+from app.core.bloqueos import tomar_bloqueo
+from app.db import models
+from app.services import auditoria
+
+def _linea(detalle):
+    return auditoria._a_json(auditoria.evento(None, "CREAR", "Actividad", detalle)) + "\n"
+
+def _detalles(db):
+    return [log.detalle for log in db.query(models.AuditLog).order_by(models.AuditLog.id)]
+
+def test_linea_cortada_no_impide_arrancar(db, tmp_path):
+    base = str(tmp_path / "auditoria.jsonl")
+    with open(base, "w", encoding="utf-8") as f:      # Spool compartido de la versión anterior
+        f.write(_linea("anterior"))
+    muerto = f"{base}.999999"
+    open(muerto + ".lock", "w").close()                # Su proceso ya no está: nadie lo bloquea
+    with open(muerto, "w", encoding="utf-8") as f:
+        f.write(_linea("completo") + _linea("cortado")[:25])   # kill -9 a mitad de línea
+
+    escritor = auditoria.EscritorAuditoria(base)
+    escritor.iniciar()
+    escritor.detener()
+    assert _detalles(db) == ["anterior", "completo"]
+    assert escritor.ilegibles == 1
+    assert os.listdir(tmp_path) == []   # Todo enviado: ni spool ni bloqueos
+
+def test_no_reclama_el_spool_de_un_proceso_vivo(db, tmp_path):
+    base = str(tmp_path / "auditoria.jsonl")
+    vivo = f"{base}.999998"
+    bloqueo = tomar_bloqueo(vivo + ".lock")
+    try:
+        with open(vivo, "w", encoding="utf-8") as f:
+            f.write(_linea("de otro worker"))
+        escritor = auditoria.EscritorAuditoria(base)
+        escritor.iniciar()
+        escritor.registrar(auditoria.evento(None, "CREAR", "Actividad", "propio"))
+        escritor.detener()
+        assert _detalles(db) == ["propio"]
+        assert os.path.exists(vivo)
+        assert not os.path.exists(f"{base}.{os.getpid()}")   # Cada proceso, su archivo
+    finally:
+        bloqueo.close()
@@ -0,0 +1,19 @@
+from fastapi.testclient import TestClient
+from app.main import app
+from tests.conftest import cabeceras, nueva_actividad, otra_empresa, usuario_cliente
+
+def test_cliente_sin_empresa_no_ve_actividades(db, maestros):
+    nueva_actividad(db, maestros, descripcion="De otra empresa")
+    respuesta = TestClient(app).get("/bootstrap", headers=cabeceras(usuario_cliente(db, "sin.empresa@test.com", None)))
+    assert respuesta.status_code == 403
+
+def test_cliente_solo_ve_su_empresa(db, maestros):
+    otra, area_otra = otra_empresa(db)
+    nueva_actividad(db, maestros, descripcion="Propia")
+    nueva_actividad(db, maestros, descripcion="Ajena", empresa_id=otra.id, area_id=area_otra.id)
+
+    respuesta = TestClient(app).get("/bootstrap", headers=cabeceras(usuario_cliente(db, "cliente@test.com", maestros["empresa"].id)))
+    assert respuesta.status_code == 200
+    datos = respuesta.json()
+    assert [a["descripcion"] for a in datos["actividades"]] == ["Propia"]
+    assert datos["resumen"]["total"] == 1
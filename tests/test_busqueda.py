@@ -0,0 +1,108 @@
+import threading
+import time
+import pytest
+from app.core.bloqueos import tomar_bloqueo
+from app.services import busqueda, consultas
+from tests.conftest import nueva_actividad
+
+def _indice(db, directorio):
+    """Índice que construye el segmento en el mismo proceso (la BD de los tests es en memoria)"""
+    def construir(directorio):
+        busqueda.construir_segmento(db, directorio)
+    return busqueda.IndiceInvertido(str(directorio), construir=construir)
+
+def test_busca_sin_tildes_y_aplica_cambios(db, maestros, tmp_path):
+    indice = _indice(db, tmp_path)
+    nueva_actividad(db, maestros, descripcion="Actualizar el Plan de Inspección anual")
+    revisar = nueva_actividad(db, maestros, descripcion="Revisar remuneraciones")
+    indice.refrescar(db)
+    assert indice.segmento.n_docs == 2
+    assert len(indice.buscar("inspeccion plan")) == 1
+    assert indice.buscar("INSPECCIÓN")[0][0] == indice.buscar("inspeccion")[0][0]
+
+    nueva_actividad(db, maestros, descripcion="Inspecciones de seguridad")
+    revisar.descripcion = "Revisar la inspección de bodegas"
+    db.commit()
+    indice.refrescado_en = 0.0   # Sin esperar SEGUNDOS_ENTRE_REFRESCOS
+    indice.refrescar(db)
+    assert len(indice.buscar("inspeccion")) == 3
+    assert indice.buscar("remuneraciones") == []   # La versión del segmento quedó anulada
+    assert indice.segmento.generacion == 1         # Por delta, sin reconstruir
+
+def test_un_solo_segmento_compartido(db, maestros, tmp_path):
+    nueva_actividad(db, maestros, descripcion="Elaborar el instructivo de compras")
+    bloqueo = tomar_bloqueo(str(tmp_path / "construccion.lock"))
+    try:
+        assert busqueda.construir_segmento(db, str(tmp_path)) is None   # Otro proceso construye
+    finally:
+        bloqueo.close()
+    assert busqueda.construir_segmento(db, str(tmp_path))["generacion"] == 1
+
+    def no_construir(directorio):
+        raise AssertionError("el segmento ya está publicado")
+    worker = busqueda.IndiceInvertido(str(tmp_path), construir=no_construir)
+    worker.refrescar(db)
+    assert len(worker.buscar("instructivo")) == 1
+
+def test_sin_segmento_no_busca(db, maestros, tmp_path):
+    pedidos = []
+    indice = busqueda.IndiceInvertido(str(tmp_path), construir=pedidos.append)
+    indice.refrescar(db)
+    indice.refrescar(db)
+    assert pedidos == [str(tmp_path)]   # Un pedido, no uno por refresco
+    with pytest.raises(busqueda.IndiceNoDisponible):
+        indice.buscar("instructivo")
+
+def test_demasiados_cambios_publica_segmento_nuevo(db, maestros, tmp_path, monkeypatch):
+    indice = _indice(db, tmp_path)
+    nueva_actividad(db, maestros, descripcion="Elaborar el instructivo de compras")
+    indice.refrescar(db)
+    monkeypatch.setattr(consultas, "LIMITE_CAMBIOS", 2)
+    for _ in range(3):
+        nueva_actividad(db, maestros, descripcion="Revisar el instructivo de ventas")
+    indice.refrescado_en = 0.0
+    indice.refrescar(db)    # Pide el segmento; lo abre en el refresco siguiente
+    indice.refrescado_en = 0.0
+    indice.refrescar(db)
+    assert indice.segmento.generacion == 2
+    assert indice.docs == {}
+    assert len(indice.buscar("instructivo")) == 4
+
+def test_top_acotado_igual_al_ranking_completo(db, maestros, tmp_path, monkeypatch):
+    monkeypatch.setattr(busqueda, "BLOQUE_INICIAL", 2)   # Varias vueltas del umbral
+    for i in range(30):
+        nueva_actividad(db, maestros, descripcion="plan " * (1 + i % 4) + "mantenimiento " * (1 + i % 3),
+                        observaciones="x " * (i % 7))
+    indice = _indice(db, tmp_path)
+    indice.refrescar(db)
+    completo = indice.buscar("plan mantenimiento", limite=100)
+    assert len(completo) == 30
+    assert [p for _, p in indice.buscar("plan mantenimiento", limite=5)] == [p for _, p in completo[:5]]
+
+def test_buscar_no_espera_a_un_refresco_en_curso(db, maestros, tmp_path, monkeypatch):
+    indice = _indice(db, tmp_path)
+    nueva_actividad(db, maestros, descripcion="Elaborar el instructivo de compras")
+    indice.refrescar(db)
+
+    leyendo, seguir = threading.Event(), threading.Event()
+    original = consultas.cambios_actividades
+    def cambios_lentos(*args):
+        leyendo.set()
+        assert seguir.wait(5)   # La "consulta" no termina hasta que la búsqueda respondió
+        return original(*args)
+    monkeypatch.setattr(consultas, "cambios_actividades", cambios_lentos)
+
+    nueva_actividad(db, maestros, descripcion="Revisar el instructivo de ventas")
+    indice.refrescado_en = 0.0
+    hilo = threading.Thread(target=indice.refrescar, args=(db,))
+    hilo.start()
+    try:
+        assert leyendo.wait(5)
+        inicio = time.perf_counter()
+        assert len(indice.buscar("instructivo")) == 1
+        indice.refrescar(db)    # Otro hilo ya refresca: vuelve sin esperar
+        assert time.perf_counter() - inicio < 1
+    finally:
+        seguir.set()
+        hilo.join(5)
+    assert not hilo.is_alive()
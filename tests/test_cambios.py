@@ -0,0 +1,89 @@
+from datetime import date
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.db import models
+from app.main import app
+from app.services import consultas, recalculo
+from tests.conftest import cabeceras, nueva_actividad
+
+def test_cambios_clasifica_por_ventana_cargada(db, maestros):
+    enero = nueva_actividad(db, maestros, fecha_compromiso=date(2025, 1, 10))
+    marzo = nueva_actividad(db, maestros, fecha_compromiso=date(2025, 3, 1))
+    nueva_actividad(db, maestros, fecha_compromiso=date(2025, 6, 1))
+    token = consultas.token_cambios(db)
+    hasta = consultas.crear_cursor(marzo)   # El cliente cargó hasta marzo
+
+    dentro = nueva_actividad(db, maestros, fecha_compromiso=date(2025, 2, 1))
+    despues = nueva_actividad(db, maestros, fecha_compromiso=date(2025, 12, 1))   # ID mayor, fuera de la ventana
+    enero.fecha_compromiso = date(2025, 9, 1)                                     # Se mueve fuera
+    db.commit()
+
+    respuesta = TestClient(app).get("/actividades/cambios", params={"desde": token, "hasta": hasta},
+                                    headers=cabeceras(maestros["usuario"]))
+    assert respuesta.status_code == 200
+    datos = respuesta.json()
+    actualizadas = {a["id"] for a in datos["actualizadas"]}
+    assert actualizadas == {dentro.id}                                # Solo lo cambiado desde el token
+    assert set(datos["fuera_de_vista"]) == {despues.id, enero.id}
+
+def test_cambios_respeta_filtros_del_listado(db, maestros):
+    token = consultas.token_cambios(db)
+    en_proceso = nueva_actividad(db, maestros, status_id=maestros["status"]["En Proceso"].id)
+    entregada = nueva_actividad(db, maestros, status_id=maestros["status"]["Entregado a Tiempo"].id)
+
+    respuesta = TestClient(app).get("/actividades/cambios",
+                                    params={"desde": token, "status_id": maestros["status"]["En Proceso"].id},
+                                    headers=cabeceras(maestros["usuario"]))
+    datos = respuesta.json()
+    assert [a["id"] for a in datos["actualizadas"]] == [en_proceso.id]
+    assert datos["fuera_de_vista"] == [entregada.id]
+
+def test_cambios_rechaza_cursor_invalido(db, maestros):
+    respuesta = TestClient(app).get("/actividades/cambios", params={"desde": "1", "hasta": "x"},
+                                    headers=cabeceras(maestros["usuario"]))
+    assert respuesta.status_code == 400
+
+def test_cambios_entrega_transacciones_que_confirman_tarde(tmp_path):
+    # Dos conexiones a un archivo: la escritura queda abierta mientras otro lee el token
+    engine = create_engine(f"sqlite:///{tmp_path / 'cambios.db'}")
+    models.Base.metadata.create_all(bind=engine)
+    Sesion = sessionmaker(bind=engine)
+    lector, escritor = Sesion(), Sesion()
+    try:
+        empresa = models.Empresa(razon_social="E")
+        lector.add(empresa)
+        lector.flush()
+        lector.add(models.Area(codigo="A", nombre="A", empresa_id=empresa.id))
+        lector.commit()
+        inicial = consultas.leer_token(consultas.token_cambios(lector))
+
+        tardia = models.Actividad(empresa_id=empresa.id, area_id=1, descripcion="Tardía", fecha_compromiso=date(2025, 1, 1))
+        escritor.add(tardia)
+        escritor.flush()                                             # Escrita, sin confirmar
+        token = consultas.token_cambios(lector)
+        lector.rollback()
+        assert consultas.cambios_actividades(lector, inicial, consultas.leer_token(token)) == ([], [])
+        escritor.commit()                                            # Confirma después de entregar el token
+
+        siguiente = consultas.token_cambios(lector)
+        actualizadas, _ = consultas.cambios_actividades(lector, consultas.leer_token(token), consultas.leer_token(siguiente))
+        assert [a.id for a in actualizadas] == [tardia.id]
+    finally:
+        lector.close()
+        escritor.close()
+        engine.dispose()
+
+def test_cambios_pide_resync_sobre_el_limite(db, maestros, monkeypatch):
+    for _ in range(3):
+        nueva_actividad(db, maestros, fecha_compromiso=date(2020, 1, 1))
+    token = consultas.token_cambios(db)
+    recalculo.recalcular_estados(db)   # UPDATE set-based: también cambia la versión de las filas
+    hasta = consultas.leer_token(consultas.token_cambios(db))
+    assert len(consultas.cambios_actividades(db, consultas.leer_token(token), hasta)[0]) == 3
+    assert consultas.cambios_actividades(db, consultas.leer_token(token), hasta, limite=2) is None
+
+    monkeypatch.setattr(consultas, "LIMITE_CAMBIOS", 2)
+    datos = TestClient(app).get("/actividades/cambios", params={"desde": token},
+                                headers=cabeceras(maestros["usuario"])).json()
+    assert datos["resync"] and datos["actualizadas"] == [] and datos["token"] == str(hasta)
@@ -0,0 +1,53 @@
+from datetime import date
+import pytest
+from sqlalchemy import event
+from app.db.database import engine
+from app.db import models
+from app.schemas import schemas
+from app.services import consultas
+
+def _sembrar(db, n):
+    """n actividades, cada una con su propia empresa, área, responsable, status, origen y tipo:
+    con carga perezosa serían 6 consultas extra por fila."""
+    db.bulk_insert_mappings(models.Empresa, [{"id": i, "razon_social": f"E{i}"} for i in range(1, n + 1)])
+    db.bulk_insert_mappings(models.Area, [{"id": i, "codigo": f"A{i}", "empresa_id": i} for i in range(1, n + 1)])
+    db.bulk_insert_mappings(models.Usuario, [
+        {"id": i, "nombre_completo": f"U{i}", "email": f"u{i}@x", "rol": "CONSULTOR", "password_hash": "x"}
+        for i in range(1, n + 1)])
+    for modelo in (models.StatusActividad, models.OrigenRequerimiento, models.TipoRequerimiento):
+        db.bulk_insert_mappings(modelo, [{"id": i, "nombre": f"N{i}"} for i in range(1, n + 1)])
+    db.bulk_insert_mappings(models.Actividad, [
+        {"empresa_id": i, "area_id": i, "responsable_id": i, "status_id": i, "origen_id": i, "tipo_req_id": i,
+         "descripcion": f"Actividad {i}", "fecha_compromiso": date(2025, 1, 10)}
+        for i in range(1, n + 1)])
+    db.commit()
+    db.expunge_all()
+
+def _contar_sentencias(funcion):
+    sentencias = []
+    def anotar(conn, cursor, statement, parameters, context, executemany):
+        sentencias.append(statement)
+    event.listen(engine, "before_cursor_execute", anotar)
+    try:
+        resultado = funcion()
+    finally:
+        event.remove(engine, "before_cursor_execute", anotar)
+    return len(sentencias), resultado
+
+def _listar(db):
+    filas = [consultas.mapear_nombres(a) for a in consultas.query_actividades(db).all()]
+    return [schemas.ActividadOut.model_validate(a) for a in filas]
+
+def _listar_select(db):
+    filas = [consultas.mapear_nombres(a) for a in db.execute(consultas.select_actividades()).unique().scalars()]
+    return [schemas.ActividadOut.model_validate(a) for a in filas]
+
+@pytest.mark.parametrize("n", [1, 100, 10_000])
+@pytest.mark.parametrize("listar", [_listar, _listar_select])
+def test_listado_con_nombres_es_una_sola_consulta(db, n, listar):
+    _sembrar(db, n)
+    sentencias, salida = _contar_sentencias(lambda: listar(db))
+    assert sentencias == 1
+    assert len(salida) == n
+    assert {a.nombre_area for a in salida} == {f"A{i}" for i in range(1, n + 1)}
+    assert all(a.nombre_responsable == f"U{a.responsable_id}" and a.nombre_status.startswith("N") for a in salida)
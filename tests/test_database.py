@@ -0,0 +1,27 @@
+import pytest
+from sqlalchemy.pool import StaticPool
+from app.db import database
+
+def _argumentos(url):
+    capturados = {}
+    def crear(url, **kw):
+        capturados.update(kw)
+    database._crear_engine(url, crear)
+    return capturados
+
+@pytest.mark.parametrize("url, connect_args", [
+    ("mssql+pyodbc:///?odbc_connect=DRIVER%3Dx", {"timeout": database.CONNECT_TIMEOUT}),
+    ("mssql+aioodbc:///?odbc_connect=DRIVER%3Dx", {"timeout": database.CONNECT_TIMEOUT}),
+    ("sqlite:///archivo.db", {"check_same_thread": False, "timeout": database.CONNECT_TIMEOUT}),
+    ("postgresql+psycopg2://u:p@servidor/bd", {}),
+])
+def test_connect_args_segun_motor(url, connect_args):
+    assert _argumentos(url)["connect_args"] == connect_args
+
+def test_fast_executemany_solo_con_pyodbc():
+    assert _argumentos("mssql+pyodbc:///?odbc_connect=DRIVER%3Dx")["fast_executemany"] is True
+    assert "fast_executemany" not in _argumentos("mssql+aioodbc:///?odbc_connect=DRIVER%3Dx")
+
+@pytest.mark.parametrize("url", ["sqlite://", "sqlite:///:memory:", "sqlite+aiosqlite://"])
+def test_sqlite_en_memoria_usa_una_conexion(url):
+    assert _argumentos(url)["poolclass"] is StaticPool
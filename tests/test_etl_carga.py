@@ -0,0 +1,67 @@
+import json
+from datetime import datetime
+import openpyxl
+import pytest
+from app.db import models
+from app.services import etl_carga, generar_scp
+
+def _libro(ruta, descripciones):
+    """Libro SCP mínimo con una fila por descripción (mismo origen y área: las repetidas son duplicados)"""
+    wb = openpyxl.Workbook(write_only=True)
+    hoja = wb.create_sheet(generar_scp.HOJA)
+    for fila in generar_scp.PREAMBULO:
+        hoja.append(fila)
+    hoja.append(generar_scp.ENCABEZADOS)
+    col = generar_scp.COL
+    for descripcion in descripciones:
+        fila = [None] * len(generar_scp.ENCABEZADOS)
+        fila[col['Origin Date ']] = datetime(2025, 1, 1)
+        fila[col['Proceso / SP']] = "A1"
+        fila[col['Description of the Activity\n(BACKLOG)']] = descripcion
+        fila[col['Responsable del Éxito\nProcess owner']] = "Consultor Test"
+        fila[col['Fecha de Compromiso\nDeliver Date']] = datetime(2025, 1, 10)
+        fila[col['Condición Actual ']] = "Abierta"
+        fila[col['% Avance']] = 0.5
+        hoja.append(fila)
+    wb.save(ruta)
+    return str(ruta)
+
+# Repetidas dentro de un bloque y entre bloques (3 filas por bloque)
+DESCRIPCIONES = ["Tarea A", "Tarea B", "Tarea A", "Tarea C", "Tarea A", "Tarea B", "Tarea D", "Tarea A"]
+
+class _Corte(Exception):
+    pass
+
+def _claves(db, empresa_id):
+    return {c for (c,) in db.query(models.Actividad.clave_origen).filter_by(empresa_id=empresa_id)}
+
+def test_reanudar_numera_repetidas_como_una_carga_completa(db, maestros, tmp_path):
+    archivo = _libro(tmp_path / "scp.xlsx", DESCRIPCIONES)
+    empresa_id = maestros["empresa"].id
+
+    def cortar(leidas, conteos, reporte):
+        if leidas >= 6: raise _Corte()
+    with pytest.raises(_Corte):
+        etl_carga.importar_archivo(db, archivo, empresa_id, filas_por_bloque=3, progreso=cortar)
+    with open(archivo + ".checkpoint.json", encoding="utf-8") as f:
+        checkpoint = json.load(f)
+    assert set(checkpoint) == {"archivo", "ultima_fila", "conteos"}   # Tamaño fijo, sin conteo por clave
+
+    conteos = etl_carga.importar_archivo(db, archivo, empresa_id, filas_por_bloque=3)
+    assert conteos["insertadas"] == len(DESCRIPCIONES)
+    reanudada = _claves(db, empresa_id)
+
+    df, _ = etl_carga.limpiar_dataframe(next(etl_carga.leer_excel_por_bloques(archivo, 100)))
+    completa = set(etl_carga.identificar(df, etl_carga.Apariciones())["clave_origen"])
+    assert reanudada == completa and len(completa) == len(DESCRIPCIONES)
+
+def test_apariciones_solo_guarda_conteo_de_repetidas():
+    apariciones = etl_carga.Apariciones()
+    bloques = [["a", "b", "a"], ["c", "a", "b"], ["d", "a"]]
+    numeros = []
+    for bloque in bloques:
+        base = etl_carga.pd.Series(etl_carga._sha1_filas([etl_carga.pd.Series(bloque)]))
+        numeros.append(list(apariciones.numerar(base)))
+    assert numeros == [[0, 0, 1], [0, 2, 1], [0, 3]]
+    assert sorted(apariciones.repetidas.values()) == [2, 4]
+    assert len(apariciones.vistas) == 4
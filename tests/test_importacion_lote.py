@@ -0,0 +1,28 @@
+import os
+import tempfile
+from app.db import models
+from app.services import generar_scp, importacion_lote
+
+def test_lote_pasa_los_bloques_por_disco_y_los_limpia(db, tmp_path, monkeypatch):
+    libro = str(tmp_path / "cliente.xlsx")
+    generar_scp.generar(libro, filas=250, areas=5, responsables=5)
+    temporales = tmp_path / "tmp"
+    temporales.mkdir()
+    monkeypatch.setattr(tempfile, "tempdir", str(temporales))   # Los trabajadores heredan (fork)
+
+    carpeta, bloques, reporte, leidas = importacion_lote._preparar_libro(libro, 100)
+    assert leidas == 250 and len(bloques) == 3
+    assert all(os.path.dirname(ruta) == carpeta for ruta in bloques)
+
+    resultados = importacion_lote.importar_lote([(libro, "Cliente Lote")], procesos=1, filas_por_bloque=100)
+    conteos = resultados[libro]
+    assert "error" not in conteos
+    assert conteos["insertadas"] == db.query(models.Actividad).count() > 0
+    # Estados recalculados como en la importación de un archivo (el ETL no los calcula)
+    assert db.query(models.Actividad).filter(models.Actividad.prioridad_accion.is_(None)).count() == 0
+    assert conteos["insertadas"] + conteos["rechazadas"] <= 250
+    # El escritor borra cada bloque; solo queda la carpeta del _preparar_libro directo
+    assert os.listdir(temporales) == [os.path.basename(carpeta)]
+
+    repetido = importacion_lote.importar_lote([(libro, "Cliente Lote")], procesos=1, filas_por_bloque=100)[libro]
+    assert repetido["insertadas"] == 0 and repetido["sin_cambios"] == conteos["insertadas"]
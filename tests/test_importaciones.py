@@ -0,0 +1,45 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from app.core import cache, security
+from app.db import models
+from app.db.database import motor_async
+from app.main import app
+from app.services import busqueda, importaciones
+
+def _admin(db):
+    admin = models.Usuario(nombre_completo="Admin", email="admin@test.com", rol="ADMIN", password_hash="x")
+    db.add(admin)
+    db.commit()
+    token = security.create_access_token({"sub": admin.email, "rol": admin.rol, "id": admin.id})
+    return {"Authorization": f"Bearer {token}"}
+
+@pytest.fixture
+def db_async():
+    """Esquema en la BD del engine async (en memoria es otra BD, vacía)"""
+    async def ejecutar(metodo):
+        async with motor_async().begin() as conexion:
+            await conexion.run_sync(metodo)
+    asyncio.run(ejecutar(models.Base.metadata.create_all))
+    yield
+    asyncio.run(ejecutar(models.Base.metadata.drop_all))
+
+def test_importar_rechaza_empresa_inexistente(db, db_async):
+    respuesta = TestClient(app).post(
+        "/import/scp", headers=_admin(db), data={"empresa_id": "9999"},
+        files={"archivo": ("scp.xlsx", b"no importa", "application/octet-stream")},
+    )
+    assert respuesta.status_code == 404
+
+def test_importacion_invalida_caches_e_indice(db, tmp_path, monkeypatch):
+    archivo = tmp_path / "roto.xlsx"
+    archivo.write_bytes(b"no es un libro")
+    monkeypatch.setattr(busqueda.indice, "refrescado_en", 123.0)
+    versiones = (cache.empresas.version, cache.usuarios.version)
+
+    trabajo = importaciones.Trabajo(str(archivo), "roto.xlsx")
+    importaciones._ejecutar(trabajo)   # Falla al leer: igual invalida (pudo confirmar bloques)
+
+    assert trabajo.estado == importaciones.ERROR
+    assert (cache.empresas.version, cache.usuarios.version) == (versiones[0] + 1, versiones[1] + 1)
+    assert busqueda.indice.refrescado_en == 0.0
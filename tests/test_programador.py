@@ -0,0 +1,37 @@
+import os
+from app.core.bloqueos import BloqueoGlobal
+from app.services import programador
+
+def test_una_sola_instancia_tiene_el_bloqueo():
+    nombre = f"siviack-test-{os.getpid()}"
+    primero, segundo = BloqueoGlobal(nombre), BloqueoGlobal(nombre)
+    try:
+        assert primero.tomar()
+        assert primero.tomar()            # Ya lo tiene: sigue vigente
+        assert not segundo.tomar()
+        primero.soltar()
+        assert segundo.tomar()            # Al soltarlo (o morir el proceso) lo toma otro
+    finally:
+        primero.soltar()
+        segundo.soltar()
+
+def test_no_corre_si_otro_proceso_tiene_el_bloqueo(monkeypatch):
+    corridas = []
+    monkeypatch.setattr(programador, "TAREAS", {
+        "a": (lambda: corridas.append("a"), 1),
+        "b": (lambda: corridas.append("b"), 1),
+    })
+    monkeypatch.setattr(programador, "NOMBRE_BLOQUEO", f"siviack-test-{os.getpid()}")
+    lider = BloqueoGlobal(programador.NOMBRE_BLOQUEO)
+    assert lider.tomar()
+    try:
+        assert not programador.ejecutar_una_vez()
+        assert corridas == []
+    finally:
+        lider.soltar()
+    assert programador.ejecutar_una_vez(["b"])
+    assert corridas == ["b"]
+
+def test_modo_externo_no_inicia_en_los_workers(monkeypatch):
+    monkeypatch.setattr(programador, "MODO", "externo")
+    assert programador.iniciar() is None
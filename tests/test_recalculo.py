@@ -0,0 +1,37 @@
+from datetime import date
+from app.db import models
+from app.services import recalculo, consultas
+from tests.conftest import nueva_actividad
+
+HOY = date(2025, 3, 1)
+
+def test_status_entregado_sin_fecha_de_entrega_queda_cerrada(db, maestros):
+    entregada = nueva_actividad(db, maestros, status_id=maestros["status"]["Entregado a Tiempo"].id)
+    fuera_de_plazo = nueva_actividad(db, maestros, status_id=maestros["status"]["Entregado Fuera de Plazo"].id)
+    vencida = nueva_actividad(db, maestros, status_id=maestros["status"]["En Proceso"].id)
+
+    recalculo.recalcular_estados(db, hoy=HOY)
+    db.expire_all()
+
+    for act in (entregada, fuera_de_plazo):
+        assert act.condicion_actual == "Cerrada"
+        assert act.prioridad_accion == "Completada"
+        assert act.days_late == 0
+    assert vencida.condicion_actual == "Atrasada"
+    assert vencida.days_late == (HOY - date(2025, 1, 10)).days
+
+    # Un segundo recálculo no la reabre
+    recalculo.recalcular_estados(db, hoy=HOY)
+    db.expire_all()
+    assert entregada.condicion_actual == "Cerrada"
+
+def test_cerradas_por_status_no_cuentan_como_atrasadas_ni_pendientes(db, maestros):
+    nueva_actividad(db, maestros, status_id=maestros["status"]["Entregado a Tiempo"].id)
+    nueva_actividad(db, maestros, status_id=maestros["status"]["En Proceso"].id)
+    recalculo.recalcular_estados(db, hoy=HOY)
+
+    resumen = consultas.resumen_kpis(db, {}, desglose=False)
+    assert (resumen["total"], resumen["cerradas"], resumen["atrasadas"]) == (2, 1, 1)
+
+    pendientes = consultas.filtrar_pendientes(consultas.query_actividades(db)).all()
+    assert [a.status_id for a in pendientes] == [maestros["status"]["En Proceso"].id]
@@ -0,0 +1,45 @@
+from types import SimpleNamespace
+from datetime import datetime, timezone
+from app.services import auditoria, retencion
+
+def _archivo(directorio):
+    """Seis meses de archivo, 5 eventos por mes, con un lote duplicado en marzo"""
+    filas = []
+    for mes in range(1, 7):
+        del_mes = [dict(id=mes * 10 + dia, fecha=datetime(2024, mes, 2 + dia * 5, tzinfo=timezone.utc),
+                        usuario="u", rol="ADMIN", accion="CREAR", entidad="Actividad", detalle=f"{mes}-{dia}")
+                   for dia in range(5)]
+        retencion._escribir_segmento(directorio, f"2024-{mes:02d}", del_mes)
+        if mes == 3:
+            retencion._escribir_segmento(directorio, "2024-03", del_mes[:2])
+        filas += del_mes
+    return sorted(filas, key=lambda f: (f["fecha"], f["id"]), reverse=True)
+
+def test_paginas_del_archivo_en_orden_sin_duplicados(tmp_path):
+    todas = _archivo(str(tmp_path))
+    paginas, after = [], None
+    while True:
+        pagina = retencion.consultar_archivo(limit=4, after=after, directorio=str(tmp_path))
+        if not pagina: break
+        paginas += pagina
+        after = auditoria.crear_cursor(SimpleNamespace(**pagina[-1]))
+    assert [f["id"] for f in paginas] == [f["id"] for f in todas]
+
+def test_solo_abre_los_meses_necesarios(tmp_path, monkeypatch):
+    todas = _archivo(str(tmp_path))
+    leidos = []
+    original = retencion._leer_meses
+    def leer(directorio, meses):
+        leidos.extend(meses)
+        return original(directorio, meses)
+    monkeypatch.setattr(retencion, "_leer_meses", leer)
+
+    assert len(retencion.consultar_archivo(limit=3, directorio=str(tmp_path))) == 3
+    assert leidos == ["2024-06"]
+
+    leidos.clear()
+    abril = next(f for f in todas if f["fecha"].month == 4 and f["fecha"].day == 17)
+    pagina = retencion.consultar_archivo(limit=2, after=auditoria.crear_cursor(SimpleNamespace(**abril)),
+                                         directorio=str(tmp_path))
+    assert [f["fecha"].month for f in pagina] == [4, 4]
+    assert leidos == ["2024-04"]    # Ni los meses posteriores al cursor ni los anteriores
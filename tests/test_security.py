@@ -0,0 +1,15 @@
+import asyncio
+import threading
+import pytest
+from app.core import security
+
+def test_carga_del_hashing(monkeypatch):
+    antes = security.estadisticas_hashing()
+    asyncio.run(security.hash_password_async("clave"))
+    assert security.estadisticas_hashing()["en_curso"] == antes["en_curso"] == 0
+
+    monkeypatch.setattr(security, "_cupos_hash", threading.BoundedSemaphore(1))
+    security._cupos_hash.acquire()   # Pool lleno
+    with pytest.raises(security.HashingSaturado):
+        asyncio.run(security.hash_password_async("clave"))
+    assert security.estadisticas_hashing()["rechazados"] == antes["rechazados"] + 1